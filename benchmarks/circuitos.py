@@ -0,0 +1,50 @@
+import math
+
+from core.circuito import Circuito
+from core.componentes import Resistencia, Capacitor, FuenteDC, FuenteAC, Tierra, Diodo
+from core.generadores import escalera, malla, instanciar
+
+# Circuitos sintéticos para las mediciones. Cada generador recibe el número
+# aproximado de nodos y devuelve un circuito nuevo (determinista) de la clase
+# dada, Circuito o CircuitoCompacto
+
+
+def escalera_rc(nodos, clase=Circuito):
+    # Fuente AC seguida de nodos-1 secciones R serie / C a tierra
+    circuito = clase()
+    circuito.agregar_componentes([FuenteAC('in', 'n0', '0', 1.0, 1e3), Tierra('0', '0')])
+    escalera(circuito, max(1, nodos - 1), serie=[(Resistencia, {'resistencia': 1e3})],
+             derivacion=[(Capacitor, {'capacitancia': 1e-9})])
+    return circuito
+
+
+def malla_resistencias(nodos, clase=Circuito):
+    # Rejilla lado x lado de resistencias alimentada en una esquina y
+    # cargada a tierra en la opuesta
+    lado = max(2, math.isqrt(nodos))
+    circuito = clase()
+    circuito.agregar_componentes([FuenteDC('dd', 'm0_0', '0', 1.0), Tierra('0', '0'),
+                                  Resistencia('carga', f'm{lado - 1}_{lado - 1}', '0', 1.0)])
+    malla(circuito, lado, lado, (Resistencia, {'resistencia': 10.0}))
+    return circuito
+
+
+# Celda del banco de rectificadores: R serie, diodo y carga RC
+_RECTIFICADOR = [Resistencia('s', 'in', 'a', 10.0), Diodo('d', 'a', 'k'),
+                 Resistencia('l', 'k', '0', 1e3), Capacitor('c', 'k', '0', 1e-5)]
+
+
+def banco_rectificadores(nodos, clase=Circuito):
+    # Rectificadores de media onda en paralelo sobre una fuente AC (dos
+    # nodos por celda)
+    circuito = clase()
+    circuito.agregar_componentes([FuenteAC('in', 'in', '0', 5.0, 50.0), Tierra('0', '0')])
+    instanciar(circuito, _RECTIFICADOR, {'in': 'in'}, max(1, nodos // 2))
+    return circuito
+
+
+GENERADORES = {
+    'escalera_rc': escalera_rc,
+    'malla_resistencias': malla_resistencias,
+    'banco_rectificadores': banco_rectificadores,
+}
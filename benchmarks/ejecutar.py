@@ -0,0 +1,259 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from core.circuito import Circuito
+from core.compacto import CircuitoCompacto
+from core.componentes import Resistencia
+from core.simulacion import analizar_circuito, punto_operacion
+from utils.exportar import exportar_csv, exportar_json
+from utils.fourier import analizar_fourier_multicanal
+from benchmarks.circuitos import GENERADORES
+
+# Mediciones de rendimiento por etapa sobre los circuitos de
+# benchmarks/circuitos.py; no usa PyQt5 ni matplotlib:
+#   python -m benchmarks.ejecutar --tamanos 10 1000 100000 --salida medidas.json
+#   python -m benchmarks.ejecutar --base medidas.json   (falla si hay regresiones)
+#   python -m benchmarks.ejecutar --tamanos 10 100 1000 10000 --base   (con benchmarks/base.json)
+TAMANOS = (10, 100, 1000, 10000, 100000)
+PUNTOS_TRANSITORIO = 200
+REPETICIONES = 3
+
+# Medidas de referencia guardadas en el repositorio (tamaños 10 a 10000)
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base.json')
+
+# Tolerancia relativa y diferencias mínimas (ruido) para marcar una regresión
+TOLERANCIA = 0.25
+SEGUNDOS_MINIMOS = 2e-3
+BYTES_MINIMOS = 256 * 2**10
+
+# Aceleración mínima de 'cambio_valor' frente a 'recompilacion' a partir de
+# este tamaño (en los pequeños domina el coste fijo de cada llamada)
+ACELERACION_CAMBIO_VALOR = 3.0
+TAMANO_ACELERACION = 1000
+
+
+# Cada preparación recibe la función que genera el circuito y devuelve el
+# circuito y la función a medir
+def _construccion(crear, directorio):
+    return crear(), crear
+
+
+def _ensamblado(crear, directorio):
+    circuito = crear()
+    return circuito, lambda: circuito.obtener_matrices_nodales(0)
+
+
+def _solucion(crear, directorio):
+    circuito = crear()
+    circuito.compilar()
+    return circuito, lambda: punto_operacion(circuito)
+
+
+def _resistencia(circuito):
+    return next(c for c in circuito.componentes if getattr(c, 'tipo', type(c)) is Resistencia)
+
+
+def _cambio_valor(crear, directorio):
+    # Un circuito ya resuelto al que se cambia una resistencia: se corrigen
+    # sus entradas y el punto de operación usa la factorización conservada
+    # con una corrección de rango uno
+    circuito = crear()
+    punto_operacion(circuito)
+    resistencia = _resistencia(circuito)
+
+    def funcion():
+        circuito.cambiar_valor(resistencia, resistencia.resistencia * 1.1)
+        return punto_operacion(circuito)
+    return circuito, funcion
+
+
+def _recompilacion(crear, directorio):
+    # Lo mismo que 'cambio_valor' descartando la forma compilada, como antes
+    # de las actualizaciones incrementales: la referencia de su aceleración
+    circuito = crear()
+    punto_operacion(circuito)
+    resistencia = _resistencia(circuito)
+
+    def funcion():
+        resistencia.resistencia *= 1.1
+        circuito._compilado = None
+        return punto_operacion(circuito)
+    return circuito, funcion
+
+
+def _transitorio(crear, directorio):
+    circuito = crear()
+    circuito.compilar()
+    return circuito, lambda: analizar_circuito(circuito, 1e-3, PUNTOS_TRANSITORIO)
+
+
+def _fourier(crear, directorio):
+    circuito = crear()
+    resultados = analizar_circuito(circuito, 1e-3, PUNTOS_TRANSITORIO)
+    senales = resultados.respuesta['solucion'].T
+    return circuito, lambda: analizar_fourier_multicanal(senales, resultados.tiempo)
+
+
+def _csv(crear, directorio):
+    circuito = crear()
+    resultados = analizar_circuito(circuito, 1e-3, PUNTOS_TRANSITORIO)
+    return circuito, lambda: exportar_csv(resultados, os.path.join(directorio, 'resultados.csv'))
+
+
+def _json(crear, directorio):
+    circuito = crear()
+    resultados = analizar_circuito(circuito, 1e-3, PUNTOS_TRANSITORIO)
+    return circuito, lambda: exportar_json(resultados, os.path.join(directorio, 'resultados.json'))
+
+
+# etapa: (preparación, tamaño máximo). Las etapas con resultados del
+# transitorio guardan puntos x componentes
+ETAPAS = {
+    'construccion': (_construccion, None),
+    'ensamblado': (_ensamblado, None),
+    'solucion': (_solucion, None),
+    'cambio_valor': (_cambio_valor, None),
+    'recompilacion': (_recompilacion, None),
+    'transitorio': (_transitorio, 10000),
+    'fourier': (_fourier, 10000),
+    'csv': (_csv, 10000),
+    'json': (_json, 1000),
+}
+
+
+def medir(generador, tamano, etapa, repeticiones, directorio, clase=Circuito):
+    # Mejor tiempo de varias repeticiones, cada una sobre un circuito nuevo
+    # (la generación y la preparación no se miden salvo en 'construccion'),
+    # y pico de memoria asignada durante la etapa en una pasada aparte con
+    # tracemalloc
+    preparar = ETAPAS[etapa][0]
+    crear = lambda: generador(tamano, clase)
+    tiempos = []
+    for _ in range(repeticiones):
+        circuito, funcion = preparar(crear, directorio)
+        gc.collect()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    circuito, funcion = preparar(crear, directorio)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'segundos': min(tiempos),
+        'pico_bytes': pico,
+        'nodos': len(circuito.nodos),
+        'componentes': len(circuito.componentes)
+    }
+
+
+def ejecutar(familias, tamanos, etapas, repeticiones=REPETICIONES, informar=print, clase=Circuito):
+    medidas = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for familia in familias:
+            for tamano in tamanos:
+                for etapa in etapas:
+                    maximo = ETAPAS[etapa][1]
+                    if maximo is not None and tamano > maximo:
+                        continue
+                    medida = {'familia': familia, 'tamano': tamano, 'etapa': etapa}
+                    medida.update(medir(GENERADORES[familia], tamano, etapa, repeticiones, directorio, clase))
+                    medidas.append(medida)
+                    informar(f"{familia:22s} {tamano:>7d} {etapa:12s} {medida['segundos']:10.4f} s "
+                             f"{medida['pico_bytes'] / 2**20:10.2f} MiB")
+    return medidas
+
+
+def entorno():
+    return {
+        'fecha': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine()
+    }
+
+
+def regresiones(medidas, base, tolerancia=TOLERANCIA):
+    # Compara con las medidas de referencia de la misma familia, tamaño y etapa
+    anteriores = {(m['familia'], m['tamano'], m['etapa']): m for m in base['medidas']}
+    encontradas = []
+    for medida in medidas:
+        anterior = anteriores.get((medida['familia'], medida['tamano'], medida['etapa']))
+        if anterior is None:
+            continue
+        for campo, minimo in (('segundos', SEGUNDOS_MINIMOS), ('pico_bytes', BYTES_MINIMOS)):
+            actual, referencia = medida[campo], anterior[campo]
+            if actual > referencia * (1 + tolerancia) and actual - referencia > minimo:
+                encontradas.append((medida, campo, referencia, actual))
+    return encontradas
+
+
+def aceleraciones_insuficientes(medidas, minima=ACELERACION_CAMBIO_VALOR):
+    # (familia, tamaño, aceleración) donde volver a resolver tras un cambio de
+    # valor no es al menos minima veces más rápido que recompilar y resolver
+    referencias = {(m['familia'], m['tamano']): m['segundos'] for m in medidas if m['etapa'] == 'recompilacion'}
+    insuficientes = []
+    for medida in medidas:
+        clave = (medida['familia'], medida['tamano'])
+        if medida['etapa'] != 'cambio_valor' or clave not in referencias or medida['tamano'] < TAMANO_ACELERACION:
+            continue
+        aceleracion = referencias[clave] / medida['segundos']
+        if aceleracion < minima:
+            insuficientes.append((*clave, aceleracion))
+    return insuficientes
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog='benchmarks.ejecutar', description="Mediciones de rendimiento por etapa")
+    parser.add_argument('--familias', nargs='+', choices=tuple(GENERADORES), default=list(GENERADORES))
+    parser.add_argument('--tamanos', nargs='+', type=int, default=list(TAMANOS), help="nodos aproximados")
+    parser.add_argument('--etapas', nargs='+', choices=tuple(ETAPAS), default=list(ETAPAS))
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--compacto', action='store_true', help="medir con CircuitoCompacto")
+    parser.add_argument('--salida', help="archivo JSON con las medidas")
+    parser.add_argument('--base', nargs='?', const=BASE,
+                        help="medidas de referencia (JSON de una ejecución anterior); sin archivo, benchmarks/base.json")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help="aumento relativo permitido")
+    return parser
+
+
+def main(argv=None):
+    opciones = crear_parser().parse_args(argv)
+    medidas = ejecutar(opciones.familias, opciones.tamanos, opciones.etapas, opciones.repeticiones,
+                       clase=CircuitoCompacto if opciones.compacto else Circuito)
+    informe = {'entorno': entorno(), 'medidas': medidas}
+    if opciones.salida:
+        with open(opciones.salida, 'w') as f:
+            json.dump(informe, f, indent=2)
+
+    lentas = aceleraciones_insuficientes(medidas)
+    for familia, tamano, aceleracion in lentas:
+        print(f"Cambio de valor en {familia} {tamano}: sólo {aceleracion:.2f}x más rápido que "
+              f"recompilar (mínimo {ACELERACION_CAMBIO_VALOR:g}x)", file=sys.stderr)
+    if opciones.base is None:
+        return 1 if lentas else 0
+    with open(opciones.base) as f:
+        encontradas = regresiones(medidas, json.load(f), opciones.tolerancia)
+    for medida, campo, referencia, actual in encontradas:
+        print(f"Regresión en {medida['familia']} {medida['tamano']} {medida['etapa']}: "
+              f"{campo} {referencia:.6g} -> {actual:.6g}", file=sys.stderr)
+    return 1 if encontradas or lentas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+from core.compilado import FAMILIAS
+from core.mna import Factorizacion
+from core.instrumentacion import contar
+
+# Caché por contenido de resultados y factorizaciones. La clave es una huella
+# del circuito compilado (topología numerada y valores) y de los parámetros
+# del análisis, así que un circuito recién cargado o reconstruido con los
+# mismos valores acierta aunque sus objetos sean otros. En memoria es una
+# LRU con presupuesto en bytes; los resultados pueden además escribirse en
+# un directorio para que otros procesos los reutilicen.
+BYTES_MEMORIA = 256 * 2**20
+
+EVENTOS = ('aciertos', 'aciertos_disco', 'fallos', 'expulsiones')
+
+
+def huella(sistema, *parametros):
+    # Circuitos iguales salvo por los nombres de nodos y componentes
+    # comparten huella: la solución sólo depende de la numeración
+    compilado = sistema.compilado
+    h = hashlib.blake2b(digest_size=20)
+    h.update(np.array([compilado.num_nodos, compilado.dimension], dtype=np.int64).tobytes())
+    for atributo, _, _, _ in FAMILIAS:
+        grupo = getattr(compilado, atributo)
+        h.update(f"{atributo}:{len(grupo)}".encode())
+        h.update(grupo.nodos.tobytes())
+        for nombre in grupo.nombres_valores:
+            h.update(getattr(grupo, nombre).tobytes())
+    for parametro in parametros:
+        if isinstance(parametro, np.ndarray):
+            h.update(f"{parametro.dtype.str}{parametro.shape}".encode())
+            h.update(np.ascontiguousarray(parametro).tobytes())
+        else:
+            h.update(repr(parametro).encode())
+    return h.hexdigest()
+
+
+def _tamano(datos):
+    return sum(np.asarray(valor).nbytes for valor in datos.values())
+
+
+class CacheAnalisis:
+    def __init__(self, bytes_memoria=BYTES_MEMORIA, directorio=None, bytes_disco=None):
+        self.bytes_memoria = bytes_memoria
+        self.directorio = directorio
+        self.bytes_disco = bytes_disco
+        self.bytes = 0
+        self._entradas = OrderedDict()
+        self._estadisticas = {}
+        if directorio is not None:
+            os.makedirs(directorio, exist_ok=True)
+
+    def _anotar(self, tipo, evento):
+        self._estadisticas.setdefault(tipo, dict.fromkeys(EVENTOS, 0))[evento] += 1
+        contar(f"cache_{evento}")
+
+    def _obtener(self, clave):
+        if clave not in self._entradas:
+            return None
+        self._entradas.move_to_end(clave)
+        return self._entradas[clave][0]
+
+    def _guardar(self, clave, valor, tamano):
+        if clave in self._entradas:
+            self.bytes -= self._entradas.pop(clave)[1]
+        if tamano > self.bytes_memoria:
+            return
+        self._entradas[clave] = (valor, tamano)
+        self.bytes += tamano
+        while self.bytes > self.bytes_memoria:
+            (tipo, _), (_, liberados) = self._entradas.popitem(last=False)
+            self.bytes -= liberados
+            self._anotar(tipo, 'expulsiones')
+
+    def factorizacion(self, sistema, s=0):
+        # Factorización de A(s) sin modificar: la comparten todos los sistemas
+        # con el mismo contenido
+        clave = ('factorizaciones', huella(sistema, complex(s)))
+        lu = self._obtener(clave)
+        if lu is not None:
+            self._anotar('factorizaciones', 'aciertos')
+            return lu
+        self._anotar('factorizaciones', 'fallos')
+        lu = Factorizacion(sistema.matriz(s))
+        self._guardar(clave, lu, lu.nbytes)
+        return lu
+
+    def respuesta(self, sistema, analisis, parametros):
+        # Copia del diccionario guardado con el sistema actual, o None. Los
+        # arreglos son de sólo lectura y se comparten entre aciertos
+        clave = ('resultados', huella(sistema, analisis, *parametros))
+        datos = self._obtener(clave)
+        if datos is not None:
+            self._anotar('resultados', 'aciertos')
+        elif self.directorio is not None:
+            datos = self._leer(clave[1])
+            if datos is not None:
+                self._anotar('resultados', 'aciertos_disco')
+                self._guardar(clave, datos, _tamano(datos))
+        if datos is None:
+            self._anotar('resultados', 'fallos')
+            return None
+        respuesta = dict(datos)
+        respuesta['sistema'] = sistema
+        return respuesta
+
+    def guardar_respuesta(self, sistema, analisis, parametros, respuesta, derivados=()):
+        # Se guarda una copia de sólo lectura de todo salvo el sistema y los
+        # campos que se reconstruyen: la respuesta del llamador no cambia
+        clave = ('resultados', huella(sistema, analisis, *parametros))
+        datos = {k: v for k, v in respuesta.items() if k != 'sistema' and k not in derivados}
+        for k, valor in datos.items():
+            if isinstance(valor, np.ndarray):
+                datos[k] = valor = valor.copy()
+                valor.flags.writeable = False
+        self._guardar(clave, datos, _tamano(datos))
+        if self.directorio is not None:
+            self._escribir(clave[1], datos)
+
+    def _ruta(self, nombre):
+        return os.path.join(self.directorio, nombre + '.npz')
+
+    def _leer(self, nombre):
+        ruta = self._ruta(nombre)
+        try:
+            with np.load(ruta, allow_pickle=False) as archivo:
+                datos = {k: archivo[k] for k in archivo.files}
+            os.utime(ruta)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None
+        for clave, valor in datos.items():
+            if valor.ndim == 0:
+                datos[clave] = valor.item()
+            else:
+                valor.flags.writeable = False
+        return datos
+
+    def _escribir(self, nombre, datos):
+        arreglos = {k: np.asarray(v) for k, v in datos.items()}
+        if any(a.dtype == object for a in arreglos.values()):
+            return
+        # Se escribe aparte y se renombra: otro proceso nunca lee un archivo a medias
+        ruta = self._ruta(nombre)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            np.savez(archivo, **arreglos)
+        os.replace(temporal, ruta)
+        if self.bytes_disco is not None:
+            self._recortar_disco()
+
+    def _recortar_disco(self):
+        # Borra los archivos usados hace más tiempo hasta volver al presupuesto
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith('.npz'):
+                estado = os.stat(os.path.join(self.directorio, nombre))
+                archivos.append((estado.st_mtime, estado.st_size, nombre))
+        total = sum(tamano for _, tamano, _ in archivos)
+        for _, tamano, nombre in sorted(archivos):
+            if total <= self.bytes_disco:
+                break
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            total -= tamano
+
+    def estadisticas(self):
+        return {
+            'bytes': self.bytes,
+            'entradas': len(self._entradas),
+            **{tipo: dict(eventos) for tipo, eventos in self._estadisticas.items()}
+        }
+
+    def limpiar(self):
+        # Sólo la memoria; el directorio se conserva
+        self._entradas.clear()
+        self.bytes = 0
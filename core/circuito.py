@@ -1,81 +1,204 @@
+import numpy as np
+from core.componentes import (Tierra, Resistencia, Capacitor, Inductor, FuenteDC, FuenteAC,
+                              Cable, Diodo, TransistorBJT)
+from core.compilado import CircuitoCompilado, preparar_bloque
+from core.conectividad import IndiceConectividad
+
+# Atributo que cambia Circuito.cambiar_valor cuando no se indica otro
+ATRIBUTOS_VALOR = {
+    Resistencia: 'resistencia',
+    Capacitor: 'capacitancia',
+    Inductor: 'inductancia',
+    FuenteDC: 'voltaje',
+    FuenteAC: 'amplitud'
+}
+
+# Atributos que sólo admiten valores positivos
+ATRIBUTOS_POSITIVOS = ('resistencia', 'capacitancia', 'inductancia')
+
+def _pares(*columnas):
+    # Columnas de nodos (arreglos o un nodo común a todos) como filas
+    columnas = np.broadcast_arrays(*[np.asarray(c) for c in columnas])
+    return np.stack(columnas, axis=-1).reshape(-1, len(columnas))
+
+
 class Circuito:
     def __init__(self):
         self.componentes = []
         self.nodos = set()
         self.conexiones = {}
+        self._compilado = None
+        self.conectividad = IndiceConectividad()
+        
+    @classmethod
+    def desde_componentes(cls, componentes, compilado=None, nodos=None, terminales=None):
+        # Construcción en bloque (p. ej. al cargar un archivo); compilado se conserva
+        circuito = cls()
+        circuito.agregar_componentes(componentes, nodos, terminales)
+        circuito._compilado = compilado
+        return circuito
+        
+    def agregar_componentes(self, componentes, nodos=None, terminales=None):
+        # Como agregar_componente con cada uno, pero con el índice de
+        # conectividad calculado en bloque. nodos y terminales (índices en
+        # nodos, -1 de relleno) se calculan si no se dan
+        componentes = list(componentes)
+        if not componentes:
+            return
+        if terminales is None:
+            indices = {}
+            terminales = [[indices.setdefault(n, len(indices)) for n in c.terminales] for c in componentes]
+            ancho = max(map(len, terminales), default=1)
+            terminales = np.array([t + [-1] * (ancho - len(t)) for t in terminales], dtype=np.int64)
+            nodos = list(indices)
+        terminales = np.asarray(terminales).reshape(len(componentes), -1)
+
+        self._compilado = None
+        self.componentes.extend(componentes)
+        componente, columna = np.nonzero(terminales >= 0)
+        for k, n in zip(componente.tolist(), terminales[componente, columna].tolist()):
+            self.conexiones.setdefault(nodos[n], []).append(componentes[k])
+        self.nodos.update(nodos)
+        self.conectividad.agregar_bloque(componentes, nodos, terminales)
+        
+    def agregar_bloque(self, tipo, nodos, nombres=None, **parametros):
+        # Agrega len(nodos) componentes de la clase tipo de una vez. nodos es
+        # (componentes x terminales) con los nombres de nodo; los parámetros
+        # son arreglos o escalares y los que faltan toman el valor por defecto
+        # del constructor. Sin nombres se numeran dentro de la familia
+        _, nodos, valores = preparar_bloque(tipo, nodos, parametros)
+        if nombres is None:
+            inicio = sum(1 for c in self.componentes if getattr(c, 'tipo', type(c)) is tipo)
+            nombres = map(str, range(inicio, inicio + len(nodos)))
+        elif len(nombres) != len(nodos):
+            raise ValueError("Se necesita un nombre por componente")
+        columnas = [nodos[:, j].tolist() for j in range(nodos.shape[1])]
+        componentes = [tipo(*campos) for campos in zip(nombres, *columnas, *[v.tolist() for v in valores.values()])]
+        # Los terminales ya están en nodos: se numeran sin recorrer los objetos
+        # (salvo con nombres de nodo de tipos mezclados, que no se ordenan)
+        try:
+            unicos, terminales = np.unique(nodos, return_inverse=True)
+        except TypeError:
+            self.agregar_componentes(componentes)
+            return
+        self.agregar_componentes(componentes, unicos.tolist(), terminales.reshape(nodos.shape))
+        
+    # Atajos de agregar_bloque por tipo: nodos y valores son arreglos (o
+    # escalares para los valores) con un elemento por componente
+    def agregar_resistencias(self, nodos1, nodos2, valores, nombres=None):
+        self.agregar_bloque(Resistencia, _pares(nodos1, nodos2), nombres, resistencia=valores)
+        
+    def agregar_capacitores(self, nodos1, nodos2, valores, nombres=None):
+        self.agregar_bloque(Capacitor, _pares(nodos1, nodos2), nombres, capacitancia=valores)
+        
+    def agregar_inductores(self, nodos1, nodos2, valores, nombres=None):
+        self.agregar_bloque(Inductor, _pares(nodos1, nodos2), nombres, inductancia=valores)
+        
+    def agregar_fuentes_dc(self, nodos1, nodos2, voltajes, nombres=None):
+        self.agregar_bloque(FuenteDC, _pares(nodos1, nodos2), nombres, voltaje=voltajes)
+        
+    def agregar_fuentes_ac(self, nodos1, nodos2, amplitudes, frecuencias, fases=0, nombres=None):
+        self.agregar_bloque(FuenteAC, _pares(nodos1, nodos2), nombres, amplitud=amplitudes,
+                            frecuencia=frecuencias, fase=fases)
+        
+    def agregar_cables(self, nodos1, nodos2, nombres=None):
+        self.agregar_bloque(Cable, _pares(nodos1, nodos2), nombres)
+        
+    def agregar_diodos(self, anodos, catodos, nombres=None, **parametros):
+        self.agregar_bloque(Diodo, _pares(anodos, catodos), nombres, **parametros)
+        
+    def agregar_transistores(self, bases, colectores, emisores, nombres=None, **parametros):
+        self.agregar_bloque(TransistorBJT, _pares(bases, colectores, emisores), nombres, **parametros)
+        
+    def agregar_tierras(self, nodos, nombres=None):
+        self.agregar_bloque(Tierra, np.asarray(nodos).reshape(-1, 1), nombres)
         
     def agregar_componente(self, componente):
+        compilado = self._compilado
+        self._compilado = None
+        incremental = compilado is not None and compilado.admite_incremental(componente, self.nodos)
         self.componentes.append(componente)
-        self.nodos.add(componente.nodo1)
-        if componente.nodo2 is not None:
-            self.nodos.add(componente.nodo2)
+        self.nodos.update(componente.terminales)
         self.actualizar_conexiones(componente)
+        self.conectividad.agregar(componente)
+        if incremental:
+            self._compilado = compilado.con_componente(componente)
+            
+    def cambiar_valor(self, componente, valor, atributo=None):
+        if atributo is None:
+            atributo = ATRIBUTOS_VALOR[getattr(componente, 'tipo', type(componente))]
+        if not np.isfinite(valor) or (atributo in ATRIBUTOS_POSITIVOS and valor <= 0):
+            raise ValueError(f"Valor inválido para {atributo}: {valor}")
+        setattr(componente, atributo, valor)
+        try:
+            actualizado = self._compilado is not None and self._compilado.actualizar(componente)
+        except Exception:
+            # La forma compilada ya no es fiable: se recompila al usarla
+            self._compilado = None
+            raise
+        if not actualizado:
+            self._compilado = None
         
     def actualizar_conexiones(self, componente):
-        if componente.nodo1 not in self.conexiones:
-            self.conexiones[componente.nodo1] = []
-        self.conexiones[componente.nodo1].append(componente)
-        
-        if componente.nodo2 is not None:
-            if componente.nodo2 not in self.conexiones:
-                self.conexiones[componente.nodo2] = []
-            self.conexiones[componente.nodo2].append(componente)
+        for nodo in componente.terminales:
+            if nodo not in self.conexiones:
+                self.conexiones[nodo] = []
+            self.conexiones[nodo].append(componente)
             
+    def errores_fatales(self):
+        # Lazos de fuentes de tensión o cables: la matriz MNA sería singular
+        return [f"{c.nombre} cierra un lazo de fuentes de tensión o cables"
+                for c in self._lazos()]
+        
+    def _lazos(self):
+        return self.conectividad.lazos
+        
+    def _grados(self):
+        # (nodo, número de conexiones) en el orden en que aparecen los nodos
+        return ((nodo, len(componentes)) for nodo, componentes in self.conexiones.items())
+        
     def verificar_conexiones(self):
-        problemas = []
+        problemas = self.errores_fatales()
+        indice = self.conectividad
         
-        for nodo, componentes in self.conexiones.items():
+        if self.nodos and not indice.tiene_tierra():
+            problemas.append("El circuito no tiene conexión a tierra")
+        elif indice.tiene_tierra():
+            for isla in indice.islas():
+                if isla and not indice.conectado_a_tierra(isla[0]):
+                    nodos = ", ".join(sorted(map(str, isla)))
+                    problemas.append(f"Los nodos {nodos} forman una isla sin conexión a tierra")
+        
+        for nodo, grado in self._grados():
             if nodo is None:
                 continue
                 
-            if isinstance(componentes[0], Tierra) and len(componentes) > 1:
+            if indice.tierras.get(nodo, 0) > 1:
                 problemas.append(f"Demasiadas conexiones a tierra en nodo {nodo}")
                 
-            if len(componentes) < 2 and not any(isinstance(c, Tierra) for c in componentes):
+            if grado < 2 and nodo not in indice.tierras:
                 problemas.append(f"Nodo {nodo} puede estar flotando")
+            elif indice.conectado_a_tierra(nodo) and not indice.camino_dc(nodo):
+                problemas.append(f"Nodo {nodo} no tiene camino DC a tierra")
                 
         return problemas
         
     def obtener_componentes_conectados(self, nodo):
         return self.conexiones.get(nodo, [])
         
-    def obtener_matrices_nodales(self, frecuencia):
-        num_nodos = len(self.nodos)
-        if num_nodos < 2:
-            return None, None
-            
-        nodo_indices = {nodo: i for i, nodo in enumerate(sorted(self.nodos))}
+    def compilar(self):
+        # Se conserva hasta el siguiente agregar_componente
+        if self._compilado is None:
+            self._compilado = CircuitoCompilado(self.componentes, self.nodos)
+        return self._compilado
         
-        Y = [[0j for _ in range(num_nodos)] for _ in range(num_nodos)]
-        I = [0j for _ in range(num_nodos)]
+    def sistema_mna(self):
+        return self.compilar().mna
         
-        for componente in self.componentes:
-            if isinstance(componente, Tierra):
-                continue
-                
-            z = componente.impedancia(frecuencia)
-            if z == float('inf'):
-                continue
-                
-            n1 = nodo_indices[componente.nodo1]
-            n2 = nodo_indices.get(componente.nodo2, -1)
+    def obtener_matrices_nodales(self, frecuencia):
+        if len(self.nodos) < 2:
+            return None, None
             
-            if z != 0:
-                y = 1 / z
-            else:
-                y = 0
-                
-            if n2 != -1:
-                Y[n1][n1] += y
-                Y[n2][n2] += y
-                Y[n1][n2] -= y
-                Y[n2][n1] -= y
-                
-            if isinstance(componente, (FuenteDC, FuenteAC)):
-                if n2 == -1:
-                    I[n1] += componente.voltaje if isinstance(componente, FuenteDC) else componente.amplitud
-                    
-        Y_reduced = [row[1:] for row in Y[1:]]
-        I_reduced = I[1:]
-        
-        return Y_reduced, I_reduced
\ No newline at end of file
+        sistema = self.sistema_mna()
+        A = sistema.matriz(2j * np.pi * frecuencia if frecuencia else 0)
+        return A, sistema.excitacion(frecuencia)
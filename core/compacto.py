@@ -0,0 +1,439 @@
+import operator
+from collections.abc import Sequence, Mapping
+
+import numpy as np
+from core.componentes import Tierra, TransistorBJT
+from core.circuito import Circuito, ATRIBUTOS_VALOR
+from core.compilado import CircuitoCompilado, FAMILIAS, PARAMETROS, FAMILIA_DE_TIPO, preparar_bloque
+from core.conectividad import IndiceConectividad, TIPOS_TENSION
+
+# Circuito guardado como estructura de arreglos, para circuitos generados de
+# cientos de miles o millones de componentes. Por familia de FAMILIAS:
+#   orden    posición en circuito.componentes (int64)
+#   nombres  nombre de cada componente (str de NumPy)
+#   nodos    índices de nodo (componentes x terminales, int32)
+#   un arreglo float64 por parámetro del constructor (PARAMETROS)
+# más el código de familia y la posición en ella de cada componente. No hay
+# objetos por componente: circuito.componentes crea al pedirlas vistas que
+# leen y escriben en los arreglos y se comportan como los componentes de
+# core.componentes (dos vistas del mismo componente son iguales). Los
+# nombres de nodo se guardan como str.
+#
+#   circuito = CircuitoCompacto()
+#   circuito.agregar_bloque(Resistencia, np.column_stack([n1, n2]), resistencia=valores)
+#   circuito.agregar_componente(Tierra('0', '0'))
+
+CODIGOS = {atributo: codigo for codigo, (atributo, _, _, _) in enumerate(FAMILIAS)}
+_TERMINALES = {atributo: terminales for atributo, _, terminales, _ in FAMILIAS}
+
+# Familias que intervienen en la detección de lazos de tensión
+_FAMILIAS_TENSION = tuple(CODIGOS[atributo] for atributo, tipo, _, _ in FAMILIAS
+                          if issubclass(tipo, (Tierra,) + TIPOS_TENSION))
+
+
+def _crecer(arreglo, usados, nuevos):
+    # La capacidad se duplica: agregar de a uno cuesta O(1) amortizado
+    necesarios = usados + nuevos
+    if necesarios <= len(arreglo):
+        return arreglo
+    ampliado = np.empty((max(necesarios, 2 * len(arreglo)),) + arreglo.shape[1:], dtype=arreglo.dtype)
+    ampliado[:usados] = arreglo[:usados]
+    return ampliado
+
+
+class _Familia:
+    def __init__(self, terminales, parametros):
+        self.n = 0
+        self.orden = np.empty(0, dtype=np.int64)
+        self.nombres = np.empty(0, dtype='<U1')
+        self.nodos = np.empty((0, terminales), dtype=np.int32)
+        self.valores = {p: np.empty(0) for p in parametros}
+
+    def anexar(self, orden, nombres, nodos, valores):
+        n, m = self.n, len(orden)
+        if nombres.dtype.itemsize > self.nombres.dtype.itemsize:
+            self.nombres = self.nombres.astype(nombres.dtype)
+        for campo, datos in (('orden', orden), ('nombres', nombres), ('nodos', nodos)):
+            arreglo = _crecer(getattr(self, campo), n, m)
+            arreglo[n:n + m] = datos
+            setattr(self, campo, arreglo)
+        for p, datos in valores.items():
+            self.valores[p] = _crecer(self.valores[p], n, m)
+            self.valores[p][n:n + m] = datos
+        self.n += m
+
+
+class _Vista:
+    # Componente k de una familia de un CircuitoCompacto
+    __slots__ = ()
+
+    def __eq__(self, otro):
+        return type(otro) is type(self) and otro._circuito is self._circuito and otro._k == self._k
+
+    def __hash__(self):
+        return hash((id(self._circuito), self.familia, self._k))
+
+    def __reduce__(self):
+        return _vista, (self._circuito, self.familia, self._k)
+
+    def _datos(self):
+        return self._circuito._familias[self.familia]
+
+    @property
+    def nombre(self):
+        return str(self._datos().nombres[self._k])
+
+    @property
+    def terminales(self):
+        nombres = self._circuito._nombres_nodos
+        return tuple(nombres[i] for i in self._datos().nodos[self._k].tolist())
+
+
+def _nodo(columna):
+    return property(lambda self: self._circuito._nombres_nodos[self._datos().nodos[self._k, columna]])
+
+
+def _parametro(nombre):
+    def leer(self):
+        return float(self._datos().valores[nombre][self._k])
+
+    def escribir(self, valor):
+        self._datos().valores[nombre][self._k] = valor
+
+    return property(leer, escribir)
+
+
+def _clase_vista(atributo, tipo):
+    campos = {'__slots__': ('_circuito', '_k'), '__module__': __name__, 'familia': atributo, 'tipo': tipo}
+    if tipo is TransistorBJT:
+        campos.update(nodoB=_nodo(0), nodoC=_nodo(1), nodoE=_nodo(2), nodo1=None, nodo2=None)
+    elif tipo is Tierra:
+        campos.update(nodo1=_nodo(0), nodo2=None)
+    else:
+        campos.update(nodo1=_nodo(0), nodo2=_nodo(1))
+    campos.update({p: _parametro(p) for p in PARAMETROS[atributo]})
+    return type(f"Vista{tipo.__name__}", (_Vista, tipo), campos)
+
+
+VISTAS = {atributo: _clase_vista(atributo, tipo) for atributo, tipo, _, _ in FAMILIAS}
+
+
+def _vista(circuito, atributo, k):
+    vista = VISTAS[atributo].__new__(VISTAS[atributo])
+    vista._circuito = circuito
+    vista._k = k
+    return vista
+
+
+class Componentes(Sequence):
+    # circuito.componentes de un CircuitoCompacto
+    def __init__(self, circuito):
+        self._circuito = circuito
+
+    def __len__(self):
+        return self._circuito._total
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        k = operator.index(k)
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        circuito = self._circuito
+        return _vista(circuito, FAMILIAS[circuito._codigos[k]][0], int(circuito._posiciones[k]))
+
+    def __iter__(self):
+        circuito = self._circuito
+        codigos = circuito._codigos[:circuito._total].tolist()
+        posiciones = circuito._posiciones[:circuito._total].tolist()
+        for codigo, k in zip(codigos, posiciones):
+            yield _vista(circuito, FAMILIAS[codigo][0], k)
+
+    def __contains__(self, componente):
+        return (isinstance(componente, _Vista) and componente._circuito is self._circuito
+                and componente._k < componente._datos().n)
+
+
+class _Miembros(Sequence):
+    # Componentes de una familia al compilar (Grupo.componentes)
+    def __init__(self, circuito, atributo, n):
+        self._circuito = circuito
+        self._atributo = atributo
+        self._n = n
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return tuple(self[i] for i in range(*k.indices(self._n)))
+        k = operator.index(k)
+        if k < 0:
+            k += self._n
+        if not 0 <= k < self._n:
+            raise IndexError(k)
+        return _vista(self._circuito, self._atributo, k)
+
+    def __iter__(self):
+        for k in range(self._n):
+            yield _vista(self._circuito, self._atributo, k)
+
+    def __add__(self, otro):
+        return tuple(self) + tuple(otro)
+
+    def __radd__(self, otro):
+        return tuple(otro) + tuple(self)
+
+
+class _Ubicaciones(Mapping):
+    # CircuitoCompilado.ubicaciones sin un diccionario por componente
+    def __init__(self, circuito, tamanos):
+        self._circuito = circuito
+        self._tamanos = tamanos
+
+    def __getitem__(self, componente):
+        if (isinstance(componente, _Vista) and componente._circuito is self._circuito
+                and componente._k < self._tamanos[componente.familia]):
+            return componente.familia, componente._k
+        raise KeyError(componente)
+
+    def __iter__(self):
+        for atributo, n in self._tamanos.items():
+            for k in range(n):
+                yield _vista(self._circuito, atributo, k)
+
+    def __len__(self):
+        return sum(self._tamanos.values())
+
+
+class CircuitoCompacto(Circuito):
+    def __init__(self):
+        self._familias = {atributo: _Familia(terminales, PARAMETROS[atributo])
+                          for atributo, _, terminales, _ in FAMILIAS}
+        self._codigos = np.empty(0, dtype=np.int8)
+        self._posiciones = np.empty(0, dtype=np.int64)
+        self._total = 0
+        self._nombres_nodos = []
+        self._indice_nodos = {}
+        self._compilado = None
+        self._conectividad = None
+        self._lazos_tension = None
+
+    @classmethod
+    def desde_componentes(cls, componentes):
+        circuito = cls()
+        circuito.agregar_componentes(componentes)
+        return circuito
+
+    @classmethod
+    def desde_arreglos(cls, nodos, familias):
+        # nodos: nombres de nodo; familias[atributo] = {'orden', 'nombres',
+        # 'nodos' (índices en nodos), parámetros}, como los de arreglos()
+        circuito = cls()
+        mapa = circuito._registrar_nodos(np.asarray(nodos).astype(str))
+        total = sum(len(datos['orden']) for datos in familias.values())
+        circuito._reservar(total)
+        for atributo, datos in familias.items():
+            circuito._anexar(atributo, np.asarray(datos['orden']) + circuito._total, datos['nombres'],
+                             mapa[datos['nodos']], {p: datos[p] for p in PARAMETROS[atributo]})
+        circuito._total += total
+        return circuito
+
+    @property
+    def componentes(self):
+        return Componentes(self)
+
+    @property
+    def nodos(self):
+        return self._indice_nodos.keys()
+
+    @property
+    def conexiones(self):
+        # Sólo por compatibilidad: crea una vista por conexión
+        conexiones = {nodo: [] for nodo in self._nombres_nodos}
+        orden, nodos = self._terminales()
+        for k, n in zip(orden.tolist(), nodos.tolist()):
+            conexiones[self._nombres_nodos[n]].append(self.componentes[k])
+        return conexiones
+
+    @property
+    def conectividad(self):
+        # Se calcula en bloque al pedirla y se conserva hasta el siguiente cambio
+        if self._conectividad is None:
+            terminales = np.full((self._total, 3), -1, dtype=np.int64)
+            for datos in self._familias.values():
+                terminales[datos.orden[:datos.n], :datos.nodos.shape[1]] = datos.nodos[:datos.n]
+            tipos = np.array([tipo for _, tipo, _, _ in FAMILIAS], dtype=object)[self._codigos[:self._total]]
+            indice = IndiceConectividad()
+            indice.agregar_bloque(self.componentes, self._nombres_nodos, terminales, tipos)
+            self._conectividad = indice
+        return self._conectividad
+
+    def _terminales(self):
+        # (componente, nodo) de cada conexión, en el orden de los componentes
+        orden = np.concatenate([np.repeat(d.orden[:d.n], d.nodos.shape[1]) for d in self._familias.values()])
+        nodos = np.concatenate([d.nodos[:d.n].ravel() for d in self._familias.values()])
+        secuencia = np.argsort(orden, kind='stable')
+        return orden[secuencia], nodos[secuencia]
+
+    def _lazos(self):
+        # Basta con las tierras y los elementos de tensión
+        if self._conectividad is not None:
+            return self._conectividad.lazos
+        if self._lazos_tension is None:
+            filas = np.flatnonzero(np.isin(self._codigos[:self._total], _FAMILIAS_TENSION))
+            indice = IndiceConectividad()
+            indice.agregar_tension(self.componentes[k] for k in filas.tolist())
+            self._lazos_tension = indice.lazos
+        return self._lazos_tension
+
+    def _grados(self):
+        grados = np.zeros(len(self._nombres_nodos), dtype=np.int64)
+        for datos in self._familias.values():
+            grados += np.bincount(datos.nodos[:datos.n].ravel(), minlength=len(grados))
+        return zip(self._nombres_nodos, grados.tolist())
+
+    def _modificado(self):
+        self._compilado = None
+        self._conectividad = None
+        self._lazos_tension = None
+
+    def _registrar_nodos(self, etiquetas):
+        # Índices de los nodos de etiquetas (cualquier forma); los nuevos se
+        # numeran en orden de aparición
+        etiquetas = np.asarray(etiquetas)
+        if not etiquetas.size:
+            return np.zeros(etiquetas.shape, dtype=np.int32)
+        unicas, primeras, inversa = np.unique(etiquetas.ravel(), return_index=True, return_inverse=True)
+        orden = np.argsort(primeras, kind='stable')
+        nombres = list(map(str, unicas[orden].tolist()))
+        encontrados = np.full(len(nombres), -1, dtype=np.int64)
+        if self._indice_nodos:
+            encontrados[:] = [-1 if i is None else i for i in map(self._indice_nodos.get, nombres)]
+        nuevos = np.flatnonzero(encontrados < 0)
+        encontrados[nuevos] = np.arange(len(self._nombres_nodos), len(self._nombres_nodos) + len(nuevos))
+        nombres_nuevos = [nombres[k] for k in nuevos.tolist()]
+        self._nombres_nodos.extend(nombres_nuevos)
+        self._indice_nodos.update(zip(nombres_nuevos, encontrados[nuevos].tolist()))
+        indices = np.empty(len(unicas), dtype=np.int32)
+        indices[orden] = encontrados
+        return indices[inversa].reshape(etiquetas.shape)
+
+    def _reservar(self, nuevos):
+        self._codigos = _crecer(self._codigos, self._total, nuevos)
+        self._posiciones = _crecer(self._posiciones, self._total, nuevos)
+
+    def _anexar(self, atributo, orden, nombres, nodos, valores):
+        # orden: posiciones (ya reservadas) en componentes
+        datos = self._familias[atributo]
+        self._codigos[orden] = CODIGOS[atributo]
+        self._posiciones[orden] = np.arange(datos.n, datos.n + len(orden))
+        datos.anexar(orden, np.asarray(nombres).astype(str), nodos, valores)
+        self._modificado()
+
+    def agregar_bloque(self, tipo, nodos, nombres=None, **parametros):
+        # Como Circuito.agregar_bloque, pero sin crear objetos
+        atributo, nodos, valores = preparar_bloque(tipo, nodos, parametros)
+        n = len(nodos)
+        datos = self._familias[atributo]
+        if nombres is None:
+            nombres = np.array(list(map(str, range(datos.n, datos.n + n))))
+        elif len(nombres) != n:
+            raise ValueError("Se necesita un nombre por componente")
+
+        indices = self._registrar_nodos(nodos)
+        self._reservar(n)
+        self._anexar(atributo, np.arange(self._total, self._total + n), nombres, indices, valores)
+        self._total += n
+
+    def agregar_componentes(self, componentes):
+        # En bloque, conservando el orden; los componentes se copian a los
+        # arreglos (las vistas en componentes no son los objetos dados)
+        componentes = list(componentes)
+        familias = [FAMILIA_DE_TIPO[getattr(c, 'tipo', type(c))] for c in componentes]
+        terminales = [c.terminales for c in componentes]
+        indices = self._registrar_nodos(np.array([n for t in terminales for n in t], dtype=object))
+        inicios = np.cumsum([0] + [len(t) for t in terminales])
+
+        self._reservar(len(componentes))
+        por_familia = {}
+        for k, atributo in enumerate(familias):
+            por_familia.setdefault(atributo, []).append(k)
+        for atributo, filas in por_familia.items():
+            miembros = [componentes[k] for k in filas]
+            nodos = np.array([indices[inicios[k]:inicios[k + 1]] for k in filas], dtype=np.int32)
+            valores = {p: np.array([getattr(c, p) for c in miembros], dtype=float) for p in PARAMETROS[atributo]}
+            self._anexar(atributo, self._total + np.array(filas), [str(c.nombre) for c in miembros],
+                         nodos.reshape(len(filas), _TERMINALES[atributo]), valores)
+        self._total += len(componentes)
+
+    def agregar_componente(self, componente):
+        # Devuelve la vista del componente agregado
+        self.agregar_componentes([componente])
+        return self.componentes[-1]
+
+    def cambiar_valor(self, componente, valor, atributo=None):
+        if componente not in self.componentes:
+            raise ValueError(f"{componente} no pertenece al circuito")
+        if atributo is None:
+            atributo = ATRIBUTOS_VALOR[componente.tipo]
+        super().cambiar_valor(componente, valor, atributo)
+
+    def actualizar_conexiones(self, componente):
+        # Las conexiones se calculan desde los arreglos
+        pass
+
+    def obtener_componentes_conectados(self, nodo):
+        i = self._indice_nodos.get(nodo)
+        if i is None:
+            return []
+        orden, nodos = self._terminales()
+        return [self.componentes[k] for k in orden[nodos == i].tolist()]
+
+    def ubicacion(self, componente):
+        # (familia, posición en ella) de un componente del circuito
+        if componente not in self.componentes:
+            raise ValueError(f"{componente} no pertenece al circuito")
+        return componente.familia, componente._k
+
+    def arreglos(self):
+        # (nombres de nodo, {familia: {'orden', 'nombres', 'nodos', parámetros}})
+        # sin copiar: no deben modificarse
+        familias = {}
+        for atributo, datos in self._familias.items():
+            familias[atributo] = {'orden': datos.orden[:datos.n], 'nombres': datos.nombres[:datos.n],
+                                  'nodos': datos.nodos[:datos.n],
+                                  **{p: v[:datos.n] for p, v in datos.valores.items()}}
+        return list(self._nombres_nodos), familias
+
+    def compilar(self):
+        if self._compilado is None:
+            self._compilado = self._compilar()
+        return self._compilado
+
+    def _compilar(self):
+        # Misma numeración que CircuitoCompilado: nodos ordenados por nombre,
+        # los de tierra (o el primero, si no hay) como referencia
+        nombres = self._nombres_nodos
+        orden = np.argsort(np.array(nombres, dtype=str), kind='stable')
+        tierras = self._familias['tierras']
+        referencia = np.zeros(len(nombres), dtype=bool)
+        referencia[tierras.nodos[:tierras.n, 0]] = True
+        if not referencia.any() and len(nombres):
+            referencia[orden[0]] = True
+        libres = orden[~referencia[orden]]
+        mapa = np.full(len(nombres), -1, dtype=np.int64)
+        mapa[libres] = np.arange(len(libres))
+        nodo_indices = {nombres[i]: -1 for i in orden[referencia[orden]].tolist()}
+        nodo_indices.update(zip([nombres[i] for i in libres.tolist()], range(len(libres))))
+
+        grupos = {}
+        tamanos = {}
+        for atributo, datos in self._familias.items():
+            tamanos[atributo] = datos.n
+            grupos[atributo] = (_Miembros(self, atributo, datos.n), mapa[datos.nodos[:datos.n]],
+                                {p: v[:datos.n] for p, v in datos.valores.items()})
+        libres = [nombres[i] for i in libres.tolist()]
+        return CircuitoCompilado.desde_arreglos(libres, nodo_indices, grupos, _Ubicaciones(self, tamanos))
@@ -0,0 +1,265 @@
+import copy
+import inspect
+from collections.abc import Sequence, MutableSequence
+from types import SimpleNamespace
+
+import numpy as np
+from core.componentes import (Resistencia, Capacitor, Inductor, FuenteDC, FuenteAC,
+                              Tierra, Cable, Diodo, TransistorBJT)
+from core.mna import SistemaMNA
+from core.instrumentacion import medido, anotar
+
+# (atributo, tipo, terminales, valores por componente). El orden de las
+# familias con rama define el orden de las filas de rama en la matriz MNA.
+FAMILIAS = (
+    ('resistencias', Resistencia, 2, {'valor': lambda c: c.resistencia}),
+    ('capacitores', Capacitor, 2, {'valor': lambda c: c.capacitancia}),
+    ('inductores', Inductor, 2, {'valor': lambda c: c.inductancia}),
+    ('fuentes_dc', FuenteDC, 2, {'voltaje': lambda c: c.voltaje}),
+    ('fuentes_ac', FuenteAC, 2, {'amplitud': lambda c: c.amplitud,
+                                 'frecuencia': lambda c: c.frecuencia,
+                                 'fase': lambda c: c.fase}),
+    ('cables', Cable, 2, {}),
+    ('diodos', Diodo, 2, {'Is': lambda c: c.Is, 'nVt': lambda c: c.n * c.Vt}),
+    ('transistores', TransistorBJT, 3, {'Is': lambda c: c.Is, 'Vt': lambda c: c.Vt,
+                                        'beta': lambda c: c.beta, 'beta_r': lambda c: c.beta_r}),
+    ('tierras', Tierra, 1, {}),
+)
+FAMILIAS_RAMA = ('fuentes_dc', 'fuentes_ac', 'cables', 'inductores')
+
+# Parámetros del constructor de cada familia después del nombre y los nodos
+PARAMETROS = {
+    'resistencias': ('resistencia',),
+    'capacitores': ('capacitancia',),
+    'inductores': ('inductancia',),
+    'fuentes_dc': ('voltaje',),
+    'fuentes_ac': ('amplitud', 'frecuencia', 'fase'),
+    'cables': (),
+    'diodos': ('Is', 'Vt', 'n'),
+    'transistores': ('beta', 'Vbe_on', 'Is', 'Vt', 'beta_r'),
+    'tierras': (),
+}
+FAMILIA_DE_TIPO = {tipo: atributo for atributo, tipo, _, _ in FAMILIAS}
+
+# Familias cuyo valor tiene que ser positivo (R = 0 o C = 0 no tienen estampado)
+FAMILIAS_POSITIVAS = ('resistencias', 'capacitores', 'inductores')
+
+# Valores por defecto de los parámetros opcionales de cada constructor
+DEFECTOS = {
+    atributo: {p: inspect.signature(tipo).parameters[p].default for p in PARAMETROS[atributo]
+               if inspect.signature(tipo).parameters[p].default is not inspect.Parameter.empty}
+    for atributo, tipo, _, _ in FAMILIAS
+}
+
+
+def preparar_bloque(tipo, nodos, parametros):
+    # Argumentos de agregar_bloque: devuelve la familia, los nodos como
+    # arreglo (componentes x terminales) y un arreglo por parámetro del
+    # constructor (escalares repetidos; los que faltan, por defecto)
+    if tipo not in FAMILIA_DE_TIPO:
+        raise ValueError(f"Tipo de componente desconocido: {tipo.__name__}")
+    atributo = FAMILIA_DE_TIPO[tipo]
+    terminales = next(t for a, _, t, _ in FAMILIAS if a == atributo)
+    nodos = np.asarray(nodos)
+    if nodos.size == 0 or (nodos.ndim == 1 and terminales == 1):
+        nodos = nodos.reshape(-1, terminales)
+    if nodos.ndim != 2 or nodos.shape[1] != terminales:
+        raise ValueError(f"{tipo.__name__} necesita {terminales} nodos por componente")
+
+    desconocidos = set(parametros) - set(PARAMETROS[atributo])
+    if desconocidos:
+        raise ValueError(f"Parámetro desconocido para {tipo.__name__}: {desconocidos.pop()}")
+    valores = {}
+    for p in PARAMETROS[atributo]:
+        if p not in parametros and p not in DEFECTOS[atributo]:
+            raise ValueError(f"Falta el parámetro {p} de {tipo.__name__}")
+        valor = np.asarray(parametros.get(p, DEFECTOS[atributo].get(p)), dtype=float)
+        valores[p] = np.broadcast_to(valor, (len(nodos),))
+    return atributo, nodos, valores
+
+
+def ordenar_nodos(nodos):
+    return sorted(nodos, key=str)
+
+
+def _solo_lectura(arreglo, dtype, forma=None):
+    arreglo = np.array(arreglo, dtype=dtype)
+    if forma is not None:
+        arreglo = arreglo.reshape(forma)
+    arreglo.flags.writeable = False
+    return arreglo
+
+
+class Grupo:
+    # Componentes de un mismo tipo: nodos (n x terminales) y valores en
+    # arreglos contiguos de sólo lectura
+    def __init__(self, componentes, nodos, terminales, valores):
+        # Las secuencias de sólo lectura (tuplas, vistas de core.compacto) se
+        # conservan sin copiar
+        if not isinstance(componentes, Sequence) or isinstance(componentes, MutableSequence):
+            componentes = tuple(componentes)
+        self.componentes = componentes
+        self.nodos = _solo_lectura(nodos, np.int64, (len(self.componentes), terminales))
+        self.nombres_valores = tuple(valores)
+        for nombre, valor in valores.items():
+            setattr(self, nombre, _solo_lectura(valor, float))
+        self.rama = _solo_lectura(np.zeros(0), np.int64)
+
+    def __len__(self):
+        return len(self.componentes)
+
+    def _asignar(self, nombre, k, valor):
+        arreglo = getattr(self, nombre)
+        arreglo.flags.writeable = True
+        arreglo[k] = valor
+        arreglo.flags.writeable = False
+
+    @property
+    def n1(self):
+        return self.nodos[:, 0]
+
+    @property
+    def n2(self):
+        return self.nodos[:, 1]
+
+
+class CircuitoCompilado:
+    # Representación compilada de un Circuito: nodos como enteros (-1 es la
+    # referencia), un Grupo por tipo de componente y el sistema MNA con su
+    # patrón disperso ya calculado. La numeración y la topología son fijas;
+    # actualizar() cambia en su sitio los valores de los Grupos y de la
+    # matriz, y con_componente() devuelve una copia con un pasivo más
+    def __init__(self, componentes, nodos):
+        tierras = {c.nodo1 for c in componentes if isinstance(c, Tierra)}
+        nodos = ordenar_nodos(nodos)
+        if not tierras and nodos:
+            tierras = {nodos[0]}
+
+        libres = [nodo for nodo in nodos if nodo not in tierras]
+        nodo_indices = {nodo: -1 for nodo in tierras}
+        nodo_indices.update({nodo: i for i, nodo in enumerate(libres)})
+
+        por_tipo = {}
+        for componente in componentes:
+            por_tipo.setdefault(getattr(componente, 'tipo', type(componente)), []).append(componente)
+
+        grupos = {}
+        for atributo, tipo, terminales, campos in FAMILIAS:
+            miembros = por_tipo.get(tipo, [])
+            nodos_grupo = [[nodo_indices[n] for n in c.terminales] for c in miembros]
+            valores = {nombre: [f(c) for c in miembros] for nombre, f in campos.items()}
+            grupos[atributo] = (miembros, nodos_grupo, valores)
+        self._iniciar(libres, nodo_indices, grupos)
+
+    @classmethod
+    def desde_arreglos(cls, libres, nodo_indices, grupos, ubicaciones=None):
+        # Construcción directa a partir de arreglos ya empaquetados (p. ej. al
+        # cargar un archivo): grupos[familia] = (componentes, índices de nodo,
+        # {atributo: arreglo}) con los atributos de los componentes; los
+        # campos de cada Grupo se calculan vectorizados con FAMILIAS.
+        # ubicaciones (componente -> (familia, k)) se calcula si no se da
+        compilado = cls.__new__(cls)
+        calculados = {}
+        for atributo, _, _, campos in FAMILIAS:
+            miembros, nodos_grupo, atributos = grupos[atributo]
+            arreglos = SimpleNamespace(**{k: np.asarray(v, dtype=float) for k, v in atributos.items()})
+            valores = {nombre: np.broadcast_to(f(arreglos), (len(miembros),)) if len(miembros) else []
+                       for nombre, f in campos.items()}
+            calculados[atributo] = (miembros, nodos_grupo, valores)
+        compilado._iniciar(libres, nodo_indices, calculados, ubicaciones)
+        return compilado
+
+    @medido('compilacion')
+    def _iniciar(self, libres, nodo_indices, grupos, ubicaciones=None):
+        self.nodos = tuple(libres)
+        self.nodo_indices = nodo_indices
+        self.num_nodos = len(libres)
+
+        self.ubicaciones = ubicaciones
+        for atributo, tipo, terminales, campos in FAMILIAS:
+            miembros, nodos_grupo, valores = grupos[atributo]
+            setattr(self, atributo, Grupo(miembros, nodos_grupo, terminales, valores))
+        if ubicaciones is None:
+            self.ubicaciones = {}
+            for atributo, grupo in self.grupos():
+                self.ubicaciones.update((c, (atributo, k)) for k, c in enumerate(grupo.componentes))
+
+        fila = self.num_nodos
+        ramas = []
+        for atributo in FAMILIAS_RAMA:
+            grupo = getattr(self, atributo)
+            grupo.rama = _solo_lectura(np.arange(fila, fila + len(grupo)), np.int64)
+            fila += len(grupo)
+            ramas.extend(grupo.componentes)
+        self.ramas = tuple(ramas)
+        self.dimension = fila
+
+        self.mna = SistemaMNA(self)
+        anotar('dimension', self.dimension)
+        anotar('nnz', self.mna.patron.nnz)
+
+    def actualizar(self, componente):
+        # Relee los valores de un componente ya compilado y corrige sólo las
+        # entradas afectadas de la matriz. Devuelve False si no está compilado.
+        # Las correcciones se calculan antes de modificar nada, así un valor
+        # inválido no deja el grupo y la matriz a medias
+        if componente not in self.ubicaciones:
+            return False
+        familia, k = self.ubicaciones[componente]
+        grupo = getattr(self, familia)
+        campos = next(c for atributo, _, _, c in FAMILIAS if atributo == familia)
+        cambios = []
+        for nombre, f in campos.items():
+            anterior = float(getattr(grupo, nombre)[k])
+            nuevo = float(f(componente))
+            if nuevo == anterior:
+                continue
+            if not np.isfinite(nuevo) or (familia in FAMILIAS_POSITIVAS and nuevo <= 0):
+                raise ValueError(f"Valor inválido para {componente.nombre}: {nuevo}")
+            if familia == 'resistencias':
+                correccion = (grupo.nodos[k], (1, -1), 1 / nuevo - 1 / anterior, 0.0)
+            elif familia == 'capacitores':
+                correccion = (grupo.nodos[k], (1, -1), 0.0, nuevo - anterior)
+            elif familia == 'inductores':
+                correccion = ([grupo.rama[k]], (1,), 0.0, -(nuevo - anterior))
+            else:
+                correccion = None
+            cambios.append((nombre, nuevo, correccion))
+        for nombre, nuevo, correccion in cambios:
+            grupo._asignar(nombre, k, nuevo)
+            if correccion is not None:
+                self.mna.actualizar(*correccion)
+        return True
+
+    def admite_incremental(self, componente, nodos):
+        # Un componente pasivo sin fila de rama entre nodos ya existentes no
+        # cambia la numeración: basta una corrección de rango uno
+        return (getattr(componente, 'tipo', type(componente)) in (Resistencia, Capacitor)
+                and all(self.nodo_indices.get(n, None) is not None for n in componente.terminales)
+                and len(nodos) == len(self.nodo_indices))
+
+    def con_componente(self, componente):
+        # Copia que añade el componente al final de su grupo sin recompilar el
+        # resto: el sistema MNA amplía el patrón existente y hereda las
+        # factorizaciones con la corrección correspondiente
+        familia = 'resistencias' if isinstance(componente, Resistencia) else 'capacitores'
+        grupo = getattr(self, familia)
+        campos = next(c for atributo, _, _, c in FAMILIAS if atributo == familia)
+        indices = [self.nodo_indices[n] for n in componente.terminales]
+
+        nuevo = copy.copy(self)
+        valores = {nombre: np.append(getattr(grupo, nombre), f(componente)) for nombre, f in campos.items()}
+        setattr(nuevo, familia, Grupo(grupo.componentes + (componente,),
+                                      np.vstack([grupo.nodos, [indices]]), 2, valores))
+        nuevo.ubicaciones = dict(self.ubicaciones)
+        nuevo.ubicaciones[componente] = (familia, len(grupo))
+
+        if familia == 'resistencias':
+            deltas = (1 / componente.resistencia, 0.0)
+        else:
+            deltas = (0.0, componente.capacitancia)
+        nuevo.mna = self.mna.con_admitancia(nuevo, *indices, *deltas)
+        return nuevo
+
+    def grupos(self):
+        return [(atributo, getattr(self, atributo)) for atributo, _, _, _ in FAMILIAS]
@@ -2,11 +2,24 @@ import numpy as np
 from abc import ABC, abstractmethod
 
 class Componente(ABC):
+    # Sin __dict__ por instancia: con cientos de miles de componentes es la
+    # mayor parte de la memoria del circuito. Cada subclase declara sus campos
+    __slots__ = ('nombre', 'nodo1', 'nodo2')
+
     def __init__(self, nombre, nodo1, nodo2):
         self.nombre = nombre
         self.nodo1 = nodo1
         self.nodo2 = nodo2
         
+    @property
+    def terminales(self):
+        return tuple(n for n in (self.nodo1, self.nodo2) if n is not None)
+        
+    def puntos_quiebre(self, tiempo_final):
+        # Instantes en los que la excitación es discontinua (el paso adaptativo
+        # se detiene exactamente en ellos)
+        return ()
+        
     @abstractmethod
     def impedancia(self, frecuencia):
         pass
@@ -16,6 +29,8 @@ class Componente(ABC):
         pass
 
 class Resistencia(Componente):
+    __slots__ = ('resistencia',)
+
     def __init__(self, nombre, nodo1, nodo2, resistencia):
         super().__init__(nombre, nodo1, nodo2)
         self.resistencia = resistencia
@@ -27,6 +42,8 @@ class Resistencia(Componente):
         return f"R{self.nombre} ({self.resistencia} Ω)"
 
 class Capacitor(Componente):
+    __slots__ = ('capacitancia',)
+
     def __init__(self, nombre, nodo1, nodo2, capacitancia):
         super().__init__(nombre, nodo1, nodo2)
         self.capacitancia = capacitancia
@@ -40,6 +57,8 @@ class Capacitor(Componente):
         return f"C{self.nombre} ({self.capacitancia} F)"
 
 class Inductor(Componente):
+    __slots__ = ('inductancia',)
+
     def __init__(self, nombre, nodo1, nodo2, inductancia):
         super().__init__(nombre, nodo1, nodo2)
         self.inductancia = inductancia
@@ -53,6 +72,8 @@ class Inductor(Componente):
         return f"L{self.nombre} ({self.inductancia} H)"
 
 class FuenteDC(Componente):
+    __slots__ = ('voltaje',)
+
     def __init__(self, nombre, nodo1, nodo2, voltaje):
         super().__init__(nombre, nodo1, nodo2)
         self.voltaje = voltaje
@@ -64,6 +85,8 @@ class FuenteDC(Componente):
         return f"V{self.nombre} DC ({self.voltaje} V)"
 
 class FuenteAC(Componente):
+    __slots__ = ('amplitud', 'frecuencia', 'fase')
+
     def __init__(self, nombre, nodo1, nodo2, amplitud, frecuencia, fase=0):
         super().__init__(nombre, nodo1, nodo2)
         self.amplitud = amplitud
@@ -80,6 +103,8 @@ class FuenteAC(Componente):
         return f"V{self.nombre} AC ({self.amplitud} V, {self.frecuencia} Hz)"
 
 class Tierra(Componente):
+    __slots__ = ()
+
     def __init__(self, nombre, nodo):
         super().__init__(nombre, nodo, None)
         
@@ -90,6 +115,8 @@ class Tierra(Componente):
         return f"GND{self.nombre}"
 
 class Cable(Componente):
+    __slots__ = ()
+
     def __init__(self, nombre, nodo1, nodo2):
         super().__init__(nombre, nodo1, nodo2)
         
@@ -100,6 +127,8 @@ class Cable(Componente):
         return f"Wire{self.nombre}"
 
 class Diodo(Componente):
+    __slots__ = ('Is', 'Vt', 'n')
+
     def __init__(self, nombre, nodo1, nodo2, Is=1e-12, Vt=0.02585, n=1):
         super().__init__(nombre, nodo1, nodo2)
         self.Is = Is
@@ -119,13 +148,22 @@ class Diodo(Componente):
         return f"D{self.nombre}"
 
 class TransistorBJT(Componente):
-    def __init__(self, nombre, nodoB, nodoC, nodoE, beta=100, Vbe_on=0.7):
+    __slots__ = ('nodoB', 'nodoC', 'nodoE', 'beta', 'Vbe_on', 'Is', 'Vt', 'beta_r')
+
+    def __init__(self, nombre, nodoB, nodoC, nodoE, beta=100, Vbe_on=0.7, Is=1e-14, Vt=0.02585, beta_r=1):
         super().__init__(nombre, None, None)
         self.nodoB = nodoB
         self.nodoC = nodoC
         self.nodoE = nodoE
         self.beta = beta
         self.Vbe_on = Vbe_on
+        self.Is = Is
+        self.Vt = Vt
+        self.beta_r = beta_r
+        
+    @property
+    def terminales(self):
+        return (self.nodoB, self.nodoC, self.nodoE)
         
     def impedancia(self, frecuencia, Vbe=0, Vce=0):
         if Vbe < self.Vbe_on:
@@ -0,0 +1,176 @@
+import numpy as np
+
+from core.componentes import Tierra, Capacitor, FuenteDC, FuenteAC, Cable
+
+
+class _Referencia:
+    # Nodo virtual al que se unen todos los nodos con Tierra
+    def __eq__(self, otro):
+        return isinstance(otro, _Referencia)
+
+    def __hash__(self):
+        return hash(_Referencia)
+
+    def __repr__(self):
+        return "tierra"
+
+
+REFERENCIA = _Referencia()
+
+# Elementos que fijan una diferencia de tensión: un lazo formado sólo por
+# ellos deja la matriz MNA singular
+TIPOS_TENSION = (FuenteDC, FuenteAC, Cable)
+
+
+class ConjuntosDisjuntos:
+    # Unión por tamaño con compresión de caminos: operaciones en tiempo casi constante
+    def __init__(self):
+        self.padre = {}
+        self.tamano = {}
+
+    def __contains__(self, elemento):
+        return elemento in self.padre
+
+    def agregar(self, elemento):
+        if elemento not in self.padre:
+            self.padre[elemento] = elemento
+            self.tamano[elemento] = 1
+
+    def encontrar(self, elemento):
+        padre = self.padre
+        while padre[elemento] != elemento:
+            padre[elemento] = padre[padre[elemento]]
+            elemento = padre[elemento]
+        return elemento
+
+    def unir(self, a, b):
+        # Devuelve False si ya estaban en el mismo conjunto
+        self.agregar(a)
+        self.agregar(b)
+        raiz_a, raiz_b = self.encontrar(a), self.encontrar(b)
+        if raiz_a == raiz_b:
+            return False
+        if self.tamano[raiz_a] < self.tamano[raiz_b]:
+            raiz_a, raiz_b = raiz_b, raiz_a
+        self.padre[raiz_b] = raiz_a
+        self.tamano[raiz_a] += self.tamano.pop(raiz_b)
+        return True
+
+    def unir_grupos(self, elementos, etiquetas):
+        # Une de una vez los elementos con la misma etiqueta (componentes
+        # conexas ya calculadas); si la estructura está vacía no hace falta unir
+        vacia = not self.padre
+        representantes = {}
+        for elemento, etiqueta in zip(elementos, etiquetas):
+            raiz = representantes.setdefault(etiqueta, elemento)
+            if vacia:
+                self.padre[elemento] = raiz
+                self.tamano[raiz] = self.tamano.get(raiz, 0) + 1
+            else:
+                self.unir(raiz, elemento)
+
+    def conectados(self, a, b):
+        if a not in self.padre or b not in self.padre:
+            return False
+        return self.encontrar(a) == self.encontrar(b)
+
+    def conjuntos(self):
+        grupos = {}
+        for elemento in self.padre:
+            grupos.setdefault(self.encontrar(elemento), []).append(elemento)
+        return list(grupos.values())
+
+
+class IndiceConectividad:
+    # Se actualiza con cada componente agregado y responde sin recorrer el circuito:
+    #   general  - cualquier conexión (islas, conexión a tierra)
+    #   continua - conexiones con camino en DC (todo salvo capacitores)
+    #   tension  - fuentes de tensión y cables (detección de lazos)
+    def __init__(self):
+        self.general = ConjuntosDisjuntos()
+        self.continua = ConjuntosDisjuntos()
+        self.tension = ConjuntosDisjuntos()
+        self.tierras = {}
+        self.lazos = []
+
+    def agregar(self, componente):
+        terminales = componente.terminales
+        for nodo in terminales:
+            self.general.agregar(nodo)
+            self.continua.agregar(nodo)
+            self.tension.agregar(nodo)
+
+        if isinstance(componente, Tierra):
+            self.general.unir(terminales[0], REFERENCIA)
+            self.continua.unir(terminales[0], REFERENCIA)
+        else:
+            primero = terminales[0]
+            for nodo in terminales[1:]:
+                self.general.unir(primero, nodo)
+                if not isinstance(componente, Capacitor):
+                    self.continua.unir(primero, nodo)
+        self._agregar_tension(componente)
+
+    def _agregar_tension(self, componente):
+        if isinstance(componente, Tierra):
+            nodo = componente.terminales[0]
+            self.tierras[nodo] = self.tierras.get(nodo, 0) + 1
+            if not self.tension.unir(nodo, REFERENCIA) and self.tierras[nodo] == 1:
+                self.lazos.append(componente)
+        elif isinstance(componente, TIPOS_TENSION) and not self.tension.unir(*componente.terminales):
+            self.lazos.append(componente)
+
+    def agregar_tension(self, componentes):
+        # Sólo la detección de lazos (tension y tierras): basta para los
+        # errores fatales sin indexar todos los nodos del circuito
+        for componente in componentes:
+            self._agregar_tension(componente)
+
+    def agregar_bloque(self, componentes, nodos, terminales, tipos=None):
+        # Equivale a agregar los componentes en orden. terminales tiene los
+        # índices en nodos de cada componente (-1 de relleno): general y
+        # continua salen de las componentes conexas del grafo y sólo las
+        # tierras y los elementos de tensión se procesan uno a uno. tipos
+        # (la clase de cada componente) evita recorrer componentes
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        terminales = np.asarray(terminales, dtype=np.int64).reshape(len(componentes), -1)
+        if terminales.shape[1] < 2:
+            terminales = np.pad(terminales, ((0, 0), (0, 2 - terminales.shape[1])), constant_values=-1)
+        # Clasificación por tipo (una comprobación por clase, no por componente)
+        if tipos is None:
+            tipos = [type(c) for c in componentes]
+        clases = {tipo: (issubclass(tipo, Tierra), issubclass(tipo, Capacitor),
+                         issubclass(tipo, (Tierra,) + TIPOS_TENSION)) for tipo in set(tipos)}
+        es_tierra, es_capacitor, secuencial = np.array([clases[tipo] for tipo in tipos],
+                                                       dtype=bool).reshape(-1, 3).T
+
+        # Aristas del primer terminal a los demás; las tierras van a REFERENCIA
+        destino = terminales[:, 1:].copy()
+        destino[es_tierra, 0] = len(nodos)
+        origen = np.broadcast_to(terminales[:, :1], destino.shape)
+        validas = destino >= 0
+        continuas = validas & ~es_capacitor[:, None]
+
+        elementos = list(nodos) + [REFERENCIA] if es_tierra.any() else list(nodos)
+        for conjuntos, seleccion in ((self.general, validas), (self.continua, continuas)):
+            grafo = coo_matrix((np.ones(np.count_nonzero(seleccion)), (origen[seleccion], destino[seleccion])),
+                               shape=(len(nodos) + 1,) * 2)
+            _, etiquetas = connected_components(grafo, directed=False)
+            conjuntos.unir_grupos(elementos, etiquetas[:len(elementos)].tolist())
+
+        for nodo in nodos:
+            self.tension.agregar(nodo)
+        self.agregar_tension(componentes[k] for k in np.flatnonzero(secuencial).tolist())
+
+    def tiene_tierra(self):
+        return bool(self.tierras)
+
+    def conectado_a_tierra(self, nodo):
+        return self.general.conectados(nodo, REFERENCIA)
+
+    def camino_dc(self, nodo):
+        return self.continua.conectados(nodo, REFERENCIA)
+
+    def islas(self):
+        return [[n for n in conjunto if n != REFERENCIA] for conjunto in self.general.conjuntos()]
@@ -0,0 +1,167 @@
+from fractions import Fraction
+from math import gcd
+
+import numpy as np
+
+from core.mna import Factorizacion
+from core.no_lineal import ModelosNoLineales, punto_operacion
+from core.instrumentacion import medido, contar
+
+# Denominador máximo al buscar la frecuencia fundamental común
+DENOMINADOR_MAXIMO = 10**6
+
+
+def frecuencia_comun(frecuencias):
+    # Máximo común divisor de las frecuencias (None si no hay ninguna)
+    fracciones = [Fraction(float(f)).limit_denominator(DENOMINADOR_MAXIMO) for f in frecuencias if f > 0]
+    if not fracciones:
+        return None
+    mcd = fracciones[0]
+    for f in fracciones[1:]:
+        mcd = Fraction(gcd(mcd.numerator * f.denominator, f.numerator * mcd.denominator),
+                       mcd.denominator * f.denominator)
+    return float(mcd)
+
+
+def sintetizar(continua, frecuencias, fasores, t):
+    # x(t) = x_dc + Σ Im(X_f·e^{j2πft}), misma convención que las fuentes AC
+    t = np.asarray(t, dtype=float)
+    x = np.broadcast_to(continua, t.shape + continua.shape).copy()
+    if len(frecuencias):
+        x += (np.exp(2j * np.pi * t[:, None] * frecuencias[None, :]) @ fasores).imag
+    return x
+
+
+def superposicion(sistema):
+    # Circuitos lineales: una solución fasorial por frecuencia distinta, cada
+    # una con su factorización en la caché del sistema
+    if len(sistema.compilado.diodos) or len(sistema.compilado.transistores):
+        raise ValueError("La superposición sólo vale para circuitos lineales: use balance_armonico")
+    continua = sistema.factorizacion(0).resolver(sistema.excitacion(0))
+    ac = sistema.compilado.fuentes_ac
+    frecuencias = np.unique(ac.frecuencia[ac.frecuencia > 0])
+    fasores = np.zeros((len(frecuencias), sistema.dimension), dtype=complex)
+    for k, f in enumerate(frecuencias):
+        fasores[k] = sistema.resolver(f)
+    return {
+        'continua': continua,
+        'frecuencias': frecuencias,
+        'fasores': fasores,
+        'convergio': True,
+        'iteraciones': 0
+    }
+
+
+def _derivacion_espectral(N, f0):
+    # Matriz D con (D·x)_n = x'(t_n) para la interpolación trigonométrica de
+    # N muestras (N impar) en un periodo
+    k = np.fft.fftfreq(N, 1 / N)
+    return np.real(np.fft.ifft(2j * np.pi * f0 * k[:, None] * np.fft.fft(np.eye(N), axis=0), axis=0))
+
+
+class _SistemaColocacion:
+    # estatica·x_n + dinamica·(D·x)_n + i(x_n) = b(t_n) para las N muestras:
+    # la parte dinámica es kron(D, dinamica) y sólo cambian los bloques diagonales
+    def __init__(self, sistema, D):
+        N, dim = len(D), sistema.dimension
+        patron = sistema.patron
+        self.N, self.dim = N, dim
+
+        bloques = (np.arange(N) * dim)[:, None]
+        din = np.flatnonzero(sistema.dinamica)
+        n, m = np.divmod(np.arange(N * N), N)
+        self.filas = np.concatenate([(bloques + patron.filas).ravel(),
+                                     (n[:, None] * dim + patron.filas[din]).ravel()])
+        self.columnas = np.concatenate([(bloques + patron.indices).ravel(),
+                                        (m[:, None] * dim + patron.indices[din]).ravel()])
+        self.datos_dinamica = (D[n, m][:, None] * sistema.dinamica[din]).ravel()
+
+    def resolver(self, datos_bloques, b):
+        from scipy.sparse import coo_matrix
+        datos = np.concatenate([datos_bloques.ravel(), self.datos_dinamica])
+        A = coo_matrix((datos, (self.filas, self.columnas)), shape=(self.N * self.dim,) * 2).tocsc()
+        return Factorizacion(A).resolver(b.ravel()).reshape(self.N, self.dim)
+
+
+@medido('balance_armonico')
+def balance_armonico(sistema, f0, armonicos=32, tolerancia_rel=1e-3, vntol=1e-6, abstol=1e-9,
+                     max_iter=100, pasos_fuente_min=1e-3):
+    # Colocación en el tiempo: N = 2·armonicos + 1 muestras de un periodo de
+    # f0, Newton sobre todas a la vez con la limitación de uniones de no_lineal
+    ac = sistema.compilado.fuentes_ac
+    if np.any(ac.frecuencia > armonicos * f0 * (1 + 1e-9)):
+        raise ValueError("Hay fuentes por encima del último armónico considerado")
+
+    N = 2 * armonicos + 1
+    t = np.arange(N) / (N * f0)
+    colocacion = _SistemaColocacion(sistema, _derivacion_espectral(N, f0))
+    modelos = ModelosNoLineales(sistema)
+
+    filas, E = sistema.excitacion_tiempo(t)
+    b = np.zeros((N, sistema.dimension))
+    b[:, filas] = E.T
+    b_continua = np.broadcast_to(sistema.excitacion(0), b.shape)
+
+    tolerancias_abs = np.full(sistema.dimension, abstol)
+    tolerancias_abs[:sistema.num_nodos] = vntol
+    contador = [0]
+
+    def newton(b, X):
+        anteriores = [modelos.uniones(x) for x in X]
+        for _ in range(max_iter):
+            datos = np.empty((N, sistema.patron.nnz))
+            rhs = np.empty((N, sistema.dimension))
+            for n in range(N):
+                anteriores[n] = modelos.limitar(modelos.uniones(X[n]), anteriores[n])
+                datos[n], rhs[n] = modelos.estampar(anteriores[n])
+            try:
+                X_nuevo = colocacion.resolver(datos + sistema.estatica, b + rhs)
+            except np.linalg.LinAlgError:
+                return X, False
+            contador[0] += 1
+            contar('iteraciones_balance_armonico')
+
+            if not np.all(np.isfinite(X_nuevo)):
+                return X, False
+            cambio = np.abs(X_nuevo - X)
+            limite = tolerancia_rel * np.maximum(np.abs(X_nuevo), np.abs(X)) + tolerancias_abs
+            X = X_nuevo
+            if np.all(cambio <= limite):
+                return X, True
+        return X, False
+
+    # Se parte del punto de operación DC repetido en todas las muestras
+    X0 = np.tile(punto_operacion(sistema)['solucion'], (N, 1))
+    X, convergio = newton(b, X0)
+
+    if not convergio:
+        # Escalonamiento de la parte variable de las fuentes
+        X, escala, paso = X0, 0.0, 0.25
+        while escala < 1:
+            objetivo = min(1.0, escala + paso)
+            X_nuevo, ok = newton(b_continua + objetivo * (b - b_continua), X)
+            if ok:
+                X, escala = X_nuevo, objetivo
+                paso = min(2 * paso, 1.0)
+            else:
+                paso /= 2
+                if paso < pasos_fuente_min:
+                    break
+        convergio = escala >= 1
+
+    # Coeficientes c_k de la FFT: x = c_0 + Σ Im(2j·c_k·e^{jkω0t})
+    C = np.fft.rfft(X, axis=0) / N
+    return {
+        'continua': C[0].real,
+        'frecuencias': f0 * np.arange(1, armonicos + 1),
+        'fasores': 2j * C[1:],
+        'convergio': convergio,
+        'iteraciones': contador[0]
+    }
+
+
+def corrientes_capacitores(sistema, espectro, t):
+    capacitores = sistema.compilado.capacitores
+    fasores = sistema.voltajes_entre(espectro['fasores'], capacitores.n1, capacitores.n2)
+    fasores = 2j * np.pi * espectro['frecuencias'][:, None] * capacitores.valor * fasores
+    return sintetizar(np.zeros(len(capacitores)), espectro['frecuencias'], fasores, t)
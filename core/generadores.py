@@ -0,0 +1,81 @@
+import numpy as np
+from core.compilado import FAMILIA_DE_TIPO, PARAMETROS
+from core.netlist import NODO_TIERRA
+
+# Generadores paramétricos de circuitos repetitivos. Agregan los componentes
+# con agregar_bloque (una llamada por elemento, no por sección), así que
+# sirven igual para Circuito y CircuitoCompacto, y devuelven los nombres de
+# los nodos creados para seguir conectando. Los elementos se describen como
+# (tipo, {parámetro: valor}), con valores escalares o uno por componente:
+#
+#   nodos = escalera(circuito, 1000, serie=[(Resistencia, {'resistencia': 1.0}),
+#                                           (Inductor, {'inductancia': 1e-9})],
+#                    derivacion=[(Capacitor, {'capacitancia': 1e-12})])
+
+
+def _nombres(prefijo, n, sufijo=''):
+    return np.array([f'{prefijo}{k}{sufijo}' for k in range(n)])
+
+
+def escalera(circuito, secciones, serie, derivacion=(), entrada=None, referencia=NODO_TIERRA, prefijo='n'):
+    # Secciones en cascada: los elementos de serie encadenados entre el nodo
+    # i y el i+1 (con nodos intermedios si hay más de uno) y los de derivación
+    # del nodo i+1 a referencia. Sirve para líneas de transmisión (R-L serie,
+    # C-G derivación) y redes en escalera. Devuelve los secciones+1 nodos
+    nodos = _nombres(prefijo, secciones + 1)
+    if entrada is not None:
+        # Sin asignar en su sitio: el arreglo tiene el ancho de los nombres generados
+        nodos = np.concatenate([[str(entrada)], nodos[1:]])
+    inicio = nodos[:-1]
+    for j, (tipo, parametros) in enumerate(serie):
+        fin = nodos[1:] if j == len(serie) - 1 else _nombres(prefijo, secciones, f'_{j}')
+        circuito.agregar_bloque(tipo, np.stack([inicio, fin], axis=1), _nombres(f'{prefijo}s{j}_', secciones),
+                                **parametros)
+        inicio = fin
+    for j, (tipo, parametros) in enumerate(derivacion):
+        circuito.agregar_bloque(tipo, np.stack([nodos[1:], np.full(secciones, referencia)], axis=1),
+                                _nombres(f'{prefijo}d{j}_', secciones), **parametros)
+    return nodos
+
+
+def malla(circuito, filas, columnas, elemento, derivacion=(), referencia=NODO_TIERRA, prefijo='m'):
+    # Rejilla filas x columnas (p. ej. una red de alimentación) con elemento
+    # entre nodos vecinos y, opcionalmente, los de derivación de cada nodo a
+    # referencia. Los valores de elemento deben ser escalares. Devuelve los
+    # nodos con forma (filas, columnas)
+    nodos = np.array([[f'{prefijo}{i}_{j}' for j in range(columnas)] for i in range(filas)]).reshape(filas, columnas)
+    tipo, parametros = elemento
+    for letra, a, b, filas_a, columnas_a in (('h', nodos[:, :-1], nodos[:, 1:], filas, columnas - 1),
+                                            ('v', nodos[:-1, :], nodos[1:, :], filas - 1, columnas)):
+        nombres = [f'{prefijo}{letra}{i}_{j}' for i in range(filas_a) for j in range(columnas_a)]
+        circuito.agregar_bloque(tipo, np.stack([a.ravel(), b.ravel()], axis=1), nombres, **parametros)
+    for j, (tipo, parametros) in enumerate(derivacion):
+        circuito.agregar_bloque(tipo, np.stack([nodos.ravel(), np.full(nodos.size, referencia)], axis=1),
+                                _nombres(f'{prefijo}d{j}_', nodos.size), **parametros)
+    return nodos
+
+
+def instanciar(circuito, plantilla, puertos, copias, prefijo='x', referencia=NODO_TIERRA):
+    # copias réplicas de los componentes de plantilla (p. ej. los de otro
+    # circuito). puertos asocia nodos de la plantilla con un nodo común o un
+    # arreglo de copias nodos; referencia se comparte y el resto de nodos son
+    # internos de cada copia (<prefijo><k>_<nodo>). Los componentes de la copia
+    # k se llaman <prefijo><k>_<nombre>
+    puertos = {referencia: referencia, **puertos}
+    columnas = {}
+    for nodo, destino in puertos.items():
+        destino = np.asarray(destino)
+        if destino.ndim and len(destino) != copias:
+            raise ValueError(f"El puerto {nodo} necesita un nodo por copia")
+        columnas[nodo] = np.broadcast_to(destino.astype(str), (copias,))
+    for componente in plantilla:
+        # La clase real también para las vistas de CircuitoCompacto
+        tipo = getattr(componente, 'tipo', type(componente))
+        atributo = FAMILIA_DE_TIPO[tipo]
+        for nodo in componente.terminales:
+            if nodo not in columnas:
+                columnas[nodo] = _nombres(prefijo, copias, f'_{nodo}')
+        nodos = np.stack([columnas[nodo] for nodo in componente.terminales], axis=1)
+        circuito.agregar_bloque(tipo, nodos, _nombres(prefijo, copias, f'_{componente.nombre}'),
+                                **{p: getattr(componente, p) for p in PARAMETROS[atributo]})
+    return {nodo: columnas[nodo] for nodo in columnas if nodo not in puertos}
@@ -0,0 +1,185 @@
+import functools
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Medición por etapas de la simulación. Sin un Registro activo, etapa()
+# devuelve un contexto vacío compartido y contar()/anotar() sólo comprueban
+# una variable global, así que el código instrumentado no paga casi nada:
+#
+#   with registrar() as registro:
+#       transitorio(circuito, 1e-3)
+#   print(formatear_informe(registro.informe()))
+#
+# El registro es global (no por hilo): con la simulación en un hilo y las
+# gráficas en otro se acumulan las dos en el mismo informe.
+
+_activo = None
+
+
+class _Nulo:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Etapa:
+    def __init__(self, registro, nombre):
+        self.registro = registro
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.registro._entrar()
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.registro._salir(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+class Registro:
+    # Por etapa: llamadas, segundos acumulados y (con memoria=True) el mayor
+    # pico de memoria asignada durante una llamada, medido con tracemalloc.
+    # Los contadores se suman y los valores guardan el máximo anotado
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.etapas = {}
+        self.contadores = {}
+        self.valores = {}
+        self._bloqueo = threading.Lock()
+        self._local = threading.local()
+        self._inicio_traza = False
+
+    def _pila(self):
+        # Etapas abiertas en este hilo: [memoria al entrar, pico de las anidadas]
+        if not hasattr(self._local, 'pila'):
+            self._local.pila = []
+        return self._local.pila
+
+    def _entrar(self):
+        if not self.memoria:
+            return
+        actual, pico = tracemalloc.get_traced_memory()
+        pila = self._pila()
+        if pila:
+            pila[-1][1] = max(pila[-1][1], pico)
+        tracemalloc.reset_peak()
+        pila.append([actual, actual])
+
+    def _salir(self, nombre, segundos):
+        pico_etapa = 0
+        if self.memoria:
+            pico = tracemalloc.get_traced_memory()[1]
+            pila = self._pila()
+            inicio, anidadas = pila.pop()
+            pico = max(pico, anidadas)
+            pico_etapa = pico - inicio
+            if pila:
+                pila[-1][1] = max(pila[-1][1], pico)
+        with self._bloqueo:
+            etapa = self.etapas.setdefault(nombre, {'llamadas': 0, 'segundos': 0.0, 'pico_bytes': 0})
+            etapa['llamadas'] += 1
+            etapa['segundos'] += segundos
+            etapa['pico_bytes'] = max(etapa['pico_bytes'], pico_etapa)
+
+    def contar(self, nombre, cantidad=1):
+        with self._bloqueo:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def anotar(self, nombre, valor):
+        with self._bloqueo:
+            self.valores[nombre] = max(self.valores.get(nombre, valor), valor)
+
+    def iniciar(self):
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._inicio_traza = True
+
+    def detener(self):
+        if self._inicio_traza:
+            tracemalloc.stop()
+            self._inicio_traza = False
+
+    def informe(self):
+        with self._bloqueo:
+            return {
+                'etapas': {nombre: dict(datos) for nombre, datos in self.etapas.items()},
+                'contadores': dict(self.contadores),
+                'valores': dict(self.valores)
+            }
+
+
+def activar(registro):
+    # Devuelve el registro que estaba activo para poder restaurarlo
+    global _activo
+    anterior, _activo = _activo, registro
+    if registro is not None:
+        registro.iniciar()
+    return anterior
+
+
+def desactivar(anterior=None):
+    global _activo
+    if _activo is not None and _activo is not anterior:
+        _activo.detener()
+    _activo = anterior
+
+
+@contextmanager
+def registrar(registro=None, memoria=False):
+    # Activa un registro (uno nuevo si no se da) mientras dura el bloque
+    if registro is None:
+        registro = Registro(memoria)
+    anterior = activar(registro)
+    try:
+        yield registro
+    finally:
+        desactivar(anterior)
+
+
+def etapa(nombre):
+    registro = _activo
+    if registro is None:
+        return _NULO
+    return _Etapa(registro, nombre)
+
+
+def medido(nombre):
+    # Decorador: cada llamada a la función cuenta como la etapa nombre
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            registro = _activo
+            if registro is None:
+                return funcion(*args, **kwargs)
+            with _Etapa(registro, nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def contar(nombre, cantidad=1):
+    if _activo is not None:
+        _activo.contar(nombre, cantidad)
+
+
+def anotar(nombre, valor):
+    if _activo is not None:
+        _activo.anotar(nombre, valor)
+
+
+def formatear_informe(informe):
+    lineas = [f"{'Etapa':24s} {'Llamadas':>9s} {'Tiempo (s)':>11s} {'Pico (MiB)':>11s}"]
+    for nombre, datos in informe['etapas'].items():
+        lineas.append(f"{nombre:24s} {datos['llamadas']:9d} {datos['segundos']:11.4f} "
+                      f"{datos['pico_bytes'] / 2**20:11.2f}")
+    for nombre, valor in {**informe['contadores'], **informe['valores']}.items():
+        lineas.append(f"{nombre:24s} {valor:>9}")
+    return "\n".join(lineas)
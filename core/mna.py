@@ -0,0 +1,465 @@
+import copy
+import time
+
+import numpy as np
+from core.instrumentacion import medido
+
+# SciPy se importa al usarlo por primera vez: importar core sólo carga NumPy
+
+# Conductancia mínima entre cada nodo y la referencia (evita matrices singulares
+# en nodos que sólo se conectan a través de capacitores)
+GMIN = 1e-12
+
+# Por debajo de esta dimensión se factoriza en denso, que es más rápido
+UMBRAL_DENSO = 200
+
+# Rango acumulado de correcciones antes de volver a factorizar desde cero
+RANGO_MAXIMO = 32
+
+# Factorizaciones que conserva cada SistemaMNA (una por valor de s)
+FACTORIZACIONES_EN_CACHE = 16
+
+
+class Patron:
+    # Posiciones CSR precalculadas para un conjunto fijo de entradas (fila, columna).
+    # Las entradas repetidas se suman en la misma posición.
+    def __init__(self, filas, columnas, dimension):
+        filas = np.asarray(filas, dtype=np.int64)
+        columnas = np.asarray(columnas, dtype=np.int64)
+        claves = filas * dimension + columnas
+        unicas, inverso = np.unique(claves, return_inverse=True)
+        self._iniciar(unicas, inverso.ravel(), dimension)
+
+    def _iniciar(self, unicas, inverso, dimension):
+        self.claves = unicas
+        self.inverso = inverso
+        self.dimension = dimension
+        self.nnz = len(unicas)
+        self.filas = unicas // dimension
+        self.indices = (unicas % dimension).astype(np.int32)
+        self.indptr = np.searchsorted(self.filas, np.arange(dimension + 1)).astype(np.int32)
+
+    def ampliado(self, filas, columnas):
+        # Patrón con las entradas dadas añadidas, sin volver a ordenar las
+        # existentes, y el mapa de posiciones antiguas a nuevas. Si ya estaban
+        # todas devuelve (self, None)
+        claves = np.unique(np.asarray(filas, dtype=np.int64) * self.dimension
+                           + np.asarray(columnas, dtype=np.int64))
+        posiciones = np.searchsorted(self.claves, claves)
+        presentes = posiciones < self.nnz
+        presentes[presentes] = self.claves[posiciones[presentes]] == claves[presentes]
+        nuevas = claves[~presentes]
+        if not len(nuevas):
+            return self, None
+        mapa = np.arange(self.nnz) + np.searchsorted(nuevas, self.claves)
+        unicas = np.insert(self.claves, np.searchsorted(self.claves, nuevas), nuevas)
+        patron = Patron.__new__(Patron)
+        patron._iniciar(unicas, mapa[self.inverso], self.dimension)
+        return patron, mapa
+
+    def posiciones(self, filas, columnas):
+        claves = np.asarray(filas, dtype=np.int64) * self.dimension + np.asarray(columnas, dtype=np.int64)
+        return np.searchsorted(self.claves, claves)
+
+    def acumular(self, valores):
+        valores = np.asarray(valores)
+        if np.iscomplexobj(valores):
+            return (np.bincount(self.inverso, valores.real, self.nnz)
+                    + 1j * np.bincount(self.inverso, valores.imag, self.nnz))
+        return np.bincount(self.inverso, valores.astype(float), self.nnz)
+
+    def matriz(self, datos):
+        from scipy.sparse import csr_matrix
+        return csr_matrix((datos, self.indices, self.indptr),
+                          shape=(self.dimension, self.dimension))
+
+    def densa(self, datos):
+        datos = np.asarray(datos)
+        A = np.zeros(datos.shape[:-1] + (self.dimension, self.dimension), dtype=datos.dtype)
+        A[..., self.filas, self.indices] = datos
+        return A
+
+
+class Factorizacion:
+    @medido('factorizacion')
+    def __init__(self, A):
+        inicio = time.perf_counter()
+        self.dimension = A.shape[0]
+        self.densa = self.dimension <= UMBRAL_DENSO
+        if self.densa:
+            from scipy.linalg import get_lapack_funcs, lu_factor
+            M = A.toarray() if hasattr(A, 'toarray') else np.asarray(A)
+            self.lu = lu_factor(M, check_finite=False)
+            if np.any(np.diag(self.lu[0]) == 0):
+                raise np.linalg.LinAlgError("Matriz singular")
+            # getrs directo: evita las validaciones de lu_solve en cada llamada
+            self._getrs, = get_lapack_funcs(('getrs',), (self.lu[0],))
+        else:
+            from scipy.sparse.linalg import splu
+            try:
+                self.lu = splu(A.tocsc())
+            except RuntimeError as e:
+                raise np.linalg.LinAlgError(str(e))
+        # Coste de factorizar, con el que se decide cuándo refactorizar
+        self.segundos = time.perf_counter() - inicio
+
+    @property
+    def nbytes(self):
+        # Memoria aproximada de los factores (para el presupuesto de las cachés)
+        if self.densa:
+            return self.lu[0].nbytes + self.lu[1].nbytes
+        return self.lu.nnz * 12 + self.dimension * 16
+
+    def resolver(self, b):
+        if self.densa:
+            lu, piv = self.lu
+            b = np.asarray(b)
+            if np.iscomplexobj(b) and not np.iscomplexobj(lu):
+                return self.resolver(b.real) + 1j * self.resolver(b.imag)
+            x, info = self._getrs(lu, piv, b)
+            return x
+        b = np.asarray(b)
+        if np.iscomplexobj(b) and not np.iscomplexobj(self.lu.L):
+            return self.lu.solve(b.real.copy()) + 1j * self.lu.solve(b.imag.copy())
+        return self.lu.solve(b.astype(self.lu.L.dtype))
+
+
+class FactorizacionActualizable:
+    # Factorización de A0 más correcciones simétricas de rango bajo,
+    # A = A0 + Σ c_i·u_i·u_iᵀ, resueltas con Sherman-Morrison-Woodbury. La
+    # factorización base no se modifica y puede compartirse. Con sistema, las
+    # correcciones se integran en una factorización nueva de A(s) en cuanto
+    # lo que han costado (columnas de Z y trabajo extra de cada resolución)
+    # iguala lo que costó factorizar: un cambio de valor seguido de pocas
+    # resoluciones no refactoriza, y uno seguido de muchas no paga la
+    # corrección en cada una
+    def __init__(self, A=None, base=None, sistema=None, s=0):
+        self.base = base if base is not None else Factorizacion(A)
+        self.densa = self.base.densa
+        self.dimension = self.base.dimension
+        self.sistema = sistema
+        self.s = s
+        self._descartar_correcciones()
+
+    def _descartar_correcciones(self):
+        self.claves = []
+        self.U = np.zeros((self.dimension, 0))
+        self.Z = np.zeros((self.dimension, 0))
+        self.c = np.zeros(0)
+        self._nucleo = None
+        self.coste = 0.0
+
+    @property
+    def rango(self):
+        return len(self.claves)
+
+    def actualizar(self, indices, signos, coeficiente):
+        inicio = time.perf_counter()
+        clave = (tuple(indices), tuple(signos))
+        if clave in self.claves:
+            i = self.claves.index(clave)
+            self.c = self.c + np.eye(1, len(self.c), i)[0] * coeficiente
+        else:
+            u = np.zeros(self.dimension)
+            u[list(indices)] = signos
+            self.claves.append(clave)
+            self.U = np.column_stack([self.U, u])
+            self.Z = np.column_stack([self.Z, self.base.resolver(u)])
+            self.c = np.append(self.c, coeficiente)
+        nulas = self.c == 0
+        if np.any(nulas):
+            self.claves = [k for k, nula in zip(self.claves, nulas) if not nula]
+            self.U, self.Z, self.c = self.U[:, ~nulas], self.Z[:, ~nulas], self.c[~nulas]
+        self._nucleo = None
+        self._sumar_coste(time.perf_counter() - inicio)
+
+    def _sumar_coste(self, segundos):
+        self.coste += segundos
+        if self.sistema is not None and self.claves and self.coste > self.base.segundos:
+            self.consolidar()
+
+    def consolidar(self):
+        # Sustituye la base por una factorización de la matriz actual del
+        # sistema, que ya incluye las correcciones
+        self.base = self.sistema.factorizacion_base(self.s)
+        self._descartar_correcciones()
+
+    def resolver(self, b):
+        y = self.base.resolver(b)
+        if not self.claves:
+            return y
+        inicio = time.perf_counter()
+        if self._nucleo is None:
+            self._nucleo = np.linalg.inv(np.diag(1 / self.c) + self.U.T @ self.Z)
+        x = y - self.Z @ (self._nucleo @ (self.U.T @ y))
+        self._sumar_coste(time.perf_counter() - inicio)
+        return x
+
+
+class OrdenColumnas:
+    # Calcula una sola vez el ordenamiento de columnas (parte simbólica de la
+    # factorización) y lo reutiliza para todas las matrices con el mismo patrón
+    def __init__(self, patron, datos):
+        from scipy.sparse.linalg import splu
+        self.patron = patron
+        self.perm = np.argsort(splu(patron.matriz(datos).tocsc()).perm_c)
+        marcas = patron.matriz(np.arange(1, patron.nnz + 1, dtype=float))[:, self.perm].tocsc()
+        self.orden = marcas.data.astype(np.int64) - 1
+        self.indices = marcas.indices
+        self.indptr = marcas.indptr
+
+    @medido('factorizacion')
+    def factorizar(self, datos):
+        from scipy.sparse import csc_matrix
+        from scipy.sparse.linalg import splu
+        B = csc_matrix((datos[self.orden], self.indices, self.indptr),
+                       shape=(self.patron.dimension, self.patron.dimension))
+        try:
+            return splu(B, permc_spec='NATURAL')
+        except RuntimeError as e:
+            raise np.linalg.LinAlgError(str(e))
+
+    def resolver(self, datos, b):
+        return self.sustituir(self.factorizar(datos), b)
+
+    def sustituir(self, lu, b):
+        # Solución con una factorización de factorizar(), en el orden original
+        y = lu.solve(b)
+        x = np.empty_like(y)
+        x[self.perm] = y
+        return x
+
+
+def _estampar_admitancias(n1, n2, valores):
+    filas = np.concatenate([n1, n2, n1, n2])
+    columnas = np.concatenate([n1, n2, n2, n1])
+    datos = np.concatenate([valores, valores, -valores, -valores])
+    return filas, columnas, datos
+
+
+def _estampar_ramas(n1, n2, ramas):
+    uno = np.ones(len(ramas))
+    filas = np.concatenate([n1, n2, ramas, ramas])
+    columnas = np.concatenate([ramas, ramas, n1, n2])
+    datos = np.concatenate([uno, -uno, uno, -uno])
+    return filas, columnas, datos
+
+
+class SistemaMNA:
+    # Análisis nodal modificado: incógnitas [voltajes de nodo, corrientes de rama].
+    # La matriz se escribe como A(s) = estatica + s * dinamica, de modo que el
+    # mismo patrón sirve para DC (s = 0), AC (s = jω) y los modelos de compañía
+    # del análisis transitorio (s = 1/h o 2/h). Se construye sólo a partir de
+    # los arreglos de un CircuitoCompilado.
+    def __init__(self, compilado):
+        self.compilado = compilado
+        self.nodo_indices = compilado.nodo_indices
+        self.num_nodos = compilado.num_nodos
+        self.dimension = compilado.dimension
+        self.ramas = compilado.ramas
+        self.rama_indices = {c: self.num_nodos + k for k, c in enumerate(self.ramas)}
+
+        partes_estatica = []
+        partes_dinamica = []
+
+        R = compilado.resistencias
+        partes_estatica.append(_estampar_admitancias(R.n1, R.n2, 1.0 / R.valor))
+
+        C = compilado.capacitores
+        partes_dinamica.append(_estampar_admitancias(C.n1, C.n2, C.valor))
+
+        for atributo in ('fuentes_dc', 'fuentes_ac', 'cables', 'inductores'):
+            grupo = getattr(compilado, atributo)
+            partes_estatica.append(_estampar_ramas(grupo.n1, grupo.n2, grupo.rama))
+
+        L = compilado.inductores
+        partes_dinamica.append((L.rama, L.rama, -L.valor))
+
+        diagonal = np.arange(self.num_nodos)
+        partes_estatica.append((diagonal, diagonal, np.full(self.num_nodos, GMIN)))
+
+        # Posiciones reservadas para los estampados de los dispositivos no lineales,
+        # que cambian en cada iteración de Newton sin alterar el patrón
+        self.terminales_diodos = compilado.diodos.nodos
+        self.terminales_transistores = compilado.transistores.nodos
+        filas_nl = []
+        columnas_nl = []
+        for T in (self.terminales_diodos, self.terminales_transistores):
+            filas_nl.append(np.repeat(T, T.shape[1], axis=1).ravel())
+            columnas_nl.append(np.tile(T, (1, T.shape[1])).ravel())
+        filas_nl = np.concatenate(filas_nl)
+        columnas_nl = np.concatenate(columnas_nl)
+
+        filas_e, columnas_e, datos_e = self._unir(partes_estatica)
+        filas_d, columnas_d, datos_d = self._unir(partes_dinamica)
+
+        validas_e = (filas_e >= 0) & (columnas_e >= 0)
+        validas_d = (filas_d >= 0) & (columnas_d >= 0)
+        validas_nl = (filas_nl >= 0) & (columnas_nl >= 0)
+        filas = np.concatenate([filas_e[validas_e], filas_d[validas_d], filas_nl[validas_nl]])
+        columnas = np.concatenate([columnas_e[validas_e], columnas_d[validas_d], columnas_nl[validas_nl]])
+        n_e = int(validas_e.sum())
+        n_d = int(validas_d.sum())
+
+        self.patron = Patron(filas, columnas, self.dimension)
+        valores = np.zeros(len(filas))
+        valores[:n_e] = datos_e[validas_e]
+        self.estatica = self.patron.acumular(valores)
+        valores[:] = 0
+        valores[n_e:n_e + n_d] = datos_d[validas_d]
+        self.dinamica = self.patron.acumular(valores)
+
+        slots = np.full(len(filas_nl), -1, dtype=np.int64)
+        slots[validas_nl] = self.patron.inverso[n_e + n_d:]
+        n_slots_d = self.terminales_diodos.size * 2
+        self.slots_diodos = slots[:n_slots_d].reshape(-1, 2, 2)
+        self.slots_transistores = slots[n_slots_d:].reshape(-1, 3, 3)
+        self.pos_diagonal = self.patron.posiciones(diagonal, diagonal)
+        self._factorizaciones = {}
+        # Caché compartida de factorizaciones por contenido (core.cache), si se usa
+        self.cache = None
+
+    def __getstate__(self):
+        # Las factorizaciones y la caché no se envían a otros procesos
+        estado = self.__dict__.copy()
+        estado['_factorizaciones'] = {}
+        estado['cache'] = None
+        return estado
+
+    def factorizacion(self, s=0):
+        # Factorizaciones conservadas entre análisis; los cambios de valor las
+        # corrigen con actualizaciones de rango bajo en lugar de descartarlas
+        clave = complex(s)
+        if clave not in self._factorizaciones:
+            if len(self._factorizaciones) >= FACTORIZACIONES_EN_CACHE:
+                self._factorizaciones.pop(next(iter(self._factorizaciones)))
+            self._factorizaciones[clave] = FactorizacionActualizable(base=self.factorizacion_base(s),
+                                                                     sistema=self, s=s)
+        return self._factorizaciones[clave]
+
+    def factorizacion_base(self, s=0):
+        # Factorización nueva de A(s), compartida por contenido si hay caché
+        if self.cache is not None:
+            return self.cache.factorizacion(self, s)
+        return Factorizacion(self.matriz(s))
+
+    def con_admitancia(self, compilado, n1, n2, delta_estatica=0.0, delta_dinamica=0.0):
+        # Sistema de compilado, que es el de este sistema más una admitancia
+        # entre los nodos ya numerados n1 y n2, sin volver a estampar nada: el
+        # patrón se amplía sólo con las entradas que falten y las
+        # factorizaciones pasan al nuevo sistema con una corrección de rango uno
+        nuevo = copy.copy(self)
+        nuevo.compilado = compilado
+        indices = [i for i in (n1, n2) if i >= 0]
+        patron, mapa = self.patron.ampliado(np.repeat(indices, len(indices)), np.tile(indices, len(indices)))
+        if mapa is None:
+            nuevo.estatica = self.estatica.copy()
+            nuevo.dinamica = self.dinamica.copy()
+        else:
+            nuevo.patron = patron
+            for nombre in ('estatica', 'dinamica'):
+                datos = np.zeros(patron.nnz)
+                datos[mapa] = getattr(self, nombre)
+                setattr(nuevo, nombre, datos)
+            nuevo.slots_diodos = np.where(self.slots_diodos >= 0, mapa[self.slots_diodos], -1)
+            nuevo.slots_transistores = np.where(self.slots_transistores >= 0, mapa[self.slots_transistores], -1)
+            nuevo.pos_diagonal = mapa[self.pos_diagonal]
+        nuevo._factorizaciones = self._factorizaciones
+        for factorizacion in nuevo._factorizaciones.values():
+            factorizacion.sistema = nuevo
+        self._factorizaciones = {}
+        nuevo.actualizar([n1, n2], (1, -1), delta_estatica, delta_dinamica)
+        return nuevo
+
+    def actualizar(self, indices, signos, delta_estatica=0.0, delta_dinamica=0.0):
+        # Suma (delta_estatica + s·delta_dinamica)·u·uᵀ, con u definido por
+        # indices/signos; sólo se tocan las entradas afectadas
+        indices = np.asarray(indices, dtype=np.int64)
+        signos = np.asarray(signos, dtype=float)
+        validos = indices >= 0
+        indices, signos = indices[validos], signos[validos]
+        if not len(indices):
+            return
+        filas = np.repeat(indices, len(indices))
+        columnas = np.tile(indices, len(indices))
+        producto = np.outer(signos, signos).ravel()
+        posiciones = self.patron.posiciones(filas, columnas)
+        self.estatica[posiciones] += delta_estatica * producto
+        self.dinamica[posiciones] += delta_dinamica * producto
+        self._corregir_factorizaciones(indices, signos, delta_estatica, delta_dinamica)
+
+    def _corregir_factorizaciones(self, indices, signos, delta_estatica, delta_dinamica):
+        indices = np.asarray(indices, dtype=np.int64)
+        signos = np.asarray(signos, dtype=float)
+        validos = indices >= 0
+        indices, signos = indices[validos], signos[validos]
+        for s, factorizacion in list(self._factorizaciones.items()):
+            if factorizacion.rango >= RANGO_MAXIMO:
+                del self._factorizaciones[s]
+                continue
+            if s.imag == 0:
+                s = s.real
+            coeficiente = delta_estatica + s * delta_dinamica
+            if coeficiente != 0 and len(indices):
+                factorizacion.actualizar(indices, signos, coeficiente)
+
+    @staticmethod
+    def _unir(partes):
+        filas = np.concatenate([np.asarray(p[0], dtype=np.int64) for p in partes])
+        columnas = np.concatenate([np.asarray(p[1], dtype=np.int64) for p in partes])
+        datos = np.concatenate([np.asarray(p[2], dtype=float) for p in partes])
+        return filas, columnas, datos
+
+    def matriz(self, s=0):
+        if s == 0:
+            return self.patron.matriz(self.estatica)
+        return self.patron.matriz(self.estatica + s * self.dinamica)
+
+    def excitacion(self, frecuencia):
+        # Fasores con la convención v(t) = Im(V·e^{jωt}), coherente con
+        # FuenteAC.voltaje_instantaneo
+        b = np.zeros(self.dimension, dtype=complex if frecuencia else float)
+        dc = self.compilado.fuentes_dc
+        ac = self.compilado.fuentes_ac
+        activas = ac.frecuencia == frecuencia
+        if frecuencia == 0:
+            b[dc.rama] = dc.voltaje
+            b[ac.rama[activas]] = (ac.amplitud * np.sin(np.deg2rad(ac.fase)))[activas]
+        else:
+            b[ac.rama[activas]] = self._fasores(ac)[activas]
+        return b
+
+    def excitacion_ac(self):
+        # Todas las fuentes AC activas a la vez, como en un barrido de pequeña señal
+        b = np.zeros(self.dimension, dtype=complex)
+        ac = self.compilado.fuentes_ac
+        b[ac.rama] = self._fasores(ac)
+        return b
+
+    def excitacion_tiempo(self, t):
+        # Filas de las fuentes y sus voltajes instantáneos (una fila por fuente)
+        dc = self.compilado.fuentes_dc
+        ac = self.compilado.fuentes_ac
+        t = np.asarray(t, dtype=float)
+        forma = (1,) * t.ndim
+        E_dc = np.broadcast_to(dc.voltaje.reshape((-1,) + forma), (len(dc),) + t.shape)
+        fase = np.deg2rad(ac.fase).reshape((-1,) + forma)
+        w = (2 * np.pi * ac.frecuencia).reshape((-1,) + forma)
+        E_ac = ac.amplitud.reshape((-1,) + forma) * np.sin(w * t + fase)
+        return np.concatenate([dc.rama, ac.rama]), np.concatenate([E_dc, E_ac])
+
+    @staticmethod
+    def _fasores(ac):
+        return ac.amplitud * np.exp(1j * np.deg2rad(ac.fase))
+
+    def resolver(self, frecuencia):
+        return self.factorizacion(2j * np.pi * frecuencia).resolver(self.excitacion(frecuencia))
+
+    def voltaje_nodo(self, x, nodo):
+        i = self.nodo_indices[nodo]
+        return x[..., i] if i >= 0 else np.zeros(x.shape[:-1], dtype=x.dtype)
+
+    def voltajes_entre(self, x, n1, n2):
+        v1 = np.where(n1 >= 0, x[..., n1], 0)
+        v2 = np.where(n2 >= 0, x[..., n2], 0)
+        return v1 - v2
@@ -0,0 +1,309 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from core.compilado import CircuitoCompilado
+from core.mna import UMBRAL_DENSO, OrdenColumnas
+
+# Familias cuyos valores se pueden variar y el atributo de valor en su Grupo
+FAMILIAS_VARIABLES = ('resistencias', 'capacitores', 'inductores')
+
+DISTRIBUCIONES = ('uniforme', 'normal')
+
+# Memoria máxima (bytes) de las matrices densas apiladas de cada lote
+MEMORIA_LOTE = 64 * 2**20
+
+
+def _compilar(circuito):
+    # Mismas comprobaciones que un análisis aislado; los lotes se resuelven
+    # como sistemas lineales, así que no admiten diodos ni transistores
+    if isinstance(circuito, CircuitoCompilado):
+        compilado = circuito
+    else:
+        errores = circuito.errores_fatales()
+        if errores:
+            raise ValueError("\n".join(errores))
+        compilado = circuito.compilar()
+    if len(compilado.diodos) or len(compilado.transistores):
+        raise ValueError("El Monte Carlo y los barridos paramétricos sólo admiten circuitos lineales")
+    return compilado
+
+
+def _incidencia(patron, nodos):
+    # Matriz (nnz x n) que lleva un valor por componente a las cuatro
+    # entradas que estampa entre sus dos nodos
+    from scipy.sparse import csr_matrix
+    k = np.arange(len(nodos))
+    n1, n2 = nodos[:, 0], nodos[:, 1]
+    filas = np.concatenate([n1, n2, n1, n2])
+    columnas = np.concatenate([n1, n2, n2, n1])
+    signos = np.concatenate([np.ones(2 * len(k)), -np.ones(2 * len(k))])
+    elementos = np.tile(k, 4)
+    validas = (filas >= 0) & (columnas >= 0)
+    posiciones = patron.posiciones(filas[validas], columnas[validas])
+    return csr_matrix((signos[validas], (posiciones, elementos[validas])), shape=(patron.nnz, len(k)))
+
+
+class _Mapa:
+    # Traduce lotes de valores (R, C, L) a lotes de datos CSR de la matriz MNA
+    def __init__(self, sistema):
+        from scipy.sparse import csr_matrix
+        compilado = sistema.compilado
+        patron = sistema.patron
+        self.S_R = _incidencia(patron, compilado.resistencias.nodos)
+        self.S_C = _incidencia(patron, compilado.capacitores.nodos)
+        rama = compilado.inductores.rama
+        self.S_L = csr_matrix((-np.ones(len(rama)), (patron.posiciones(rama, rama), np.arange(len(rama)))),
+                              shape=(patron.nnz, len(rama)))
+        self.nominales = {familia: getattr(compilado, familia).valor for familia in FAMILIAS_VARIABLES}
+
+    def datos(self, sistema, valores, s):
+        nom = self.nominales
+        estatica = sistema.estatica + (self.S_R @ (1 / valores['resistencias'] - 1 / nom['resistencias']).T).T
+        dinamica = (sistema.dinamica
+                    + (self.S_C @ (valores['capacitores'] - nom['capacitores']).T).T
+                    + (self.S_L @ (valores['inductores'] - nom['inductores']).T).T)
+        if s == 0:
+            return estatica
+        return estatica + s * dinamica
+
+
+class MuestreoAleatorio:
+    # Tolerancias relativas por familia o por componente; 'normal' interpreta
+    # la tolerancia como 3 sigma
+    def __init__(self, compilado, variaciones, semilla=None):
+        self.nominales = {}
+        self.tolerancias = {}
+        self.normales = {}
+        for familia in FAMILIAS_VARIABLES:
+            grupo = getattr(compilado, familia)
+            self.nominales[familia] = np.array(grupo.valor)
+            self.tolerancias[familia] = np.zeros(len(grupo))
+            self.normales[familia] = np.zeros(len(grupo), dtype=bool)
+
+        for clave, especificacion in variaciones.items():
+            distribucion, tolerancia = ('uniforme', especificacion) if np.isscalar(especificacion) else especificacion
+            if distribucion not in DISTRIBUCIONES:
+                raise ValueError(f"Distribución desconocida: {distribucion}")
+            if clave in FAMILIAS_VARIABLES:
+                familia, indices = clave, slice(None)
+            else:
+                familia, indices = compilado.ubicaciones[clave]
+                if familia not in FAMILIAS_VARIABLES:
+                    raise ValueError(f"No se puede variar el valor de {clave}")
+            self.tolerancias[familia][indices] = tolerancia
+            self.normales[familia][indices] = distribucion == 'normal'
+
+        self.semilla = np.random.SeedSequence(semilla)
+
+    def lote(self, indice, tamano):
+        # Cada lote tiene su propia semilla derivada: el resultado no depende
+        # del orden en que los procesos terminan
+        semilla = np.random.SeedSequence(self.semilla.entropy, spawn_key=(indice,))
+        rng = np.random.default_rng(semilla)
+        valores = {}
+        for familia, nominal in self.nominales.items():
+            uniforme = rng.uniform(-1, 1, (tamano, len(nominal)))
+            normal = rng.standard_normal((tamano, len(nominal))) / 3
+            factor = np.where(self.normales[familia], normal, uniforme)
+            valores[familia] = nominal * (1 + self.tolerancias[familia] * factor)
+        return valores
+
+
+class MuestreoRejilla:
+    # Producto cartesiano de valores explícitos para algunos componentes
+    def __init__(self, compilado, parametros):
+        self.nominales = {familia: np.array(getattr(compilado, familia).valor) for familia in FAMILIAS_VARIABLES}
+        self.ejes = []
+        for componente, valores in parametros.items():
+            familia, k = compilado.ubicaciones[componente]
+            if familia not in FAMILIAS_VARIABLES:
+                raise ValueError(f"No se puede variar el valor de {componente}")
+            self.ejes.append((familia, k, np.asarray(valores, dtype=float)))
+        self.forma = tuple(len(eje[2]) for eje in self.ejes)
+        self.total = int(np.prod(self.forma)) if self.forma else 1
+
+    def lote(self, inicio, tamano):
+        planos = np.arange(inicio, min(inicio + tamano, self.total))
+        coordenadas = np.unravel_index(planos, self.forma) if self.forma else ()
+        valores = {f: np.repeat(v[None], len(planos), axis=0) for f, v in self.nominales.items()}
+        for (familia, k, eje), coordenada in zip(self.ejes, coordenadas):
+            valores[familia][:, k] = eje[coordenada]
+        return valores
+
+
+class Estadisticas:
+    # Acumulador por lotes: media y varianza combinadas (Chan), extremos,
+    # rendimiento frente a límites y las métricas escalares para percentiles
+    def __init__(self, salidas, limites=None, percentiles=(5, 50, 95)):
+        self.salidas = list(salidas)
+        self.limites = limites or {}
+        self.percentiles = percentiles
+        m = len(self.salidas)
+        self.n = 0
+        self.media = np.zeros(m)
+        self.m2 = np.zeros(m)
+        self.minimo = np.full(m, np.inf)
+        self.maximo = np.full(m, -np.inf)
+        self.aprobadas = 0
+        self._valores = []
+
+    def agregar(self, metricas):
+        k = len(metricas)
+        if not k:
+            return
+        media_lote = metricas.mean(axis=0)
+        m2_lote = ((metricas - media_lote) ** 2).sum(axis=0)
+        delta = media_lote - self.media
+        total = self.n + k
+        self.media = self.media + delta * k / total
+        self.m2 = self.m2 + m2_lote + delta**2 * self.n * k / total
+        self.n = total
+        self.minimo = np.minimum(self.minimo, metricas.min(axis=0))
+        self.maximo = np.maximum(self.maximo, metricas.max(axis=0))
+        self._valores.append(metricas)
+
+        aprobadas = np.ones(k, dtype=bool)
+        for i, salida in enumerate(self.salidas):
+            if salida in self.limites:
+                inferior, superior = self.limites[salida]
+                aprobadas &= (metricas[:, i] >= inferior) & (metricas[:, i] <= superior)
+        self.aprobadas += int(aprobadas.sum())
+
+    def valores(self):
+        # Sólo métricas escalares (muestras x salidas), nunca formas de onda.
+        # Los lotes se unen una vez y la unión se conserva
+        if len(self._valores) > 1:
+            self._valores = [np.concatenate(self._valores)]
+        return self._valores[0] if self._valores else np.zeros((0, len(self.salidas)))
+
+    def resumen(self):
+        valores = self.valores()
+        desviacion = np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.zeros(len(self.salidas))
+        tabla = np.percentile(valores, self.percentiles, axis=0) if self.n else None
+        resultado = {
+            'muestras': self.n,
+            'rendimiento': self.aprobadas / self.n if self.n else 0.0,
+            'salidas': {}
+        }
+        for i, salida in enumerate(self.salidas):
+            resultado['salidas'][salida] = {
+                'media': self.media[i],
+                'desviacion': desviacion[i],
+                'minimo': self.minimo[i],
+                'maximo': self.maximo[i],
+                'percentiles': {p: tabla[j, i] for j, p in enumerate(self.percentiles)} if self.n else {}
+            }
+        return resultado
+
+
+def _resolver_lote(sistema, mapa, valores, s, b, columnas, magnitud):
+    datos = mapa.datos(sistema, valores, s)
+    if sistema.dimension <= UMBRAL_DENSO:
+        A = sistema.patron.densa(datos)
+        X = np.linalg.solve(A, np.broadcast_to(b, (len(datos), len(b)))[..., None])[..., 0]
+    else:
+        orden = OrdenColumnas(sistema.patron, datos[0])
+        X = np.stack([orden.resolver(d, b) for d in datos])
+    metricas = np.where(columnas >= 0, X[:, columnas], 0)
+    return np.abs(metricas) if magnitud else metricas.real
+
+
+# Estado de cada proceso trabajador: el circuito compilado se envía una sola vez
+_TRABAJO = None
+
+
+def _iniciar_trabajador(trabajo):
+    global _TRABAJO
+    _TRABAJO = trabajo
+
+
+def _ejecutar_lote(argumentos):
+    sistema, mapa, muestreo, s, b, columnas, magnitud = _TRABAJO
+    inicio, tamano = argumentos
+    return _resolver_lote(sistema, mapa, muestreo.lote(inicio, tamano), s, b, columnas, magnitud)
+
+
+def _preparar(compilado, salidas, frecuencia):
+    sistema = compilado.mna
+    if frecuencia:
+        s, b = 2j * np.pi * frecuencia, sistema.excitacion_ac()
+    else:
+        s, b = 0, sistema.excitacion(0)
+    columnas = np.array([compilado.nodo_indices[nodo] for nodo in salidas], dtype=np.int64)
+    return sistema, _Mapa(sistema), s, b, columnas, bool(frecuencia)
+
+
+def _tamano_lote(sistema, lote):
+    if sistema.dimension <= UMBRAL_DENSO:
+        return max(1, min(lote, MEMORIA_LOTE // (16 * sistema.dimension**2)))
+    return lote
+
+
+def _por_lotes(compilado, muestreo, total, salidas, frecuencia, limites, percentiles, lote, procesos,
+               inicio_lote):
+    sistema, mapa, s, b, columnas, magnitud = _preparar(compilado, salidas, frecuencia)
+    tamano = _tamano_lote(sistema, lote)
+    tareas = [(inicio_lote(i, tamano), min(tamano, total - i * tamano))
+              for i in range((total + tamano - 1) // tamano)]
+    estadisticas = Estadisticas(salidas, limites, percentiles)
+
+    # Los sistemas pequeños ya se resuelven apilados en NumPy; los grandes se
+    # reparten entre procesos
+    if procesos is None:
+        procesos = 1 if sistema.dimension <= UMBRAL_DENSO else os.cpu_count() or 1
+    if procesos <= 1 or len(tareas) <= 1:
+        for inicio, k in tareas:
+            valores = muestreo.lote(inicio, k)
+            estadisticas.agregar(_resolver_lote(sistema, mapa, valores, s, b, columnas, magnitud))
+            yield estadisticas
+        return
+
+    trabajo = (sistema, mapa, muestreo, s, b, columnas, magnitud)
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                             initargs=(trabajo,)) as ejecutor:
+        for metricas in ejecutor.map(_ejecutar_lote, tareas):
+            estadisticas.agregar(metricas)
+            yield estadisticas
+
+
+def montecarlo_por_lotes(circuito, variaciones, muestras, salidas, frecuencia=0, limites=None,
+                         percentiles=(5, 50, 95), semilla=None, lote=256, procesos=None):
+    # Entrega las Estadisticas acumuladas tras cada lote (siempre el mismo
+    # objeto). resumen() ordena todas las métricas guardadas para los
+    # percentiles: se llama sólo cuando hace falta, no en cada lote
+    compilado = _compilar(circuito)
+    muestreo = MuestreoAleatorio(compilado, variaciones, semilla)
+    # En el muestreo aleatorio el primer argumento de lote() es el número de lote
+    return _por_lotes(compilado, muestreo, muestras, salidas, frecuencia, limites, percentiles,
+                      lote, procesos, lambda i, tamano: i)
+
+
+def montecarlo(circuito, variaciones, muestras, salidas, **opciones):
+    estadisticas = None
+    for estadisticas in montecarlo_por_lotes(circuito, variaciones, muestras, salidas, **opciones):
+        pass
+    if estadisticas is None:
+        return Estadisticas(salidas, opciones.get('limites'), opciones.get('percentiles', (5, 50, 95))).resumen()
+    return estadisticas.resumen()
+
+
+def barrido_parametrico_por_lotes(circuito, parametros, salidas, frecuencia=0, limites=None,
+                                  percentiles=(5, 50, 95), lote=256, procesos=None):
+    compilado = _compilar(circuito)
+    muestreo = MuestreoRejilla(compilado, parametros)
+    return _por_lotes(compilado, muestreo, muestreo.total, salidas, frecuencia, limites, percentiles,
+                      lote, procesos, lambda i, tamano: i * tamano), muestreo.forma
+
+
+def barrido_parametrico(circuito, parametros, salidas, **opciones):
+    # A diferencia del Monte Carlo, devuelve también la rejilla completa de
+    # métricas, con forma (valores de cada parámetro..., salidas)
+    lotes, forma = barrido_parametrico_por_lotes(circuito, parametros, salidas, **opciones)
+    estadisticas = None
+    for estadisticas in lotes:
+        pass
+    resumen = estadisticas.resumen()
+    resumen['valores'] = estadisticas.valores().reshape(forma + (len(salidas),))
+    return resumen
@@ -0,0 +1,194 @@
+import re
+
+from core.circuito import Circuito
+from core.componentes import (Resistencia, Capacitor, Inductor, FuenteDC, FuenteAC,
+                              Tierra, Cable, Diodo, TransistorBJT)
+
+# Netlist de texto al estilo SPICE, una línea por componente:
+#   R<nombre> n1 n2 valor          C<nombre> n1 n2 valor      L<nombre> n1 n2 valor
+#   V<nombre> n+ n- [DC] valor     V<nombre> n+ n- AC amplitud frecuencia [fase]
+#   D<nombre> ánodo cátodo [IS=.. N=.. VT=..]
+#   Q<nombre> colector base emisor [BF=.. BR=.. IS=.. VT=.. VBE=..]
+#   W<nombre> n1 n2 (cable)        GND<nombre> nodo (tierra)
+# '*' inicia un comentario, '+' continúa la línea anterior y las directivas
+# ('.end', ...) se ignoran. El nodo 0 es tierra. Un comentario ';@ x y' al
+# final de la línea guarda la posición del componente en el editor.
+NODO_TIERRA = '0'
+
+SUFIJOS = {'f': 1e-15, 'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'µ': 1e-6, 'm': 1e-3,
+           'k': 1e3, 'meg': 1e6, 'g': 1e9, 't': 1e12}
+
+_NUMERO = re.compile(r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|[fpnuµmkgt])?[a-zΩ]*$', re.IGNORECASE)
+
+PARAMETROS_DIODO = {'IS': 'Is', 'N': 'n', 'VT': 'Vt'}
+PARAMETROS_BJT = {'BF': 'beta', 'BR': 'beta_r', 'IS': 'Is', 'VT': 'Vt', 'VBE': 'Vbe_on'}
+
+
+def valor_spice(texto):
+    coincidencia = _NUMERO.match(texto.strip())
+    if not coincidencia:
+        raise ValueError(f"Valor numérico no válido: {texto}")
+    numero, sufijo = coincidencia.groups()
+    return float(numero) * (SUFIJOS[sufijo.lower()] if sufijo else 1.0)
+
+
+def _parametros(tokens, nombres):
+    parametros = {}
+    for token in tokens:
+        clave, _, valor = token.partition('=')
+        if clave.upper() not in nombres or not valor:
+            raise ValueError(f"Parámetro desconocido: {token}")
+        parametros[nombres[clave.upper()]] = valor_spice(valor)
+    return parametros
+
+
+def _fuente(nombre, n1, n2, tokens):
+    if tokens and tokens[0].upper() == 'AC':
+        if len(tokens) not in (3, 4):
+            raise ValueError("Una fuente AC necesita amplitud, frecuencia y opcionalmente fase")
+        return FuenteAC(nombre, n1, n2, *[valor_spice(t) for t in tokens[1:]])
+    if tokens and tokens[0].upper() == 'DC':
+        tokens = tokens[1:]
+    if len(tokens) != 1:
+        raise ValueError("Una fuente DC necesita un único valor")
+    return FuenteDC(nombre, n1, n2, valor_spice(tokens[0]))
+
+
+def componente_desde_linea(tokens):
+    etiqueta = tokens[0]
+    if etiqueta.upper().startswith('GND'):
+        if len(tokens) != 2:
+            raise ValueError("Una tierra tiene un único nodo")
+        return Tierra(etiqueta[3:], tokens[1])
+
+    tipo, nombre = etiqueta[0].upper(), etiqueta[1:]
+    if tipo in 'RCL':
+        if len(tokens) != 4:
+            raise ValueError(f"{etiqueta}: se esperaban dos nodos y un valor")
+        clase = {'R': Resistencia, 'C': Capacitor, 'L': Inductor}[tipo]
+        return clase(nombre, tokens[1], tokens[2], valor_spice(tokens[3]))
+    if tipo == 'V':
+        return _fuente(nombre, tokens[1], tokens[2], tokens[3:])
+    if tipo == 'W':
+        return Cable(nombre, tokens[1], tokens[2])
+    if tipo == 'D':
+        return Diodo(nombre, tokens[1], tokens[2], **_parametros(tokens[3:], PARAMETROS_DIODO))
+    if tipo == 'Q':
+        colector, base, emisor = tokens[1:4]
+        return TransistorBJT(nombre, base, colector, emisor, **_parametros(tokens[4:], PARAMETROS_BJT))
+    raise ValueError(f"Tipo de componente desconocido: {etiqueta}")
+
+
+def _posicion(comentario):
+    if not comentario.startswith('@'):
+        return None
+    try:
+        x, y = comentario[1:].split()
+        return float(x), float(y)
+    except ValueError:
+        raise ValueError(f"Posición no válida: {comentario}") from None
+
+
+def _lineas(texto):
+    # Une las continuaciones '+' y descarta comentarios, vacías y directivas
+    lineas = []
+    for numero, linea in enumerate(texto.splitlines(), 1):
+        linea, _, comentario = linea.partition(';')
+        linea = linea.strip()
+        if not linea or linea.startswith('*'):
+            continue
+        if linea.startswith('+') and lineas:
+            lineas[-1][1].extend(linea[1:].split())
+            continue
+        try:
+            posicion = _posicion(comentario.strip())
+        except ValueError as e:
+            raise ValueError(f"Línea {numero}: {e}") from None
+        lineas.append((numero, linea.split(), posicion))
+    return [linea for linea in lineas if not linea[1][0].startswith('.')]
+
+
+def leer_netlist(texto, posiciones=None):
+    # Si se pasa un diccionario, se llena con las posiciones del editor
+    componentes = []
+    for numero, tokens, posicion in _lineas(texto):
+        try:
+            componente = componente_desde_linea(tokens)
+        except (ValueError, IndexError, TypeError) as e:
+            raise ValueError(f"Línea {numero}: {e}") from None
+        componentes.append(componente)
+        if posiciones is not None and posicion is not None:
+            posiciones[componente] = posicion
+
+    # El nodo 0 es tierra aunque no se declare un GND
+    tierras = {c.nodo1 for c in componentes if isinstance(c, Tierra)}
+    if NODO_TIERRA not in tierras and any(NODO_TIERRA in c.terminales for c in componentes):
+        componentes.append(Tierra(NODO_TIERRA, NODO_TIERRA))
+    return Circuito.desde_componentes(componentes)
+
+
+def cargar_netlist(ruta, posiciones=None):
+    with open(ruta, encoding='utf-8') as archivo:
+        return leer_netlist(archivo.read(), posiciones)
+
+
+def _numero(valor):
+    # repr conserva el float exacto y valor_spice lo vuelve a leer igual
+    return repr(float(valor))
+
+
+def _campo(texto):
+    texto = str(texto)
+    if not texto or any(c.isspace() or c in ';=' for c in texto):
+        raise ValueError(f"No se puede escribir '{texto}' en una netlist")
+    return texto
+
+
+def linea_componente(componente):
+    nombre = str(componente.nombre)
+    if any(c.isspace() or c == ';' for c in nombre):
+        raise ValueError(f"No se puede escribir el nombre '{nombre}' en una netlist")
+    nodos = " ".join(_campo(n) for n in componente.terminales)
+
+    if isinstance(componente, Tierra):
+        return f"GND{nombre} {nodos}"
+    for tipo, letra, valor in ((Resistencia, 'R', 'resistencia'), (Capacitor, 'C', 'capacitancia'),
+                               (Inductor, 'L', 'inductancia')):
+        if isinstance(componente, tipo):
+            return f"{letra}{nombre} {nodos} {_numero(getattr(componente, valor))}"
+    if isinstance(componente, FuenteDC):
+        return f"V{nombre} {nodos} DC {_numero(componente.voltaje)}"
+    if isinstance(componente, FuenteAC):
+        valores = (componente.amplitud, componente.frecuencia, componente.fase)
+        return f"V{nombre} {nodos} AC " + " ".join(map(_numero, valores))
+    if isinstance(componente, Cable):
+        return f"W{nombre} {nodos}"
+    if isinstance(componente, Diodo):
+        parametros = PARAMETROS_DIODO
+        etiqueta = f"D{nombre} {nodos}"
+    elif isinstance(componente, TransistorBJT):
+        parametros = PARAMETROS_BJT
+        etiqueta = f"Q{nombre} {_campo(componente.nodoC)} {_campo(componente.nodoB)} {_campo(componente.nodoE)}"
+    else:
+        raise ValueError(f"Tipo de componente desconocido: {type(componente).__name__}")
+    return etiqueta + "".join(f" {clave}={_numero(getattr(componente, atributo))}"
+                              for clave, atributo in parametros.items())
+
+
+def escribir_netlist(circuito, posiciones=None):
+    posiciones = posiciones or {}
+    lineas = [f"* voltimper: {len(circuito.componentes)} componentes"]
+    for componente in circuito.componentes:
+        linea = linea_componente(componente)
+        if componente in posiciones:
+            x, y = posiciones[componente]
+            linea += f" ;@ {_numero(x)} {_numero(y)}"
+        lineas.append(linea)
+    lineas.append(".end")
+    return "\n".join(lineas) + "\n"
+
+
+def guardar_netlist(circuito, ruta, posiciones=None):
+    texto = escribir_netlist(circuito, posiciones)
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        archivo.write(texto)
@@ -0,0 +1,387 @@
+import time
+
+import numpy as np
+
+from core.mna import UMBRAL_DENSO, GMIN, Factorizacion, OrdenColumnas
+from core.instrumentacion import contar, etapa
+
+# Límite del exponente para que exp() no desborde antes de que actúe la limitación
+EXPONENTE_MAXIMO = 200.0
+
+# Newton en cada paso del transitorio: la factorización de la iteración
+# anterior se conserva mientras las conductancias de las uniones no cambien
+# más que esta tolerancia relativa, y sólo en las primeras iteraciones
+CAMBIO_CONDUCTANCIAS = 0.05
+ITERACIONES_REUSO = 5
+
+# Incidencia de las uniones: diodo (ánodo, cátodo) -> V_d;
+# transistor (B, C, E) -> (V_be, V_bc)
+_UNIONES_DIODO = np.array([[1.0, -1.0]])
+_UNIONES_BJT = np.array([[1.0, 0.0, -1.0],
+                         [1.0, -1.0, 0.0]])
+
+
+def _limitar_union(v_nuevo, v_anterior, vt, v_critico):
+    # Limitación de voltaje de unión pn (pnjlim de SPICE), vectorizada
+    salto = (v_nuevo > v_critico) & (np.abs(v_nuevo - v_anterior) > 2 * vt)
+    if not salto.any():
+        return v_nuevo
+    arg = 1 + (v_nuevo - v_anterior) / vt
+    desde_positivo = np.where(arg > 0, v_anterior + vt * np.log(np.maximum(arg, 1e-300)), v_critico)
+    desde_cero = vt * np.log(np.maximum(v_nuevo / vt, 1e-300))
+    limitado = np.where(v_anterior > 0, desde_positivo, desde_cero)
+    return np.where(salto, limitado, v_nuevo)
+
+
+def _transistores_a_terminales(beta, beta_r):
+    # K[k, terminal, unión]: corrientes que entran por (B, C, E) en función
+    # de las corrientes de las uniones (i_F, i_R) del modelo de transporte
+    K = np.zeros((len(beta), 3, 2))
+    K[:, 0, 0], K[:, 0, 1] = 1 / beta, 1 / beta_r
+    K[:, 1, 0], K[:, 1, 1] = 1.0, -(1 + 1 / beta_r)
+    K[:, 2, 0], K[:, 2, 1] = -(1 + 1 / beta), 1.0
+    return K
+
+
+class ModelosNoLineales:
+    # Todas las uniones pn del circuito (una por diodo, dos por transistor)
+    # en un único vector u, con I_u = Is·(e^{u/Vt} - 1). Las corrientes de
+    # los terminales son K·I_u y la linealización de Newton se reduce a
+    # sumas ponderadas de las conductancias de las uniones, precalculadas
+    # como (posición, unión, coeficiente) sobre las entradas reservadas del
+    # patrón: ninguna iteración construye matrices ni bucles por dispositivo
+    def __init__(self, sistema):
+        self.sistema = sistema
+        diodos = sistema.compilado.diodos
+        transistores = sistema.compilado.transistores
+        nd, nq = len(diodos), len(transistores)
+        self.num_diodos = nd
+        self.num_uniones = nd + 2 * nq
+
+        self.Is = np.concatenate([diodos.Is, np.repeat(transistores.Is, 2)])
+        self.vt = np.concatenate([diodos.nVt, np.repeat(transistores.Vt, 2)])
+        self.vcrit = self.vt * np.log(self.vt / (np.sqrt(2) * self.Is))
+
+        familias = (
+            (sistema.terminales_diodos, sistema.slots_diodos, _UNIONES_DIODO, np.ones((nd, 1, 1)) * [[1.0], [-1.0]]),
+            (sistema.terminales_transistores, sistema.slots_transistores, _UNIONES_BJT,
+             _transistores_a_terminales(transistores.beta, transistores.beta_r)),
+        )
+        positivos, negativos, K_familias = [], [], []
+        destinos, uniones_m, coef_m = [], [], []
+        filas_r, uniones_r, coef_r = [], [], []
+        inicio = 0
+        for T, slots, P, K in familias:
+            n, terminales = T.shape
+            locales = P.shape[0]
+            union = inicio + np.arange(n * locales).reshape(n, locales)
+            # u = x[positivo] - x[negativo]; la referencia (-1) lee un cero
+            # añadido al final de x
+            ext = np.where(T >= 0, T, sistema.dimension)
+            positivos.append(ext[:, np.argmax(P, axis=1)].ravel())
+            negativos.append(ext[:, np.argmin(P, axis=1)].ravel())
+            K_familias.append(K)
+            # dI_t/dx_c = Σ_j K[t, j]·g_j·P[j, c], en el slot (t, c)
+            coef = K.transpose(0, 2, 1)[:, :, :, None] * P[None, :, None, :]
+            forma = coef.shape
+            validos = (np.broadcast_to(slots[:, None], forma) >= 0) & (coef != 0)
+            destinos.append(np.broadcast_to(slots[:, None], forma)[validos])
+            uniones_m.append(np.broadcast_to(union[:, :, None, None], forma)[validos])
+            coef_m.append(coef[validos])
+            # rhs[T_t] -= Σ_j K[t, j]·(I_j - g_j·u_j)
+            forma = K.shape
+            validos = (np.broadcast_to(T[:, :, None], forma) >= 0) & (K != 0)
+            filas_r.append(np.broadcast_to(T[:, :, None], forma)[validos])
+            uniones_r.append(np.broadcast_to(union[:, None, :], forma)[validos])
+            coef_r.append(K[validos])
+            inicio += n * locales
+
+        self._positivos = np.concatenate(positivos)
+        self._negativos = np.concatenate(negativos)
+        self._K_diodos, self._K_transistores = K_familias
+        # Posiciones distintas del patrón que tocan las uniones; linealizar()
+        # devuelve un valor por posición
+        self.posiciones, self._destino = np.unique(np.concatenate(destinos), return_inverse=True)
+        self._destino = self._destino.ravel()
+        self._union_matriz = np.concatenate(uniones_m)
+        self._coef_matriz = np.concatenate(coef_m)
+        self._fila_rhs = np.concatenate(filas_r)
+        self._union_rhs = np.concatenate(uniones_r)
+        self._coef_rhs = np.concatenate(coef_r)
+        self._x = np.zeros(sistema.dimension + 1)
+
+    def uniones(self, x):
+        self._x[:-1] = x
+        return self._x[self._positivos] - self._x[self._negativos]
+
+    def limitar(self, uniones, anteriores):
+        return _limitar_union(uniones, anteriores, self.vt, self.vcrit)
+
+    def evaluar(self, uniones):
+        # Corrientes de las uniones y sus conductancias dI/du
+        e = np.exp(np.minimum(uniones / self.vt, EXPONENTE_MAXIMO))
+        return self.Is * (e - 1), self.Is * e / self.vt
+
+    def linealizar(self, uniones, corrientes, conductancias):
+        # Linealización I ≈ I0 + G·(u - u0): valores a sumar en self.posiciones
+        # de la matriz y el lado derecho con el término constante I0 - G·u0
+        valores = np.bincount(self._destino, self._coef_matriz * conductancias[self._union_matriz],
+                              len(self.posiciones))
+        ieq = corrientes - conductancias * uniones
+        rhs = -np.bincount(self._fila_rhs, self._coef_rhs * ieq[self._union_rhs], self.sistema.dimension)
+        return valores, rhs
+
+    def estampar(self, uniones, evaluados=None):
+        # Como linealizar() pero con los valores sobre todo el patrón.
+        # evaluados es el resultado de evaluar(uniones), quizá con las G de
+        # otra iteración
+        corrientes, conductancias = evaluados if evaluados is not None else self.evaluar(uniones)
+        valores, rhs = self.linealizar(uniones, corrientes, conductancias)
+        datos = np.zeros(self.sistema.patron.nnz)
+        datos[self.posiciones] = valores
+        return datos, rhs
+
+    def corrientes(self, x):
+        # Corrientes que entran por cada terminal: (diodos x 2, transistores x 3)
+        I = self.evaluar(self.uniones(x))[0]
+        I_d = I[:self.num_diodos, None] * [1.0, -1.0]
+        I_q = np.einsum('ntj,nj->nt', self._K_transistores, I[self.num_diodos:].reshape(-1, 2))
+        return I_d, I_q
+
+
+def _convergio(x_nuevo, x, tolerancia_rel, tolerancias_abs):
+    limite = tolerancia_rel * np.maximum(np.abs(x_nuevo), np.abs(x)) + tolerancias_abs
+    return (np.abs(x_nuevo - x) <= limite).all()
+
+
+def _tolerancias(sistema, vntol, abstol):
+    tolerancias_abs = np.full(sistema.dimension, abstol)
+    tolerancias_abs[:sistema.num_nodos] = vntol
+    return tolerancias_abs
+
+
+class NewtonTransitorio:
+    # Newton de cada paso del transitorio sobre base + estampados, donde base
+    # son los datos de la parte lineal (estatica + α·dinamica) y b incluye
+    # la historia de los modelos de compañía. Parte de la solución del paso
+    # anterior y, mientras base sea la misma y las conductancias de las
+    # uniones casi no cambien, reutiliza la factorización (Newton modificado:
+    # el criterio de convergencia es el mismo). En denso la matriz se
+    # escribe en un único arreglo (base + estampados en sus posiciones) que
+    # LAPACK factoriza en su sitio; en disperso se reutiliza el ordenamiento
+    # de columnas
+    def __init__(self, sistema, tolerancia_rel=1e-3, vntol=1e-6, abstol=1e-9, max_iter=50):
+        self.sistema = sistema
+        self.modelos = ModelosNoLineales(sistema)
+        self.tolerancia_rel = tolerancia_rel
+        self.tolerancias_abs = _tolerancias(sistema, vntol, abstol)
+        self.max_iter = max_iter
+        self.densa = sistema.dimension <= UMBRAL_DENSO
+        self.orden = None
+        self.lu = None
+        self.base = None
+        self.conductancias = None
+        self.factorizaciones = 0
+        self.iteraciones = 0
+        if self.densa:
+            from scipy.linalg import get_lapack_funcs
+            n = sistema.dimension
+            self._A = np.zeros((n, n), order='F')
+            self._getrf, self._getrs = get_lapack_funcs(('getrf', 'getrs'), (self._A,))
+            # Vista plana (orden de Fortran) del arreglo y posiciones de las
+            # uniones en ella
+            self._plana = self._A.reshape(-1, order='F')
+            patron = sistema.patron
+            self._planas = patron.indices[self.modelos.posiciones] * n + patron.filas[self.modelos.posiciones]
+            self._densa_de = None
+
+    def _reutilizable(self, base, conductancias):
+        if self.lu is None or base is not self.base:
+            return False
+        return (np.abs(conductancias - self.conductancias)
+                <= CAMBIO_CONDUCTANCIAS * np.abs(self.conductancias) + GMIN).all()
+
+    def _factorizar(self, base, valores):
+        with etapa('factorizacion'):
+            if self.densa:
+                if self._densa_de is not base:
+                    self._densa = self.sistema.patron.densa(base)
+                    self._densa_de = base
+                self._A[...] = self._densa
+                self._plana[self._planas] += valores
+                lu, piv, info = self._getrf(self._A, overwrite_a=True)
+                if info != 0:
+                    raise np.linalg.LinAlgError("Matriz singular")
+                self.lu = (lu, piv)
+            else:
+                datos = base.copy()
+                datos[self.modelos.posiciones] += valores
+                if self.orden is None:
+                    self.orden = OrdenColumnas(self.sistema.patron, datos)
+                self.lu = self.orden.factorizar(datos)
+        self.factorizaciones += 1
+
+    def _sustituir(self, b):
+        if self.densa:
+            x, info = self._getrs(*self.lu, b)
+            return x
+        return self.orden.sustituir(self.lu, b)
+
+    def resolver(self, base, b, x):
+        # Devuelve (x, convergio); sin convergencia, la última iteración
+        modelos = self.modelos
+        anteriores = modelos.uniones(x)
+        for iteracion in range(self.max_iter):
+            uniones = modelos.limitar(modelos.uniones(x), anteriores)
+            anteriores = uniones
+            corrientes, conductancias = modelos.evaluar(uniones)
+            reutilizar = iteracion < ITERACIONES_REUSO and self._reutilizable(base, conductancias)
+            if reutilizar:
+                conductancias = self.conductancias
+            valores, rhs = modelos.linealizar(uniones, corrientes, conductancias)
+            try:
+                if not reutilizar:
+                    self._factorizar(base, valores)
+                    self.base, self.conductancias = base, conductancias
+                x_nuevo = self._sustituir(b + rhs)
+            except np.linalg.LinAlgError:
+                self.lu = None
+                return x, False
+            self.iteraciones += 1
+            contar('iteraciones_newton')
+
+            if not np.isfinite(x_nuevo).all():
+                return x, False
+            convergio = _convergio(x_nuevo, x, self.tolerancia_rel, self.tolerancias_abs)
+            x = x_nuevo
+            if convergio:
+                return x, True
+        return x, False
+
+
+class _Resolutor:
+    def __init__(self, sistema):
+        self.patron = sistema.patron
+        self.orden = None
+        self.densa = sistema.dimension <= UMBRAL_DENSO
+
+    def resolver(self, datos, b):
+        if self.densa:
+            return Factorizacion(self.patron.matriz(datos)).resolver(b)
+        if self.orden is None:
+            self.orden = OrdenColumnas(self.patron, datos)
+        return self.orden.resolver(datos, b)
+
+
+def _newton(sistema, modelos, resolutor, b, x, gmin, tolerancia_rel, tolerancias_abs, max_iter, contador):
+    extra = np.zeros(sistema.patron.nnz)
+    extra[sistema.pos_diagonal] = gmin
+    base = sistema.estatica + extra
+    anteriores = modelos.uniones(x)
+
+    for _ in range(max_iter):
+        uniones = modelos.limitar(modelos.uniones(x), anteriores)
+        anteriores = uniones
+        datos, rhs = modelos.estampar(uniones)
+        try:
+            x_nuevo = resolutor.resolver(base + datos, b + rhs)
+        except np.linalg.LinAlgError:
+            return x, False
+        contador[0] += 1
+        contar('iteraciones_newton')
+
+        if not np.all(np.isfinite(x_nuevo)):
+            return x, False
+        convergio = _convergio(x_nuevo, x, tolerancia_rel, tolerancias_abs)
+        x = x_nuevo
+        if convergio:
+            return x, True
+    return x, False
+
+
+def punto_operacion(sistema, tolerancia_rel=1e-3, vntol=1e-6, abstol=1e-9, max_iter=100,
+                    pasos_gmin=10, pasos_fuente_min=1e-3, b=None):
+    # b: excitación a usar en lugar de la de continua (p. ej. la del primer
+    # instante de un transitorio)
+    inicio = time.perf_counter()
+    modelos = ModelosNoLineales(sistema)
+    resolutor = _Resolutor(sistema)
+    if b is None:
+        b = sistema.excitacion(0)
+    tolerancias_abs = _tolerancias(sistema, vntol, abstol)
+    contador = [0]
+    opciones = (tolerancia_rel, tolerancias_abs, max_iter, contador)
+
+    x0 = np.zeros(sistema.dimension)
+    if not modelos.num_uniones:
+        # Circuito lineal: una sustitución con la factorización que conserva
+        # el sistema (tras un cambio de valor sólo lleva la corrección)
+        try:
+            x = sistema.factorizacion(0).resolver(b)
+            contador[0] += 1
+            return completar_respuesta(sistema, {
+                'solucion': x,
+                'convergio': bool(np.all(np.isfinite(x))),
+                'estrategia': 'lineal',
+                'iteraciones': contador[0],
+                'tiempo': time.perf_counter() - inicio
+            }, modelos)
+        except np.linalg.LinAlgError:
+            pass
+
+    estrategia = 'newton'
+    x, convergio = _newton(sistema, modelos, resolutor, b, x0, 0.0, *opciones)
+
+    if not convergio:
+        # Escalonamiento de gmin: se parte de un circuito muy amortiguado y se
+        # reduce la conductancia auxiliar usando la solución anterior
+        estrategia = 'gmin'
+        x = x0
+        for gmin in np.logspace(-2, np.log10(GMIN), pasos_gmin):
+            x, convergio = _newton(sistema, modelos, resolutor, b, x, gmin, *opciones)
+            if not convergio:
+                break
+        if convergio:
+            x, convergio = _newton(sistema, modelos, resolutor, b, x, 0.0, *opciones)
+
+    if not convergio:
+        # Escalonamiento de fuentes, con paso adaptativo
+        estrategia = 'fuentes'
+        x = x0
+        escala, paso = 0.0, 0.1
+        while escala < 1:
+            objetivo = min(1.0, escala + paso)
+            x_nuevo, ok = _newton(sistema, modelos, resolutor, objetivo * b, x, 0.0, *opciones)
+            if ok:
+                x, escala = x_nuevo, objetivo
+                paso = min(2 * paso, 1.0)
+            else:
+                paso /= 2
+                if paso < pasos_fuente_min:
+                    break
+        convergio = escala >= 1
+
+    return completar_respuesta(sistema, {
+        'solucion': x,
+        'convergio': convergio,
+        'estrategia': estrategia,
+        'iteraciones': contador[0],
+        'tiempo': time.perf_counter() - inicio
+    }, modelos)
+
+
+def completar_respuesta(sistema, respuesta, modelos=None):
+    # Voltajes por nodo y corrientes por componente a partir de la solución
+    # (también para respuestas recuperadas de una caché)
+    if modelos is None:
+        modelos = ModelosNoLineales(sistema)
+    x = respuesta['solucion']
+    I_d, I_q = modelos.corrientes(x)
+    corrientes = {c: x[i] for c, i in sistema.rama_indices.items()}
+    corrientes.update({d: I_d[k, 0] for k, d in enumerate(sistema.compilado.diodos.componentes)})
+    corrientes.update({q: tuple(I_q[k]) for k, q in enumerate(sistema.compilado.transistores.componentes)})
+
+    respuesta['voltajes'] = {nodo: sistema.voltaje_nodo(x, nodo) for nodo in sistema.nodo_indices}
+    respuesta['corrientes'] = corrientes
+    respuesta['sistema'] = sistema
+    return respuesta
@@ -0,0 +1,175 @@
+import gc
+
+import numpy as np
+
+from core.circuito import Circuito
+from core.compacto import CircuitoCompacto
+from core.compilado import CircuitoCompilado, FAMILIAS, PARAMETROS
+from core.netlist import cargar_netlist, guardar_netlist
+from core.instrumentacion import medido
+
+# Formato compacto (.cirz): un .npz sin comprimir con arreglos empaquetados.
+# 'nodos' guarda los nombres de nodo ordenados y, por familia de FAMILIAS:
+#   <familia>.nombres     nombre de cada componente
+#   <familia>.nodos       índices en 'nodos' (componentes x terminales)
+#   <familia>.orden       posición en Circuito.componentes
+#   <familia>.<parámetro> un arreglo por parámetro del constructor
+#   <familia>.posiciones  posición en el editor (NaN si no tiene)
+# Al cargarlo se compila la topología directamente desde los arreglos, o se
+# pasan tal cual a un CircuitoCompacto (compacto=True) sin crear objetos.
+EXTENSION_COMPACTA = '.cirz'
+VERSION_COMPACTA = 1
+
+_FIRMA_NPZ = b'PK\x03\x04'
+
+
+def _arreglos_compacto(circuito, posiciones):
+    # Los arreglos de un CircuitoCompacto ya tienen el formato del archivo;
+    # sólo se renumeran los nodos por nombre
+    nombres_nodos, familias = circuito.arreglos()
+    orden = np.argsort(np.array(nombres_nodos, dtype=str), kind='stable')
+    mapa = np.empty(len(orden), dtype=np.int32)
+    mapa[orden] = np.arange(len(orden))
+    arreglos = {'version': np.array(VERSION_COMPACTA), 'nodos': np.array(nombres_nodos, dtype=str)[orden]}
+    for atributo, datos in familias.items():
+        arreglos[f'{atributo}.orden'] = datos['orden']
+        arreglos[f'{atributo}.nombres'] = datos['nombres']
+        arreglos[f'{atributo}.nodos'] = mapa[datos['nodos']]
+        for parametro in PARAMETROS[atributo]:
+            arreglos[f'{atributo}.{parametro}'] = datos[parametro]
+        arreglos[f'{atributo}.posiciones'] = np.full((len(datos['orden']), 2), np.nan)
+    for componente, posicion in posiciones.items():
+        atributo, k = circuito.ubicacion(componente)
+        arreglos[f'{atributo}.posiciones'][k] = posicion
+    return arreglos
+
+
+def guardar_compacto(circuito, ruta, posiciones=None):
+    posiciones = posiciones or {}
+    if isinstance(circuito, CircuitoCompacto):
+        with open(ruta, 'wb') as archivo:
+            np.savez(archivo, **_arreglos_compacto(circuito, posiciones))
+        return
+
+    nodos = sorted({str(nodo) for nodo in circuito.nodos})
+    indice = {nodo: i for i, nodo in enumerate(nodos)}
+    arreglos = {'version': np.array(VERSION_COMPACTA), 'nodos': np.array(nodos, dtype=str)}
+
+    por_tipo = {}
+    for k, componente in enumerate(circuito.componentes):
+        por_tipo.setdefault(getattr(componente, 'tipo', type(componente)), []).append(k)
+    desconocidos = set(por_tipo) - {tipo for _, tipo, _, _ in FAMILIAS}
+    if desconocidos:
+        raise ValueError(f"Tipo de componente desconocido: {desconocidos.pop().__name__}")
+
+    for atributo, tipo, terminales, _ in FAMILIAS:
+        orden = por_tipo.get(tipo, [])
+        miembros = [circuito.componentes[k] for k in orden]
+        arreglos[f'{atributo}.orden'] = np.array(orden, dtype=np.int64)
+        arreglos[f'{atributo}.nombres'] = np.array([str(c.nombre) for c in miembros], dtype=str)
+        arreglos[f'{atributo}.nodos'] = np.array([[indice[str(n)] for n in c.terminales] for c in miembros],
+                                                 dtype=np.int32).reshape(len(miembros), terminales)
+        for parametro in PARAMETROS[atributo]:
+            arreglos[f'{atributo}.{parametro}'] = np.array([getattr(c, parametro) for c in miembros], dtype=float)
+        arreglos[f'{atributo}.posiciones'] = np.array([posiciones.get(c, (np.nan, np.nan)) for c in miembros],
+                                                      dtype=float).reshape(len(miembros), 2)
+
+    with open(ruta, 'wb') as archivo:
+        np.savez(archivo, **arreglos)
+
+
+def cargar_compacto(ruta, compacto=False):
+    with np.load(ruta, allow_pickle=False) as datos:
+        arreglos = {clave: datos[clave] for clave in datos.files}
+    if int(arreglos['version']) > VERSION_COMPACTA:
+        raise ValueError(f"Versión de archivo no soportada: {int(arreglos['version'])}")
+    if compacto:
+        return _circuito_compacto(arreglos)
+
+    # Crear cientos de miles de objetos dispara el recolector de ciclos sin
+    # que haya nada que recoger: se pausa mientras se construye el circuito
+    recolector = gc.isenabled()
+    gc.disable()
+    try:
+        return _cargar_objetos(arreglos)
+    finally:
+        if recolector:
+            gc.enable()
+
+
+def _circuito_compacto(arreglos):
+    familias = {}
+    for atributo, _, _, _ in FAMILIAS:
+        familias[atributo] = {campo: arreglos[f'{atributo}.{campo}']
+                              for campo in ('orden', 'nombres', 'nodos') + PARAMETROS[atributo]}
+    circuito = CircuitoCompacto.desde_arreglos(arreglos['nodos'], familias)
+
+    posiciones = {}
+    for atributo, _, _, _ in FAMILIAS:
+        xy = arreglos[f'{atributo}.posiciones']
+        for k in np.flatnonzero(~np.isnan(xy).any(axis=1)).tolist():
+            posiciones[circuito.componentes[int(arreglos[f'{atributo}.orden'][k])]] = tuple(xy[k].tolist())
+    return circuito, posiciones
+
+
+def _cargar_objetos(arreglos):
+    # Misma referencia que CircuitoCompilado: los nodos con tierra o, si no
+    # hay ninguna, el primero
+    nodos = arreglos['nodos']
+    nombres_nodos = nodos.tolist()
+    referencia = np.zeros(len(nodos), dtype=bool)
+    referencia[arreglos['tierras.nodos'].ravel()] = True
+    if not referencia.any() and len(nodos):
+        referencia[0] = True
+    mapa = np.full(len(nodos), -1, dtype=np.int64)
+    mapa[~referencia] = np.arange(np.count_nonzero(~referencia))
+    libres = [nombres_nodos[i] for i in np.flatnonzero(~referencia)]
+    nodo_indices = dict(zip(nombres_nodos, mapa.tolist()))
+
+    total = sum(len(arreglos[f'{atributo}.orden']) for atributo, _, _, _ in FAMILIAS)
+    componentes = [None] * total
+    terminales = np.full((total, max(t for _, _, t, _ in FAMILIAS)), -1, dtype=np.int64)
+    grupos = {}
+    posiciones = {}
+    for atributo, tipo, _, _ in FAMILIAS:
+        indices = arreglos[f'{atributo}.nodos']
+        valores = {p: arreglos[f'{atributo}.{p}'] for p in PARAMETROS[atributo]}
+        columnas = [nodos[indices[:, j]].tolist() for j in range(indices.shape[1])]
+        miembros = [tipo(*campos) for campos in zip(arreglos[f'{atributo}.nombres'].tolist(), *columnas,
+                                                    *[v.tolist() for v in valores.values()])]
+        for k, componente in zip(arreglos[f'{atributo}.orden'].tolist(), miembros):
+            componentes[k] = componente
+        terminales[arreglos[f'{atributo}.orden'], :indices.shape[1]] = indices
+        grupos[atributo] = (miembros, mapa[indices], valores)
+
+        xy = arreglos[f'{atributo}.posiciones']
+        validas = np.flatnonzero(~np.isnan(xy).any(axis=1))
+        posiciones.update((miembros[i], tuple(p)) for i, p in zip(validas.tolist(), xy[validas].tolist()))
+
+    compilado = CircuitoCompilado.desde_arreglos(libres, nodo_indices, grupos)
+    return Circuito.desde_componentes(componentes, compilado, nombres_nodos, terminales), posiciones
+
+
+def guardar_circuito(circuito, ruta, posiciones=None):
+    # El formato se elige por la extensión: .cirz compacto, el resto netlist
+    if ruta.lower().endswith(EXTENSION_COMPACTA):
+        guardar_compacto(circuito, ruta, posiciones)
+    else:
+        guardar_netlist(circuito, ruta, posiciones)
+
+
+@medido('carga')
+def cargar_circuito(ruta, compacto=False):
+    # Devuelve (circuito, posiciones); el formato se reconoce por el contenido.
+    # Con compacto=True el circuito es un CircuitoCompacto
+    with open(ruta, 'rb') as archivo:
+        firma = archivo.read(len(_FIRMA_NPZ))
+    if firma == _FIRMA_NPZ:
+        return cargar_compacto(ruta, compacto)
+    posiciones = {}
+    circuito = cargar_netlist(ruta, posiciones)
+    if not compacto:
+        return circuito, posiciones
+    compacto = CircuitoCompacto.desde_componentes(circuito.componentes)
+    vistas = dict(zip(circuito.componentes, compacto.componentes))
+    return compacto, {vistas[c]: posicion for c, posicion in posiciones.items()}
@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+from core.componentes import Resistencia, FuenteDC
+from core.no_lineal import EXPONENTE_MAXIMO
+from core.instrumentacion import medido, etapa
+
+CAMPOS_FORMAS = ('voltaje', 'corriente', 'potencia')
+CAMPOS_METRICAS = ('potencia_promedio', 'vrms', 'irms', 'potencia_aparente', 'factor_potencia')
+CAMPOS = CAMPOS_FORMAS + ('tiempo',) + CAMPOS_METRICAS
+
+# Componentes cuyas formas de onda se conservan ya calculadas
+FORMAS_EN_CACHE = 32
+
+# Familias sin forma de onda propia: comparten un arreglo de ceros
+_SIN_FORMA = (None, 'tierras', 'transistores')
+
+
+def formas_de_onda(respuesta, componente):
+    sistema = respuesta['sistema']
+    X = respuesta['solucion']
+    cero = np.zeros(len(respuesta['tiempo']))
+
+    familia, k = sistema.compilado.ubicaciones.get(componente, (None, None))
+    if familia in _SIN_FORMA:
+        return cero, cero.copy()
+
+    grupo = getattr(sistema.compilado, familia)
+    voltaje = sistema.voltajes_entre(X, grupo.n1[k], grupo.n2[k])
+    if familia == 'resistencias':
+        corriente = voltaje / grupo.valor[k]
+    elif familia == 'capacitores':
+        corriente = respuesta['capacitores'][:, k]
+    elif familia == 'diodos':
+        corriente = grupo.Is[k] * np.expm1(np.minimum(voltaje / grupo.nVt[k], EXPONENTE_MAXIMO))
+    elif len(grupo.rama):
+        corriente = X[:, grupo.rama[k]]
+    else:
+        corriente = cero
+    return voltaje, corriente
+
+
+def metricas(componente, potencia_promedio, vrms, irms):
+    resultado = {
+        'potencia_promedio': potencia_promedio,
+        'vrms': vrms,
+        'irms': irms,
+        'potencia_aparente': vrms * irms
+    }
+    if isinstance(componente, (Resistencia, FuenteDC)):
+        resultado['factor_potencia'] = 1.0
+    else:
+        resultado['factor_potencia'] = potencia_promedio / resultado['potencia_aparente'] if resultado['potencia_aparente'] > 0 else 0
+    return resultado
+
+
+class DatosComponente(Mapping):
+    # Vista tipo diccionario de los resultados de un componente: cada campo
+    # se calcula al pedirlo
+    def __init__(self, resultados, componente):
+        self._resultados = resultados
+        self._componente = componente
+        self._metricas = None
+
+    def __getitem__(self, clave):
+        if clave == 'tiempo':
+            return self._resultados.tiempo
+        if clave in CAMPOS_FORMAS:
+            return self._resultados.formas(self._componente)[clave]
+        if clave in CAMPOS_METRICAS:
+            if self._metricas is None:
+                self._metricas = self._calcular_metricas()
+            return self._metricas[clave]
+        raise KeyError(clave)
+
+    def __contains__(self, clave):
+        return clave in CAMPOS
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    @medido('metricas')
+    def _calcular_metricas(self):
+        formas = self._resultados.formas(self._componente)
+        return metricas(self._componente, np.mean(formas['potencia']),
+                        np.sqrt(np.mean(formas['voltaje']**2)), np.sqrt(np.mean(formas['corriente']**2)))
+
+
+class Resultados(Mapping):
+    # Guarda sólo la solución del transitorio (voltajes de nodo y corrientes
+    # de rama); V, I y P por componente se derivan al consultarlas y se
+    # conservan las de los últimos FORMAS_EN_CACHE componentes
+    def __init__(self, componentes, tiempo, respuesta=None):
+        self.tiempo = tiempo
+        self.respuesta = respuesta
+        self._datos = {c: DatosComponente(self, c) for c in componentes}
+        self._formas = OrderedDict()
+        self._cero = np.zeros(len(tiempo))
+        self._cero.flags.writeable = False
+
+    def __getitem__(self, componente):
+        return self._datos[componente]
+
+    def __iter__(self):
+        return iter(self._datos)
+
+    def __len__(self):
+        return len(self._datos)
+
+    def formas(self, componente):
+        if componente in self._formas:
+            self._formas.move_to_end(componente)
+            return self._formas[componente]
+
+        with etapa('formas_de_onda'):
+            formas = self._calcular_formas(componente)
+        self._formas[componente] = formas
+        if len(self._formas) > FORMAS_EN_CACHE:
+            self._formas.popitem(last=False)
+        return formas
+
+    def _calcular_formas(self, componente):
+        if self.respuesta is None or self._sin_forma(componente):
+            formas = dict.fromkeys(CAMPOS_FORMAS, self._cero)
+        else:
+            voltaje, corriente = formas_de_onda(self.respuesta, componente)
+            formas = {'voltaje': voltaje, 'corriente': corriente, 'potencia': voltaje * corriente}
+        return formas
+
+    def _sin_forma(self, componente):
+        ubicaciones = self.respuesta['sistema'].compilado.ubicaciones
+        return ubicaciones.get(componente, (None, None))[0] in _SIN_FORMA
+
+
+class AcumuladorMetricas:
+    # Sumidero para resultados por bloques: acumula sumas de v², i² y v·i y
+    # entrega las mismas métricas que Resultados sin guardar formas de onda
+    def __init__(self):
+        self.muestras = 0
+        self.sumas = {}
+
+    def escribir(self, bloque):
+        n = 0
+        for componente, datos in bloque.items():
+            v, i = datos['voltaje'], datos['corriente']
+            suma = self.sumas.setdefault(componente, np.zeros(3))
+            suma += (np.dot(v, v), np.dot(i, i), np.dot(v, i))
+            n = len(v)
+        self.muestras += n
+
+    def cerrar(self):
+        pass
+
+    def resumen(self):
+        n = max(self.muestras, 1)
+        return {c: metricas(c, s[2] / n, np.sqrt(s[0] / n), np.sqrt(s[1] / n))
+                for c, s in self.sumas.items()}
@@ -1,69 +1,517 @@
 import numpy as np
-from numpy.linalg import solve
+from core.mna import UMBRAL_DENSO, FACTORIZACIONES_EN_CACHE, OrdenColumnas
+from core.compilado import CircuitoCompilado
+from core import no_lineal, estacionario
+from core.resultados import Resultados
+from core.instrumentacion import medido, etapa, contar
 
-def analizar_circuito(circuito, tiempo_simulacion=1.0, puntos=1000):
-    resultados = {}
-    t = np.linspace(0, tiempo_simulacion, puntos)
+# Memoria máxima (bytes) de cada bloque de matrices densas en el barrido AC
+MEMORIA_BLOQUE = 64 * 2**20
+
+METODOS_INTEGRACION = ('euler', 'trapezoidal')
+
+# Paso adaptativo: h = paso_max / 2**nivel, así cada nivel conserva su factorización
+NIVEL_INICIAL = 10
+NIVEL_MAXIMO = 40
+MAX_FACTORIZACIONES = 32
+
+# Instantes por bloque en transitorio_por_bloques
+MUESTRAS_BLOQUE = 65536
+
+@medido('analizar_circuito')
+def analizar_circuito(circuito, tiempo_simulacion=1.0, puntos=1000, cache=None):
+    if len(circuito.nodos) >= 2:
+        respuesta = transitorio(circuito, tiempo_simulacion, puntos, cache=cache)
+        t = respuesta['tiempo']
+    else:
+        respuesta = None
+        t = np.linspace(0, tiempo_simulacion, puntos)
     
-    # Análisis DC
-    Y_dc, I_dc = circuito.obtener_matrices_nodales(0)
-    if Y_dc and I_dc:
-        try:
-            V_dc = solve(Y_dc, I_dc)
-            # Procesar resultados DC
-        except:
-            pass
+    return Resultados(tuple(circuito.componentes), t, respuesta)
+
+
+def _sistema(circuito, cache=None):
+    # Los análisis aceptan tanto un Circuito como su forma compilada
+    if isinstance(circuito, CircuitoCompilado):
+        sistema = circuito.mna
+    else:
+        errores = circuito.errores_fatales()
+        if errores:
+            raise ValueError("\n".join(errores))
+        sistema = circuito.sistema_mna()
+    if cache is not None:
+        sistema.cache = cache
+    return sistema
+
+
+def _con_cache(cache, sistema, analisis, parametros, calcular, completar=None, derivados=()):
+    # Con una core.cache.CacheAnalisis, reutiliza la respuesta de un análisis
+    # idéntico; los campos derivados se reconstruyen con completar
+    if cache is None:
+        return calcular()
+    respuesta = cache.respuesta(sistema, analisis, parametros)
+    if respuesta is None:
+        respuesta = calcular()
+        cache.guardar_respuesta(sistema, analisis, parametros, respuesta, derivados)
+    elif completar is not None:
+        completar(sistema, respuesta)
+    return respuesta
+
+
+@medido('punto_operacion')
+def punto_operacion(circuito, cache=None, **opciones):
+    sistema = _sistema(circuito, cache)
+    return _con_cache(cache, sistema, 'punto_operacion', tuple(sorted(opciones.items())),
+                      lambda: no_lineal.punto_operacion(sistema, **opciones),
+                      no_lineal.completar_respuesta, ('voltajes', 'corrientes'))
+
+
+def _completar_ac(sistema, respuesta):
+    X = respuesta['solucion']
+    respuesta['voltajes'] = {nodo: sistema.voltaje_nodo(X, nodo) for nodo in sistema.nodo_indices}
+    respuesta['corrientes'] = {c: X[:, i] for c, i in sistema.rama_indices.items()}
+    return respuesta
+
+
+@medido('barrido_ac')
+def barrido_ac(circuito, frecuencias, cache=None):
+    frecuencias = np.atleast_1d(np.asarray(frecuencias, dtype=float))
+    sistema = _sistema(circuito, cache)
+    return _con_cache(cache, sistema, 'barrido_ac', (frecuencias,),
+                      lambda: _barrido_ac(sistema, frecuencias, _estatica_pequena_senal(sistema)),
+                      _completar_ac, ('voltajes', 'corrientes'))
+
+
+def _estatica_pequena_senal(sistema):
+    # Con diodos o transistores el barrido es de pequeña señal: las uniones se
+    # sustituyen por sus conductancias en el punto de operación
+    if not _no_lineales(sistema):
+        return sistema.estatica
+    op = no_lineal.punto_operacion(sistema)
+    if not op['convergio']:
+        raise ValueError("El punto de operación no convergió: no se puede linealizar el circuito")
+    modelos = no_lineal.ModelosNoLineales(sistema)
+    return sistema.estatica + modelos.estampar(modelos.uniones(op['solucion']))[0]
+
+
+def _barrido_ac(sistema, frecuencias, estatica):
+    dim = sistema.dimension
+    b = sistema.excitacion_ac()
+    s = 2j * np.pi * frecuencias
     
-    # Análisis AC
-    has_ac = any(isinstance(c, FuenteAC) for c in circuito.componentes)
-    if has_ac:
-        frecuencias = {c.frecuencia for c in circuito.componentes if isinstance(c, FuenteAC)}
-        for freq in frecuencias:
-            Y_ac, I_ac = circuito.obtener_matrices_nodales(freq)
-            if Y_ac and I_ac:
-                try:
-                    V_ac = solve(Y_ac, I_ac)
-                    # Procesar resultados AC
-                except:
-                    pass
+    X = np.empty((len(frecuencias), dim), dtype=complex)
+    if dim <= UMBRAL_DENSO:
+        # Sistemas pequeños: se apilan las matrices y se resuelven en lote
+        bloque = max(1, MEMORIA_BLOQUE // (16 * dim * dim))
+        for inicio in range(0, len(frecuencias), bloque):
+            sk = s[inicio:inicio + bloque, None]
+            A = sistema.patron.densa(estatica + sk * sistema.dinamica)
+            X[inicio:inicio + bloque] = np.linalg.solve(A, np.broadcast_to(b, (len(sk), dim))[..., None])[..., 0]
+    elif estatica is sistema.estatica and len(frecuencias) <= FACTORIZACIONES_EN_CACHE:
+        # Pocas frecuencias de un circuito lineal: las factorizaciones quedan
+        # en el sistema y el mismo barrido tras un cambio de valor sólo
+        # aplica la corrección de rango bajo
+        for k, sk in enumerate(s):
+            X[k] = sistema.factorizacion(sk).resolver(b)
+    elif len(frecuencias):
+        # Sistemas grandes: el ordenamiento de columnas se calcula una vez
+        orden = OrdenColumnas(sistema.patron, estatica + s[0] * sistema.dinamica)
+        for k, sk in enumerate(s):
+            X[k] = orden.resolver(estatica + sk * sistema.dinamica, b)
+            
+    return _completar_ac(sistema, {
+        'frecuencias': frecuencias,
+        'solucion': X,
+        'sistema': sistema
+    })
+
+
+def _no_lineales(sistema):
+    return len(sistema.compilado.diodos) + len(sistema.compilado.transistores)
+
+
+class _Integrador:
+    # Modelos de compañía sobre A(α) = estatica + α·dinamica, con α = 1/h para
+    # Euler implícito y α = 2/h para trapezoidal. La factorización se conserva
+    # mientras el paso no cambie, así cada paso es sólo una sustitución. Con
+    # diodos o transistores cada paso es un Newton (no_lineal.NewtonTransitorio)
+    # sobre A(α) más los estampados de las uniones.
+    def __init__(self, sistema, metodo):
+        if metodo not in METODOS_INTEGRACION:
+            raise ValueError(f"Método de integración desconocido: {metodo}")
+        self.sistema = sistema
+        self.trapezoidal = metodo == 'trapezoidal'
+        self.factor = 2.0 if self.trapezoidal else 1.0
+        self.orden = 2 if self.trapezoidal else 1
+        self.newton = no_lineal.NewtonTransitorio(sistema) if _no_lineales(sistema) else None
+        self.convergio = True
+        self.fallos = 0
+        self.h = None
+        self.lineales = 0
+        self.cache = {}
+        
+    @property
+    def factorizaciones(self):
+        return self.lineales + (self.newton.factorizaciones if self.newton is not None else 0)
+        
+    def _preparar(self, h):
+        if self.h is not None and abs(h - self.h) <= 1e-9 * self.h:
+            return
+        if h not in self.cache:
+            alfa = self.factor / h
+            M = self.sistema.patron.matriz(alfa * self.sistema.dinamica)
+            if self.newton is None:
+                lu = self.sistema.factorizacion(alfa)
+                self.lineales += 1
+                densa = lu.densa
+            else:
+                # El Newton factoriza base + estampados en cada paso
+                lu = self.sistema.estatica + alfa * self.sistema.dinamica
+                densa = self.sistema.dimension <= UMBRAL_DENSO
+            if densa:
+                M = M.toarray()
+            if len(self.cache) >= MAX_FACTORIZACIONES:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[h] = (lu, M)
+        self.lu, self.M = self.cache[h]
+        self.h = h
+        
+    def paso(self, x, q, b, h):
+        # q = dinamica·dx/dt en el paso anterior (sólo lo usa el trapezoidal).
+        # convergio indica si el Newton del paso convergió
+        self._preparar(h)
+        Mx = self.M @ x
+        rhs = b + Mx
+        if self.trapezoidal:
+            rhs += q
+        if self.newton is None:
+            x_nuevo = self.lu.resolver(rhs)
+        else:
+            x_nuevo, self.convergio = self.newton.resolver(self.lu, rhs, x)
+            if not self.convergio:
+                self.fallos += 1
+                contar('pasos_sin_convergencia')
+        if self.trapezoidal:
+            q = self.M @ x_nuevo - Mx - q
+        return x_nuevo, q
+        
+    def estadisticas(self):
+        # Campos de la respuesta que describen la integración
+        datos = {'factorizaciones': self.factorizaciones}
+        if self.newton is not None:
+            datos.update(iteraciones=self.newton.iteraciones, pasos_sin_convergencia=self.fallos,
+                         convergio=self.fallos == 0)
+        return datos
+
+
+def _punto_inicial(sistema, b0):
+    if _no_lineales(sistema):
+        return no_lineal.punto_operacion(sistema, b=b0)['solucion']
+    try:
+        return sistema.factorizacion(0).resolver(b0)
+    except np.linalg.LinAlgError:
+        return np.zeros(sistema.dimension)
+
+
+def parametros_transitorio(t, metodo='trapezoidal', adaptativo=False, tolerancia_rel=1e-3,
+                           tolerancia_abs=1e-6, paso_max=None):
+    # Clave de caché de transitorio() para los instantes de salida t
+    return 'transitorio', (np.asarray(t, dtype=float), metodo, adaptativo, tolerancia_rel, tolerancia_abs, paso_max)
+
+
+@medido('transitorio')
+def transitorio(circuito, tiempo_simulacion=1.0, puntos=1000, metodo='trapezoidal', tiempos=None,
+                adaptativo=False, tolerancia_rel=1e-3, tolerancia_abs=1e-6, paso_max=None, cache=None):
+    if tiempos is None:
+        t = np.linspace(0, tiempo_simulacion, puntos)
+    else:
+        t = np.asarray(tiempos, dtype=float)
+    sistema = _sistema(circuito, cache)
+    analisis, parametros = parametros_transitorio(t, metodo, adaptativo, tolerancia_rel, tolerancia_abs, paso_max)
+    return _con_cache(cache, sistema, analisis, parametros,
+                      lambda: _transitorio(sistema, t, metodo, adaptativo, tolerancia_rel, tolerancia_abs, paso_max))
+
+
+def _transitorio(sistema, t, metodo, adaptativo, tolerancia_rel, tolerancia_abs, paso_max):
+    if adaptativo:
+        return _transitorio_adaptativo(sistema, t, metodo, tolerancia_rel, tolerancia_abs, paso_max)
+        
+    integrador = _Integrador(sistema, metodo)
+    X = np.empty((0, sistema.dimension))
+    capacitores = np.zeros((0, len(sistema.compilado.capacitores)))
+    if len(t):
+        t, X, capacitores = next(_integrar(sistema, integrador, [t]))
+        
+    return {
+        'tiempo': t,
+        'solucion': X,
+        'capacitores': capacitores,
+        'sistema': sistema,
+        'metodo': metodo,
+        **integrador.estadisticas()
+    }
+
+
+def _integrar(sistema, integrador, bloques):
+    # Integra paso fijo sobre los tiempos de cada bloque, continuando el
+    # estado (x, q y corrientes de capacitores) entre bloques
+    metodo = 'trapezoidal' if integrador.trapezoidal else 'euler'
+    capacitores = sistema.compilado.capacitores
+    b = np.zeros(sistema.dimension)
+    q = np.zeros(sistema.dimension)
+    x = None
+    anterior = None
+    
+    for t in bloques:
+        filas, E = sistema.excitacion_tiempo(t)
+        X = np.empty((len(t), sistema.dimension))
+        if x is None:
+            b[filas] = E[:, 0]
+            x = _punto_inicial(sistema, b)
+            X[0] = x
+            inicio, t_previo = 1, t[0]
+        else:
+            inicio, t_previo = 0, anterior[0]
+            
+        with etapa('integracion'):
+            pasos = np.diff(t, prepend=t_previo)
+            for k in range(inicio, len(t)):
+                b[filas] = E[:, k]
+                x, q = integrador.paso(x, q, b, pasos[k])
+                X[k] = x
+            I = _corrientes_capacitores(sistema, X, t, metodo, anterior)
+        contar('pasos', len(t) - inicio)
+        anterior = (t[-1], sistema.voltajes_entre(X[-1], capacitores.n1, capacitores.n2), I[-1])
+        yield t, X, I
+
+
+def _tiempos_por_bloques(tiempo_simulacion, puntos, muestras_bloque):
+    # Mismos instantes que np.linspace(0, tiempo_simulacion, puntos), sin
+    # crear el vector completo
+    paso = tiempo_simulacion / (puntos - 1) if puntos > 1 else 0.0
+    for inicio in range(0, puntos, muestras_bloque):
+        fin = min(inicio + muestras_bloque, puntos)
+        t = np.arange(inicio, fin) * paso
+        if fin == puntos and puntos > 1:
+            t[-1] = tiempo_simulacion
+        yield t
+
+
+def instantes_por_bloques(tiempo_simulacion, puntos):
+    # Todos los instantes de transitorio_por_bloques (no dependen del tamaño
+    # de bloque), p. ej. para la clave de caché de una simulación por bloques
+    return np.concatenate([np.zeros(0), *_tiempos_por_bloques(tiempo_simulacion, puntos, max(1, puntos))])
+
+
+def transitorio_por_bloques(circuito, tiempo_simulacion=1.0, puntos=1000, metodo='trapezoidal',
+                            muestras_bloque=MUESTRAS_BLOQUE, cache=None):
+    # Igual que transitorio() pero entrega la solución en bloques de
+    # muestras_bloque instantes, cada uno como Resultados de ese tramo: la
+    # memoria no depende de la duración de la simulación. Con cache sólo se
+    # comparten las factorizaciones: los bloques no se guardan
+    sistema = _sistema(circuito, cache)
+    if isinstance(circuito, CircuitoCompilado):
+        componentes = tuple(circuito.ubicaciones)
+    else:
+        componentes = tuple(circuito.componentes)
+    integrador = _Integrador(sistema, metodo)
     
-    # Simulación en el dominio del tiempo
-    for componente in circuito.componentes:
-        comp_data = {
-            "voltaje": np.zeros_like(t),
-            "corriente": np.zeros_like(t),
-            "potencia": np.zeros_like(t),
-            "tiempo": t
+    bloques = _tiempos_por_bloques(tiempo_simulacion, puntos, muestras_bloque)
+    for t, X, capacitores in _integrar(sistema, integrador, bloques):
+        respuesta = {
+            'tiempo': t,
+            'solucion': X,
+            'capacitores': capacitores,
+            'sistema': sistema,
+            'metodo': metodo,
+            **integrador.estadisticas()
         }
+        yield Resultados(componentes, t, respuesta)
+
+
+def procesar_bloques(bloques, *sumideros):
+    # Pasa cada bloque a todos los sumideros (escribir) y los cierra al final
+    for bloque in bloques:
+        for sumidero in sumideros:
+            sumidero.escribir(bloque)
+    for sumidero in sumideros:
+        sumidero.cerrar()
+    return sumideros
+
+
+@medido('estado_estacionario')
+def estado_estacionario(circuito, tiempos=None, puntos=1000, metodo=None, armonicos=32, **opciones):
+    # Régimen permanente sin transitorio de arranque. 'superposicion' suma las
+    # soluciones fasoriales de cada frecuencia (circuitos lineales);
+    # 'balance_armonico' resuelve los circuitos con diodos o transistores.
+    # Por defecto las formas de onda cubren un periodo común de las fuentes.
+    sistema = _sistema(circuito)
+    compilado = sistema.compilado
+    if metodo is None:
+        no_lineales = len(compilado.diodos) + len(compilado.transistores)
+        metodo = 'balance_armonico' if no_lineales else 'superposicion'
         
-        if isinstance(componente, FuenteAC):
-            comp_data["voltaje"] = componente.voltaje_instantaneo(t)
-            if hasattr(componente, 'impedancia_carga'):
-                z = componente.impedancia_carga
-                comp_data["corriente"] = comp_data["voltaje"] / z
-            comp_data["potencia"] = comp_data["voltaje"] * comp_data["corriente"]
-            
-        elif isinstance(componente, Resistencia):
-            comp_data["voltaje"] = np.sin(t * 2 * np.pi * 1)  # Ejemplo simplificado
-            comp_data["corriente"] = comp_data["voltaje"] / componente.resistencia
-            comp_data["potencia"] = comp_data["voltaje"] * comp_data["corriente"]
-            
-        elif isinstance(componente, (Capacitor, Inductor)):
-            comp_data["voltaje"] = np.sin(t * 2 * np.pi * 1)
-            comp_data["corriente"] = np.cos(t * 2 * np.pi * 1)
-            comp_data["potencia"] = comp_data["voltaje"] * comp_data["corriente"]
+    f0 = estacionario.frecuencia_comun(compilado.fuentes_ac.frecuencia)
+    if metodo == 'superposicion':
+        espectro = estacionario.superposicion(sistema)
+    elif metodo == 'balance_armonico':
+        if f0 is None:
+            espectro = {'continua': no_lineal.punto_operacion(sistema, **opciones)['solucion'],
+                        'frecuencias': np.zeros(0), 'fasores': np.zeros((0, sistema.dimension), dtype=complex),
+                        'convergio': True, 'iteraciones': 0}
+        else:
+            espectro = estacionario.balance_armonico(sistema, f0, armonicos, **opciones)
+    else:
+        raise ValueError(f"Método de estado estacionario desconocido: {metodo}")
+        
+    if tiempos is None:
+        periodo = 1 / f0 if f0 else 1.0
+        t = np.linspace(0, periodo, puntos, endpoint=False)
+    else:
+        t = np.asarray(tiempos, dtype=float)
+        
+    respuesta = {
+        'tiempo': t,
+        'solucion': estacionario.sintetizar(espectro['continua'], espectro['frecuencias'], espectro['fasores'], t),
+        'capacitores': estacionario.corrientes_capacitores(sistema, espectro, t),
+        'sistema': sistema,
+        'metodo': metodo
+    }
+    respuesta.update(espectro)
+    return respuesta
+
+
+def _diferencia_dividida(ts, xs):
+    ts = list(ts)
+    dd = list(xs)
+    for k in range(1, len(ts)):
+        dd = [(dd[i + 1] - dd[i]) / (ts[i + k] - ts[i]) for i in range(len(dd) - 1)]
+    return dd[0]
+
+
+def _transitorio_adaptativo(sistema, t_salida, metodo, rtol, atol, paso_max):
+    t0, t_final = float(t_salida[0]), float(t_salida[-1])
+    if paso_max is None:
+        paso_max = (t_final - t0) / 50
+    integrador = _Integrador(sistema, metodo)
+    orden = integrador.orden
+    margen = 1e-12 * (t_final - t0)
+    
+    quiebres = {t_final}
+    compilado = sistema.compilado
+    for componente in compilado.fuentes_dc.componentes + compilado.fuentes_ac.componentes:
+        quiebres.update(tq for tq in componente.puntos_quiebre(t_final) if t0 < tq < t_final)
+    quiebres = sorted(quiebres)
+    # Los instantes de salida también limitan el paso (sin reiniciar la
+    # historia): la solución en ellos es la del integrador, no una
+    # interpolación lineal entre pasos aceptados
+    salidas = np.unique(np.asarray(t_salida, dtype=float))
+    
+    filas, E = sistema.excitacion_tiempo(t0)
+    b = np.zeros(sistema.dimension)
+    b[filas] = E
+    x = _punto_inicial(sistema, b)
+    q = np.zeros(sistema.dimension)
+    
+    ts, xs = [t0], [x]
+    historia = [(t0, x)]
+    nivel = NIVEL_INICIAL
+    rechazos = 0
+    siguiente = 0
+    proxima = int(np.searchsorted(salidas, t0 + margen, side='right'))
+    t = t0
+    
+    while t < t_final:
+        h_nivel = h = paso_max / 2**nivel
+        tq = quiebres[siguiente]
+        objetivo = tq
+        if proxima < len(salidas) and salidas[proxima] < tq - margen:
+            objetivo = salidas[proxima]
+        llega = t + h >= objetivo - margen
+        if llega:
+            h = objetivo - t
+        en_quiebre = llega and objetivo == tq
             
-        # Cálculos adicionales
-        comp_data['potencia_promedio'] = np.mean(comp_data['potencia'])
-        comp_data['vrms'] = np.sqrt(np.mean(comp_data['voltaje']**2))
-        comp_data['irms'] = np.sqrt(np.mean(comp_data['corriente']**2))
-        comp_data['potencia_aparente'] = comp_data['vrms'] * comp_data['irms']
+        filas, E = sistema.excitacion_tiempo(t + h)
+        b[filas] = E
+        x_nuevo, q_nuevo = integrador.paso(x, q, b, h)
+        if not integrador.convergio and nivel < NIVEL_MAXIMO:
+            # Newton sin convergencia: se rechaza el paso y se reduce
+            integrador.fallos -= 1
+            rechazos += 1
+            nivel = min(NIVEL_MAXIMO, nivel + 2)
+            continue
         
-        if isinstance(componente, (Resistencia, FuenteDC)):
-            comp_data['factor_potencia'] = 1.0
-        else:
-            comp_data['factor_potencia'] = comp_data['potencia_promedio'] / comp_data['potencia_aparente'] if comp_data['potencia_aparente'] > 0 else 0
+        error = 0.0
+        if len(historia) > orden:
+            # Error local de truncamiento a partir de la derivada de orden
+            # (orden + 1) estimada con diferencias divididas
+            puntos_ = historia[-(orden + 1):] + [(t + h, x_nuevo)]
+            dd = _diferencia_dividida([p[0] for p in puntos_], [p[1] for p in puntos_])
+            lte = (h**3 / 2 if orden == 2 else h**2) * np.abs(dd)
+            escala = atol + rtol * np.maximum(np.abs(x_nuevo), np.abs(x))
+            error = float(np.max(lte / escala)) if len(lte) else 0.0
+            
+            if error > 1 and nivel < NIVEL_MAXIMO:
+                rechazos += 1
+                nivel = min(NIVEL_MAXIMO, nivel + max(1, int(np.ceil(np.log2(error) / (orden + 1)))))
+                continue
+                
+        t = objetivo if llega else t + h
+        x, q = x_nuevo, q_nuevo
+        ts.append(t)
+        xs.append(x)
+        historia = (historia + [(t, x)])[-(orden + 2):]
+        while proxima < len(salidas) and salidas[proxima] <= t + margen:
+            proxima += 1
         
-        resultados[componente] = comp_data
+        if en_quiebre:
+            siguiente = min(siguiente + 1, len(quiebres) - 1)
+            historia = [(t, x)]
+            nivel = max(nivel, NIVEL_INICIAL)
+        elif error * (2 * h_nivel / h)**(orden + 1) < 0.5 and nivel > 0:
+            # El error se escala al paso del nivel anterior (el recortado
+            # para llegar a una salida es más corto)
+            nivel -= 1
+            
+    t_int = np.array(ts)
+    X_int = np.array(xs)
+    capacitores = _corrientes_capacitores(sistema, X_int, t_int, metodo)
+    # Cada salida coincide con un paso (las que quedan a menos de margen de
+    # un quiebre, con el del quiebre)
+    indices = np.clip(np.searchsorted(t_int, np.asarray(t_salida, dtype=float) - margen), 0, len(t_int) - 1)
     
-    return resultados
\ No newline at end of file
+    return {
+        'tiempo': t_salida,
+        'solucion': X_int[indices],
+        'capacitores': capacitores[indices],
+        'sistema': sistema,
+        'metodo': metodo,
+        **integrador.estadisticas(),
+        'pasos': len(t_int) - 1,
+        'rechazos': rechazos
+    }
+
+
+def _corrientes_capacitores(sistema, X, t, metodo, anterior=None):
+    # anterior: (t, voltajes, corrientes) del último instante del bloque previo
+    capacitores = sistema.compilado.capacitores
+    I = np.zeros((len(t), len(capacitores)))
+    if not len(capacitores):
+        return I
+    
+    V = sistema.voltajes_entre(X, capacitores.n1, capacitores.n2)
+    if anterior is not None:
+        t_previo, V_previo, I_previo = anterior
+        t = np.concatenate([[t_previo], t])
+        V = np.vstack([V_previo, V])
+        I = np.vstack([I_previo, I])
+    if len(t) >= 2:
+        a = capacitores.valor * np.diff(V, axis=0) / np.diff(t)[:, None]
+        if metodo == 'euler':
+            I[1:] = a
+        else:
+            # i_n + i_{n-1} = (2C/h)·Δv_n, resuelto sin bucle con sumas alternadas
+            signo = ((-1.0) ** np.arange(1, len(t)))[:, None]
+            I[1:] = signo * (np.cumsum(signo * 2 * a, axis=0) + I[0])
+    return I if anterior is None else I[1:]
\ No newline at end of file
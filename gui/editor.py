@@ -1,16 +1,19 @@
 from PyQt5.QtGui import QPainter
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QToolBar, 
                            QAction, QGraphicsView, QGraphicsScene, QLabel, QStatusBar,
-                           QFileDialog, QMessageBox)
+                           QFileDialog, QMessageBox, QInputDialog)
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QIcon
 from core.componentes import (Resistencia, FuenteDC, FuenteAC, Capacitor, Inductor, 
                            Tierra, Cable, Diodo, TransistorBJT)
-from core.circuito import Circuito
-from gui.simulador import SimuladorDialog
-import json
+from core.circuito import Circuito, ATRIBUTOS_VALOR, ATRIBUTOS_POSITIVOS
+from core.persistencia import cargar_circuito, guardar_circuito, EXTENSION_COMPACTA
+from core.cache import CacheAnalisis
 import os
 
+# Netlist de texto (.cir) o formato compacto de arreglos (.cirz)
+ARCHIVOS_CIRCUITO = f"Circuit Files (*.cir);;Circuito compacto (*{EXTENSION_COMPACTA});;All Files (*)"
+
 class EditorCircuito(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -18,6 +21,11 @@ class EditorCircuito(QMainWindow):
         self.setGeometry(100, 100, 1000, 800)
         
         self.circuito = Circuito()
+        # Posición (x, y) en la escena de cada componente colocado
+        self.posiciones = {}
+        # Resultados de simulaciones anteriores: repetir una simulación o
+        # deshacer un cambio no vuelve a calcular
+        self.cache = CacheAnalisis()
         self.current_file = None
         self.initUI()
         
@@ -93,6 +101,7 @@ class EditorCircuito(QMainWindow):
         edit_menu.addAction("Rehacer", self.rehacer_accion, "Ctrl+Y")
         edit_menu.addSeparator()
         edit_menu.addAction("Eliminar", self.eliminar_seleccionado, "Del")
+        edit_menu.addAction("Cambiar valor...", self.cambiar_valor_componente, "F2")
         
         # Menú Simulación
         sim_menu = menubar.addMenu("Simulación")
@@ -110,6 +119,7 @@ class EditorCircuito(QMainWindow):
         self.status_bar.showMessage(f"Componente seleccionado: {componente.__name__} - Haz clic en el área de dibujo para colocarlo")
         
     def nuevo_circuito(self):
+        # Devuelve False si el usuario cancela
         if self.circuito.componentes:
             reply = QMessageBox.question(self, 'Nuevo circuito', 
                                        '¿Desea guardar el circuito actual antes de crear uno nuevo?',
@@ -118,26 +128,29 @@ class EditorCircuito(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.guardar_circuito()
             elif reply == QMessageBox.Cancel:
-                return
+                return False
                 
         self.scene.clear()
         self.circuito = Circuito()
+        self.posiciones = {}
         self.current_file = None
         self.status_bar.showMessage("Nuevo circuito creado")
+        return True
         
     def abrir_circuito(self):
         options = QFileDialog.Options()
         filename, _ = QFileDialog.getOpenFileName(self, "Abrir Circuito", "", 
-                                               "Circuit Files (*.cir);;All Files (*)", 
+                                               ARCHIVOS_CIRCUITO, 
                                                options=options)
         if filename:
             try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
-                    
-                self.nuevo_circuito()
+                circuito, posiciones = cargar_circuito(filename)
+                if not self.nuevo_circuito():
+                    return
+                self.circuito = circuito
+                self.posiciones = posiciones
                 self.current_file = filename
-                self.status_bar.showMessage(f"Circuito cargado desde {filename}")
+                self.status_bar.showMessage(f"Circuito cargado desde {filename}: {len(circuito.componentes)} componentes")
                 
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"No se pudo cargar el archivo:\n{str(e)}")
@@ -150,25 +163,19 @@ class EditorCircuito(QMainWindow):
             
     def guardar_como_circuito(self):
         options = QFileDialog.Options()
-        filename, _ = QFileDialog.getSaveFileName(self, "Guardar Circuito", "", 
-                                                "Circuit Files (*.cir);;All Files (*)", 
+        filename, filtro = QFileDialog.getSaveFileName(self, "Guardar Circuito", "", 
+                                                ARCHIVOS_CIRCUITO, 
                                                 options=options)
         if filename:
-            if not filename.endswith('.cir'):
-                filename += '.cir'
+            extension = EXTENSION_COMPACTA if EXTENSION_COMPACTA in filtro else '.cir'
+            if not filename.lower().endswith(('.cir', EXTENSION_COMPACTA)):
+                filename += extension
             self._guardar_a_archivo(filename)
             self.current_file = filename
             
     def _guardar_a_archivo(self, filename):
         try:
-            save_data = {
-                'componentes': [],
-                'conexiones': {}
-            }
-            
-            with open(filename, 'w') as f:
-                json.dump(save_data, f, indent=4)
-                
+            guardar_circuito(self.circuito, filename, self.posiciones)
             self.status_bar.showMessage(f"Circuito guardado en {filename}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"No se pudo guardar el archivo:\n{str(e)}")
@@ -179,6 +186,12 @@ class EditorCircuito(QMainWindow):
             QMessageBox.warning(self, "Error", "El circuito no contiene componentes para simular")
             return
             
+        errores = self.circuito.errores_fatales()
+        if errores:
+            self.status_bar.showMessage("Error: El circuito no se puede simular")
+            QMessageBox.critical(self, "Error", "\n".join(errores))
+            return
+            
         problemas = self.circuito.verificar_conexiones()
         if problemas:
             msg = "\n".join(problemas)
@@ -188,7 +201,9 @@ class EditorCircuito(QMainWindow):
             if reply == QMessageBox.No:
                 return
                 
-        simulador = SimuladorDialog(self.circuito, self)
+        # matplotlib y el diálogo se cargan sólo al simular por primera vez
+        from gui.simulador import SimuladorDialog
+        simulador = SimuladorDialog(self.circuito, self, self.cache)
         simulador.exec_()
         
     def verificar_conexiones(self):
@@ -211,6 +226,34 @@ class EditorCircuito(QMainWindow):
         # Implementar lógica para eliminar componente seleccionado
         pass
         
+    def cambiar_valor_componente(self):
+        # El circuito corrige sólo las entradas afectadas de la matriz, así la
+        # siguiente simulación reutiliza las factorizaciones anteriores
+        editables = [c for c in self.circuito.componentes if getattr(c, 'tipo', type(c)) in ATRIBUTOS_VALOR]
+        if not editables:
+            self.status_bar.showMessage("No hay componentes con valor editable")
+            return
+            
+        nombres = [str(c) for c in editables]
+        nombre, ok = QInputDialog.getItem(self, "Cambiar valor", "Componente:", nombres, 0, False)
+        if not ok:
+            return
+            
+        componente = editables[nombres.index(nombre)]
+        atributo = ATRIBUTOS_VALOR[getattr(componente, 'tipo', type(componente))]
+        # Con 9 decimales, 1e-9 es el menor valor positivo que admite el diálogo
+        minimo = 1e-9 if atributo in ATRIBUTOS_POSITIVOS else -1e12
+        valor, ok = QInputDialog.getDouble(self, "Cambiar valor", f"Nuevo valor ({atributo}):",
+                                           max(getattr(componente, atributo), minimo), minimo, 1e12, 9)
+        if not ok:
+            return
+        try:
+            self.circuito.cambiar_valor(componente, valor)
+        except ValueError as e:
+            QMessageBox.warning(self, "Cambiar valor", str(e))
+            return
+        self.status_bar.showMessage(f"Valor actualizado: {componente}")
+        
     def mostrar_acerca_de(self):
         about_text = """
         <h2>VoltImper - Simulador de Circuitos</h2>
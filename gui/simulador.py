@@ -1,24 +1,32 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTabWidget, QWidget, 
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QWidget, 
                            QTableWidget, QTableWidgetItem, QPushButton, 
-                           QFileDialog, QLabel)
+                           QFileDialog, QLabel, QMessageBox, QProgressBar)
+from PyQt5.QtCore import QThread
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
-from utils.graficas import generar_graficas
-from utils.fourier import analizar_fourier
-from utils.exportar import exportar_csv, exportar_json, exportar_graficas
-from core.simulacion import analizar_circuito
+from utils.graficas import GraficasTiempo
+from utils.exportar import exportar_csv, exportar_json, exportar_binario, exportar_graficas
+from core.componentes import FuenteAC, FuenteDC
+from core import instrumentacion
+from gui.trabajador import TrabajadorSimulacion
 import numpy as np
 
 class SimuladorDialog(QDialog):
-    def __init__(self, circuito, parent=None):
+    def __init__(self, circuito, parent=None, cache=None):
         super().__init__(parent)
         self.circuito = circuito
+        self.cache = cache
         self.parent_window = parent
         self.setWindowTitle("Resultados de Simulación")
         self.setGeometry(200, 200, 1000, 800)
         
         self.resultados = None
+        self.hilo = None
+        self.trabajador = None
+        # Tiempos por etapa de la simulación y de las gráficas
+        self.registro = None
+        self._registro_anterior = None
         self.initUI()
         self.simular()
         
@@ -29,6 +37,10 @@ class SimuladorDialog(QDialog):
         self.info_label = QLabel()
         layout.addWidget(self.info_label)
         
+        self.barra_progreso = QProgressBar()
+        self.barra_progreso.setRange(0, 100)
+        layout.addWidget(self.barra_progreso)
+        
         # Pestañas
         self.tabs = QTabWidget()
         
@@ -39,6 +51,7 @@ class SimuladorDialog(QDialog):
         self.figura = Figure(figsize=(10, 8), dpi=100)
         self.canvas = FigureCanvas(self.figura)
         self.toolbar = NavigationToolbar(self.canvas, self)
+        self.graficas = GraficasTiempo(self.figura)
         
         self.layout_graficos.addWidget(self.toolbar)
         self.layout_graficos.addWidget(self.canvas)
@@ -70,11 +83,25 @@ class SimuladorDialog(QDialog):
         self.tab_fourier.setLayout(self.layout_fourier)
         self.tabs.addTab(self.tab_fourier, "Análisis Fourier")
         
+        # Pestaña de rendimiento
+        self.tab_rendimiento = QWidget()
+        self.layout_rendimiento = QVBoxLayout()
+        
+        self.tabla_rendimiento = QTableWidget()
+        self.layout_rendimiento.addWidget(self.tabla_rendimiento)
+        
+        self.tab_rendimiento.setLayout(self.layout_rendimiento)
+        self.tabs.addTab(self.tab_rendimiento, "Rendimiento")
+        
         layout.addWidget(self.tabs)
         
         # Botones
         btn_layout = QHBoxLayout()
         
+        self.btn_cancelar = QPushButton("Cancelar")
+        self.btn_cancelar.clicked.connect(self.cancelar_simulacion)
+        btn_layout.addWidget(self.btn_cancelar)
+        
         self.btn_exportar = QPushButton("Exportar Resultados")
         self.btn_exportar.clicked.connect(self.exportar_resultados)
         btn_layout.addWidget(self.btn_exportar)
@@ -87,7 +114,40 @@ class SimuladorDialog(QDialog):
         self.setLayout(layout)
         
     def simular(self):
-        self.resultados = analizar_circuito(self.circuito)
+        # La simulación corre en otro hilo; la tabla y las gráficas se
+        # actualizan con cada bloque que llega
+        self.info_label.setText("Simulando...")
+        self.btn_exportar.setEnabled(False)
+        self.btn_cancelar.setEnabled(True)
+        
+        self.registro = instrumentacion.Registro()
+        self._registro_anterior = instrumentacion.activar(self.registro)
+        
+        self.hilo = QThread(self)
+        self.trabajador = TrabajadorSimulacion(self.circuito, cache=self.cache)
+        self.trabajador.moveToThread(self.hilo)
+        self.hilo.started.connect(self.trabajador.ejecutar)
+        self.trabajador.progreso.connect(self.barra_progreso.setValue)
+        self.trabajador.parcial.connect(self.mostrar_parcial)
+        self.trabajador.terminado.connect(self.simulacion_terminada)
+        self.trabajador.error.connect(self.simulacion_fallida)
+        self.trabajador.terminado.connect(self.hilo.quit)
+        self.trabajador.error.connect(self.hilo.quit)
+        self.hilo.start()
+        
+    def cancelar_simulacion(self):
+        if self.trabajador is not None:
+            self.trabajador.cancelar()
+            self.btn_cancelar.setEnabled(False)
+            
+    def mostrar_parcial(self, metricas, graficas):
+        self.mostrar_resultados(metricas)
+        self.mostrar_graficas(graficas)
+        
+    def simulacion_terminada(self, resultados, fourier, cancelado):
+        self.resultados = resultados
+        self.btn_exportar.setEnabled(True)
+        self.btn_cancelar.setEnabled(False)
         
         num_comp = len(self.resultados)
         has_ac = any(isinstance(c, FuenteAC) for c in self.resultados.keys())
@@ -97,10 +157,51 @@ class SimuladorDialog(QDialog):
         info_text += "AC" if has_ac else ""
         info_text += " y " if has_ac and has_dc else ""
         info_text += "DC" if has_dc else ""
+        info_text += " | Simulación cancelada (resultados parciales)" if cancelado else ""
         self.info_label.setText(info_text)
         
         self.mostrar_resultados(self.resultados)
         self.mostrar_graficas(self.resultados)
+        if fourier is not None:
+            self.mostrar_fourier(fourier[1], fourier[0])
+        self.terminar_registro()
+            
+    def simulacion_fallida(self, mensaje):
+        self.terminar_registro()
+        self.btn_cancelar.setEnabled(False)
+        self.info_label.setText("Error en la simulación")
+        QMessageBox.critical(self, "Error", f"No se pudo simular el circuito:\n{mensaje}")
+        
+    def closeEvent(self, event):
+        if self.hilo is not None and self.hilo.isRunning():
+            self.trabajador.cancelar()
+            self.hilo.wait()
+        self.terminar_registro()
+        super().closeEvent(event)
+        
+    def terminar_registro(self):
+        if self.registro is None:
+            return
+        instrumentacion.desactivar(self._registro_anterior)
+        self.mostrar_rendimiento(self.registro.informe())
+        self.registro = None
+        
+    def mostrar_rendimiento(self, informe):
+        filas = list(informe['etapas'].items())
+        extras = list({**informe['contadores'], **informe['valores']}.items())
+        self.tabla_rendimiento.setRowCount(len(filas) + len(extras))
+        self.tabla_rendimiento.setColumnCount(3)
+        self.tabla_rendimiento.setHorizontalHeaderLabels(["Etapa", "Llamadas", "Tiempo"])
+        
+        for i, (nombre, datos) in enumerate(filas):
+            self.tabla_rendimiento.setItem(i, 0, QTableWidgetItem(nombre))
+            self.tabla_rendimiento.setItem(i, 1, QTableWidgetItem(str(datos['llamadas'])))
+            self.tabla_rendimiento.setItem(i, 2, QTableWidgetItem(f"{datos['segundos'] * 1e3:.2f} ms"))
+        for i, (nombre, valor) in enumerate(extras, len(filas)):
+            self.tabla_rendimiento.setItem(i, 0, QTableWidgetItem(nombre))
+            self.tabla_rendimiento.setItem(i, 1, QTableWidgetItem(str(valor)))
+            
+        self.tabla_rendimiento.resizeColumnsToContents()
         
     def mostrar_resultados(self, resultados):
         self.tabla_resultados.setRowCount(len(resultados))
@@ -119,41 +220,40 @@ class SimuladorDialog(QDialog):
         self.tabla_resultados.resizeColumnsToContents()
         
     def mostrar_graficas(self, resultados):
-        self.figura.clear()
-        generar_graficas(self.figura, resultados)
-        self.canvas.draw()
-        
-        for componente, datos in resultados.items():
-            if isinstance(componente, FuenteAC):
-                analisis_fourier = analizar_fourier(datos["voltaje"], datos["tiempo"], componente.frecuencia)
-                self.mostrar_fourier(analisis_fourier)
-                break
-                
-    def mostrar_fourier(self, analisis):
+        self.graficas.actualizar(resultados)
+        self.canvas.draw_idle()
+        
+    def mostrar_fourier(self, analisis, fuentes):
         self.figura_fourier.clear()
         
         ax1 = self.figura_fourier.add_subplot(2, 1, 1)
         ax1.set_title("Espectro de Frecuencia")
         ax1.set_xlabel("Frecuencia (Hz)")
         ax1.set_ylabel("Amplitud (V)")
-        ax1.stem(analisis['frecuencias'], analisis['amplitudes'], basefmt=" ")
-        ax1.set_xlim(0, min(10*analisis['frecuencia_fundamental'], analisis['frecuencias'][-1]))
+        for fuente, amplitudes in zip(fuentes, analisis['amplitudes']):
+            ax1.plot(analisis['frecuencias'], amplitudes, label=str(fuente))
+        ax1.set_xlim(0, min(10*max(analisis['frecuencia_fundamental']), analisis['frecuencias'][-1]))
+        ax1.legend()
         ax1.grid(True)
         
         ax2 = self.figura_fourier.add_subplot(2, 1, 2)
         ax2.axis('off')
         
-        info_text = f"Frecuencia Fundamental: {analisis['frecuencia_fundamental']:.2f} Hz\n"
-        info_text += f"THD: {analisis['thd']*100:.2f}%\n\n"
-        info_text += "Armónicos significativos (>1%):\n"
-        
-        if analisis['armonicos']:
-            for freq, amp in analisis['armonicos']:
-                rel_amp = (amp / analisis['amplitudes'][0]) * 100
-                if rel_amp > 1:
-                    info_text += f"• {freq:.2f} Hz: {amp:.4f} V ({rel_amp:.1f}%)\n"
-        else:
-            info_text += "No se detectaron armónicos significativos"
+        info_text = ""
+        for k, fuente in enumerate(fuentes):
+            amplitudes = analisis['amplitudes'][k]
+            fundamental = amplitudes[analisis['indice_fundamental'][k]]
+            info_text += f"{fuente}: {analisis['frecuencia_fundamental'][k]:.2f} Hz, THD: {analisis['thd'][k]*100:.2f}%\n"
+            
+            armonicos = analisis['armonicos'][k]
+            if len(armonicos) and fundamental > 0:
+                # Los cinco mayores por encima del 1% de la fundamental
+                relativos = armonicos[:, 1] / fundamental * 100
+                for i in np.argsort(relativos)[::-1][:5]:
+                    if relativos[i] > 1:
+                        info_text += f"    • {armonicos[i, 0]:.2f} Hz: {armonicos[i, 1]:.4f} V ({relativos[i]:.1f}%)\n"
+            else:
+                info_text += "    No se detectaron armónicos significativos\n"
             
         ax2.text(0.05, 0.05, info_text, fontsize=10, va='bottom')
         
@@ -168,7 +268,7 @@ class SimuladorDialog(QDialog):
         options = QFileDialog.Options()
         filename, _ = QFileDialog.getSaveFileName(
             self, "Exportar Resultados", "", 
-            "CSV (*.csv);;JSON (*.json);;PNG (*.png);;Todos los archivos (*)", 
+            "CSV (*.csv);;JSON (*.json);;Binario (*.vres);;PNG (*.png);;Todos los archivos (*)", 
             options=options)
             
         if not filename:
@@ -183,6 +283,10 @@ class SimuladorDialog(QDialog):
                 if not filename.endswith('.json'):
                     filename += '.json'
                 exportar_json(self.resultados, filename)
+            elif filename.endswith('.vres') or '.vres' in filename:
+                if not filename.endswith('.vres'):
+                    filename += '.vres'
+                exportar_binario(self.resultados, filename)
             elif filename.endswith('.png') or '.png' in filename:
                 if not filename.endswith('.png'):
                     filename += '.png'
@@ -0,0 +1,86 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+from core.simulacion import (analizar_circuito, transitorio_por_bloques, parametros_transitorio,
+                             instantes_por_bloques)
+from core.resultados import Resultados, AcumuladorMetricas
+from core.componentes import FuenteAC
+from utils.fourier import analizar_fourier_multicanal
+from utils.graficas import BufferDecimado
+import numpy as np
+
+# Bloques en que se divide el transitorio para informar del progreso
+BLOQUES_PROGRESO = 20
+
+class TrabajadorSimulacion(QObject):
+    # Se mueve a un QThread: simula por bloques y entrega métricas y gráficas
+    # parciales después de cada uno; cancelar() detiene al terminar el bloque
+    progreso = pyqtSignal(int)
+    parcial = pyqtSignal(object, object)
+    terminado = pyqtSignal(object, object, bool)
+    error = pyqtSignal(str)
+
+    def __init__(self, circuito, tiempo_simulacion=1.0, puntos=1000, cache=None):
+        super().__init__()
+        self.circuito = circuito
+        self.tiempo_simulacion = tiempo_simulacion
+        self.puntos = puntos
+        self.cache = cache
+        self._cancelado = False
+
+    def cancelar(self):
+        self._cancelado = True
+
+    def ejecutar(self):
+        try:
+            resultados = self._simular()
+            fourier = self._fourier(resultados)
+        except Exception as e:
+            self.error.emit(str(e))
+            return
+        self.terminado.emit(resultados, fourier, self._cancelado)
+
+    def _simular(self):
+        if len(self.circuito.nodos) < 2:
+            self.progreso.emit(100)
+            return analizar_circuito(self.circuito, self.tiempo_simulacion, self.puntos, self.cache)
+
+        # Una simulación idéntica ya hecha se entrega sin pasar por los bloques.
+        # La clave usa los mismos instantes que producen los bloques
+        tiempos = instantes_por_bloques(self.tiempo_simulacion, self.puntos)
+        analisis = parametros_transitorio(tiempos)
+        if self.cache is not None and not self.circuito.errores_fatales():
+            respuesta = self.cache.respuesta(self.circuito.sistema_mna(), *analisis)
+            if respuesta is not None:
+                self.progreso.emit(100)
+                return Resultados(tuple(self.circuito.componentes), respuesta['tiempo'], respuesta)
+
+        acumulador = AcumuladorMetricas()
+        buffer = BufferDecimado()
+        respuestas = []
+        muestras = 0
+        bloques = transitorio_por_bloques(self.circuito, self.tiempo_simulacion, self.puntos,
+                                          muestras_bloque=max(1, -(-self.puntos // BLOQUES_PROGRESO)),
+                                          cache=self.cache)
+        for bloque in bloques:
+            acumulador.escribir(bloque)
+            buffer.escribir(bloque)
+            respuestas.append(bloque.respuesta)
+            muestras += len(bloque.tiempo)
+            self.progreso.emit(int(100 * muestras / self.puntos))
+            self.parcial.emit(acumulador.resumen(), buffer.resultados())
+            if self._cancelado:
+                break
+
+        respuesta = dict(respuestas[-1])
+        for clave in ('tiempo', 'solucion', 'capacitores'):
+            respuesta[clave] = np.concatenate([r[clave] for r in respuestas])
+        if self.cache is not None and not self._cancelado:
+            respuesta['tiempo'] = tiempos
+            self.cache.guardar_respuesta(respuesta['sistema'], *analisis, respuesta)
+        return Resultados(tuple(self.circuito.componentes), respuesta['tiempo'], respuesta)
+
+    def _fourier(self, resultados):
+        fuentes = [c for c in resultados.keys() if isinstance(c, FuenteAC)]
+        if not fuentes or len(resultados.tiempo) < 4:
+            return None
+        senales = np.stack([resultados[c]["voltaje"] for c in fuentes])
+        return fuentes, analizar_fourier_multicanal(senales, resultados.tiempo, [c.frecuencia for c in fuentes])
\ No newline at end of file
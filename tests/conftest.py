@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+# core/ y utils/ se importan desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.circuito import Circuito
+from core.componentes import FuenteAC, FuenteDC, Resistencia, Capacitor, Diodo, Tierra
+
+
+def construir(*componentes):
+    circuito = Circuito()
+    for componente in componentes:
+        circuito.agregar_componente(componente)
+    return circuito
+
+
+@pytest.fixture
+def rc_senoidal():
+    # Paso bajo R-C excitado por un seno que arranca en cero
+    return construir(FuenteAC('v', 'in', '0', 1.0, 1e3), Resistencia('r', 'in', 'out', 1e3),
+                     Capacitor('c', 'out', '0', 1e-7), Tierra('g', '0'))
+
+
+@pytest.fixture
+def rectificador():
+    # Media onda: 5 V a 50 Hz, diodo y carga de 1 kΩ
+    return construir(FuenteAC('v', 'in', '0', 5.0, 50.0), Diodo('d', 'in', 'out'),
+                     Resistencia('r', 'out', '0', 1e3), Tierra('g', '0'))
+
+
+@pytest.fixture
+def diodo_dc():
+    return construir(FuenteDC('v', 'in', '0', 5.0), Resistencia('r', 'in', 'a', 1e3),
+                     Diodo('d', 'a', '0'), Tierra('g', '0'))
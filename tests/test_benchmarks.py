@@ -0,0 +1,50 @@
+import json
+
+from benchmarks.circuitos import GENERADORES
+from benchmarks.ejecutar import (BASE, ETAPAS, ejecutar, aceleraciones_insuficientes, regresiones, crear_parser,
+                                main)
+
+
+def test_cambio_de_valor_mas_rapido_que_recompilar():
+    medidas = ejecutar(['escalera_rc', 'malla_resistencias'], [5000], ['cambio_valor', 'recompilacion'],
+                       informar=lambda linea: None)
+    assert aceleraciones_insuficientes(medidas) == []
+
+
+def test_base_guardada_cubre_todas_las_familias_y_etapas():
+    with open(BASE) as f:
+        base = json.load(f)
+    assert set(base['entorno']) >= {'fecha', 'python', 'numpy', 'plataforma'}
+    claves = {(m['familia'], m['tamano'], m['etapa']) for m in base['medidas']}
+    for familia in GENERADORES:
+        for tamano in (10, 100, 1000, 10000):
+            for etapa, (_, maximo) in ETAPAS.items():
+                assert (familia, tamano, etapa) in claves or (maximo is not None and tamano > maximo)
+    assert all(m['segundos'] > 0 and m['pico_bytes'] >= 0 for m in base['medidas'])
+
+
+def test_regresiones_por_encima_de_la_tolerancia_y_el_ruido():
+    base = {'medidas': [
+        {'familia': 'f', 'tamano': 10, 'etapa': 'lenta', 'segundos': 0.1, 'pico_bytes': 2**20},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'ruido', 'segundos': 1e-4, 'pico_bytes': 1000},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'memoria', 'segundos': 0.1, 'pico_bytes': 2**20},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'igual', 'segundos': 0.1, 'pico_bytes': 2**20},
+    ]}
+    medidas = [
+        {'familia': 'f', 'tamano': 10, 'etapa': 'lenta', 'segundos': 0.2, 'pico_bytes': 2**20},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'ruido', 'segundos': 1e-3, 'pico_bytes': 10000},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'memoria', 'segundos': 0.1, 'pico_bytes': 2**22},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'igual', 'segundos': 0.11, 'pico_bytes': 2**20},
+        {'familia': 'f', 'tamano': 10, 'etapa': 'nueva', 'segundos': 9.0, 'pico_bytes': 2**30},
+    ]
+    encontradas = [(m['etapa'], campo) for m, campo, _, _ in regresiones(medidas, base)]
+    assert encontradas == [('lenta', 'segundos'), ('memoria', 'pico_bytes')]
+    assert regresiones(medidas, base, tolerancia=10.0) == []
+
+
+def test_main_compara_con_la_base_guardada(capsys):
+    argumentos = ['--familias', 'escalera_rc', '--tamanos', '10', '--etapas', 'construccion', 'solucion',
+                  '--repeticiones', '1']
+    assert crear_parser().parse_args(argumentos + ['--base']).base == BASE
+    assert main(argumentos + ['--base']) == 0
+    assert 'Regresión' not in capsys.readouterr().err
@@ -0,0 +1,49 @@
+import numpy as np
+
+from conftest import construir
+from core.cache import CacheAnalisis
+from core.componentes import FuenteDC, Resistencia, Diodo, Tierra
+from core.simulacion import punto_operacion, transitorio, transitorio_por_bloques, instantes_por_bloques
+
+
+def test_acierto_en_memoria(rc_senoidal):
+    cache = CacheAnalisis()
+    primera = transitorio(rc_senoidal, 1e-3, 100, cache=cache)
+    segunda = transitorio(rc_senoidal, 1e-3, 100, cache=cache)
+    assert cache.estadisticas()['resultados']['aciertos'] == 1
+    assert np.array_equal(primera['solucion'], segunda['solucion'])
+
+
+def test_otro_circuito_con_el_mismo_contenido(tmp_path, diodo_dc):
+    # Otro proceso (otra caché) con otros nombres lee el resultado del disco;
+    # los nodos renombrados conservan su orden y por tanto su numeración
+    punto_operacion(diodo_dc, cache=CacheAnalisis(directorio=str(tmp_path)))
+    renombrado = construir(FuenteDC('x', 'j', '0', 5.0), Resistencia('y', 'j', 'b', 1e3),
+                           Diodo('z', 'b', '0'), Tierra('t', '0'))
+    cache = CacheAnalisis(directorio=str(tmp_path))
+    op = punto_operacion(renombrado, cache=cache)
+    assert cache.estadisticas()['resultados']['aciertos_disco'] == 1
+    assert np.isclose(op['voltajes']['b'], punto_operacion(diodo_dc)['voltajes']['a'])
+
+
+def test_cambio_de_valor_no_acierta(rc_senoidal):
+    cache = CacheAnalisis()
+    antes = transitorio(rc_senoidal, 1e-3, 100, cache=cache)
+    rc_senoidal.cambiar_valor(rc_senoidal.componentes[1], 2e3)
+    despues = transitorio(rc_senoidal, 1e-3, 100, cache=cache)
+    assert cache.estadisticas()['resultados']['fallos'] == 2
+    assert not np.allclose(antes['solucion'], despues['solucion'])
+
+
+def test_la_respuesta_calculada_sigue_siendo_editable(rc_senoidal):
+    cache = CacheAnalisis()
+    respuesta = transitorio(rc_senoidal, 1e-3, 100, cache=cache)
+    respuesta['solucion'][0] = 0.0
+    acierto = transitorio(rc_senoidal, 1e-3, 100, cache=cache)
+    assert not acierto['solucion'].flags.writeable
+
+
+def test_instantes_por_bloques(rc_senoidal):
+    bloques = transitorio_por_bloques(rc_senoidal, 1e-3, 1000, muestras_bloque=37)
+    assert np.array_equal(np.concatenate([b.tiempo for b in bloques]), instantes_por_bloques(1e-3, 1000))
+    assert len(instantes_por_bloques(1e-3, 0)) == 0
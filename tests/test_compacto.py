@@ -0,0 +1,97 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from conftest import construir
+from test_persistencia import circuito_mixto
+from core.circuito import Circuito
+from core.compacto import CircuitoCompacto
+from core.componentes import FuenteDC, Resistencia, Capacitor, Diodo, Tierra
+from core.simulacion import punto_operacion, transitorio
+
+
+def _iguales(a, b, nodo='y'):
+    op_a, op_b = punto_operacion(a), punto_operacion(b)
+    assert op_a['voltajes'].keys() == op_b['voltajes'].keys()
+    for n, v in op_a['voltajes'].items():
+        assert np.isclose(op_b['voltajes'][n], v, rtol=1e-9, atol=1e-12)
+    ta, tb = transitorio(a, 2e-3, 50), transitorio(b, 2e-3, 50)
+    assert np.allclose(ta['sistema'].voltaje_nodo(ta['solucion'], nodo),
+                       tb['sistema'].voltaje_nodo(tb['solucion'], nodo), rtol=1e-9, atol=1e-12)
+
+
+def test_igual_que_el_circuito_de_objetos():
+    original = circuito_mixto()
+    compacto = CircuitoCompacto.desde_componentes(original.componentes)
+    assert [str(c) for c in compacto.componentes] == [str(c) for c in original.componentes]
+    assert set(compacto.nodos) == set(original.nodos)
+    assert compacto.verificar_conexiones() == original.verificar_conexiones()
+    _iguales(original, compacto)
+
+
+def test_vistas_leen_y_escriben_los_arreglos():
+    circuito = CircuitoCompacto.desde_componentes(circuito_mixto().componentes)
+    vista = circuito.componentes[3]
+    assert isinstance(vista, Resistencia) and vista.tipo is Resistencia
+    assert (vista.nombre, vista.nodo1, vista.nodo2, vista.resistencia) == ('rb', 'vcc', 'b', 470e3)
+    assert vista.terminales == ('vcc', 'b')
+    assert vista == circuito.componentes[3] and hash(vista) == hash(circuito.componentes[3])
+    assert vista != circuito.componentes[4]
+    assert vista in circuito.componentes and vista not in CircuitoCompacto().componentes
+    assert circuito.ubicacion(vista) == ('resistencias', 0)
+
+    vista.resistencia = 100e3
+    assert circuito.componentes[3].resistencia == 100e3
+    transistor = circuito.componentes[5]
+    assert (transistor.nodoB, transistor.nodoC, transistor.nodoE, transistor.beta) == ('b', 'c', 'e', 150.0)
+    assert circuito.componentes[-1].terminales == ('0',)
+    assert [c.nombre for c in circuito.componentes[-3:]] == ['w', 'rl', 'g']
+
+    copia = pickle.loads(pickle.dumps(vista))
+    assert (copia.nombre, copia.resistencia) == ('rb', 100e3)
+    assert {c.nombre for c in circuito.obtener_componentes_conectados('b')} == {'ci', 'rb', 'q'}
+
+
+def test_cambiar_valor_igual_que_reconstruir():
+    circuito = CircuitoCompacto.desde_componentes(circuito_mixto().componentes)
+    punto_operacion(circuito)
+    circuito.cambiar_valor(circuito.componentes[4], 1e3)
+    referencia = circuito_mixto()
+    referencia.componentes[4].resistencia = 1e3
+    _iguales(referencia, circuito)
+    with pytest.raises(ValueError):
+        circuito.cambiar_valor(Resistencia('r', 'a', 'b', 1.0), 2.0)
+
+
+def test_agregar_bloque_igual_que_uno_a_uno():
+    n = 50
+    nodos = np.array([f'n{k}' for k in range(n + 1)])
+    valores = np.linspace(1e3, 2e3, n)
+    bloque = CircuitoCompacto()
+    bloque.agregar_componente(FuenteDC('v', nodos[0], '0', 5.0))
+    bloque.agregar_bloque(Resistencia, np.column_stack([nodos[:-1], nodos[1:]]), resistencia=valores)
+    bloque.agregar_bloque(Capacitor, np.column_stack([nodos[1:], np.full(n, '0')]), capacitancia=1e-9)
+    bloque.agregar_bloque(Diodo, [[nodos[-1], '0']], ['d'], n=2.0)
+    bloque.agregar_componente(Tierra('g', '0'))
+
+    objetos = construir(FuenteDC('v', nodos[0], '0', 5.0),
+                        *[Resistencia(str(k), nodos[k], nodos[k + 1], valores[k]) for k in range(n)],
+                        *[Capacitor(str(k), nodos[k + 1], '0', 1e-9) for k in range(n)],
+                        Diodo('d', nodos[-1], '0', n=2.0), Tierra('g', '0'))
+    assert [str(c) for c in bloque.componentes] == [str(c) for c in objetos.componentes]
+    diodo = bloque.componentes[-2]
+    assert (diodo.Is, diodo.Vt, diodo.n) == (1e-12, 0.02585, 2.0)
+    _iguales(objetos, bloque, nodo=nodos[-1])
+
+    with pytest.raises(ValueError):
+        bloque.agregar_bloque(Resistencia, [['a', 'b'], ['b', 'c']], ['solo_uno'], resistencia=1.0)
+
+
+def test_desde_arreglos_ida_y_vuelta():
+    circuito = CircuitoCompacto.desde_componentes(circuito_mixto().componentes)
+    copia = CircuitoCompacto.desde_arreglos(*circuito.arreglos())
+    assert [str(c) for c in copia.componentes] == [str(c) for c in circuito.componentes]
+    _iguales(circuito, copia)
+    # Las vistas también sirven para construir un Circuito de objetos
+    _iguales(Circuito.desde_componentes(copia.componentes), copia)
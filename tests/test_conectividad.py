@@ -0,0 +1,89 @@
+import numpy as np
+
+from conftest import construir
+from core.circuito import Circuito
+from core.componentes import Resistencia, Capacitor, FuenteDC, Cable, Tierra
+from core.conectividad import ConjuntosDisjuntos, IndiceConectividad, REFERENCIA
+
+
+def _componentes_conexas(nodos, aristas):
+    # Referencia por recorrido en anchura sobre la lista de adyacencia
+    vecinos = {n: set() for n in nodos}
+    for a, b in aristas:
+        vecinos[a].add(b)
+        vecinos[b].add(a)
+    vistos, grupos = set(), []
+    for inicio in nodos:
+        if inicio in vistos:
+            continue
+        grupo, pendientes = set(), [inicio]
+        while pendientes:
+            nodo = pendientes.pop()
+            if nodo not in grupo:
+                grupo.add(nodo)
+                pendientes.extend(vecinos[nodo] - grupo)
+        vistos |= grupo
+        grupos.append(frozenset(grupo))
+    return set(grupos)
+
+
+def test_conjuntos_disjuntos_frente_a_recorrido():
+    generador = np.random.default_rng(0)
+    nodos = list(range(200))
+    aristas = [tuple(par) for par in generador.integers(0, 200, size=(150, 2)).tolist()]
+    conjuntos = ConjuntosDisjuntos()
+    for nodo in nodos:
+        conjuntos.agregar(nodo)
+    for a, b in aristas:
+        conjuntos.unir(a, b)
+    assert {frozenset(c) for c in conjuntos.conjuntos()} == _componentes_conexas(nodos, aristas)
+
+
+def test_islas_y_caminos_dc():
+    circuito = construir(FuenteDC('v', 'a', '0', 1.0), Resistencia('r1', 'a', 'b', 1e3),
+                         Capacitor('c', 'b', 'c', 1e-6), Resistencia('r2', 'c', '0', 1e3),
+                         Capacitor('c2', 'b', 'd', 1e-6), Capacitor('c3', 'd', '0', 1e-6),
+                         Resistencia('r3', 'x', 'y', 1e3),
+                         Tierra('g', '0'))
+    indice = circuito.conectividad
+    islas = {frozenset(isla) for isla in indice.islas()}
+    assert frozenset({'x', 'y'}) in islas
+    assert frozenset({'0', 'a', 'b', 'c', 'd'}) in islas
+    assert all(indice.camino_dc(n) for n in ('a', 'b', 'c'))
+    assert not indice.camino_dc('d') and indice.conectado_a_tierra('d')
+    assert not indice.conectado_a_tierra('x')
+
+    problemas = circuito.verificar_conexiones()
+    assert "Los nodos x, y forman una isla sin conexión a tierra" in problemas
+    assert "Nodo d no tiene camino DC a tierra" in problemas
+    assert not any("Nodo c " in p for p in problemas)
+
+
+def test_lazos_de_fuentes_y_cables():
+    circuito = construir(FuenteDC('v1', 'a', '0', 1.0), Cable('w', 'a', 'b'), FuenteDC('v2', 'b', '0', 2.0),
+                         Resistencia('r', 'b', '0', 1e3), Tierra('g', '0'))
+    assert [c.nombre for c in circuito.conectividad.lazos] == ['v2']
+    assert circuito.errores_fatales() == ["v2 cierra un lazo de fuentes de tensión o cables"]
+
+
+def test_agregar_bloque_equivale_a_agregar_uno_a_uno():
+    generador = np.random.default_rng(1)
+    nodos = [str(k) for k in range(40)]
+    componentes = [Tierra('g', '0')]
+    for k, (a, b) in enumerate(generador.integers(0, 40, size=(60, 2)).tolist()):
+        clase = (Resistencia, Capacitor, FuenteDC)[k % 3]
+        componentes.append(clase(f"e{k}", nodos[a], nodos[b], 1.0))
+    componentes.append(Tierra('g2', '0'))
+
+    secuencial = IndiceConectividad()
+    for componente in componentes:
+        secuencial.agregar(componente)
+    bloque = Circuito.desde_componentes(componentes).conectividad
+
+    assert ({frozenset(i) for i in bloque.islas()} == {frozenset(i) for i in secuencial.islas()})
+    for nodo in nodos:
+        assert bloque.conectado_a_tierra(nodo) == secuencial.conectado_a_tierra(nodo)
+        assert bloque.camino_dc(nodo) == secuencial.camino_dc(nodo)
+    assert [c.nombre for c in bloque.lazos] == [c.nombre for c in secuencial.lazos]
+    assert bloque.tierras == secuencial.tierras
+    assert REFERENCIA not in {n for isla in bloque.islas() for n in isla}
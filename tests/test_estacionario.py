@@ -0,0 +1,58 @@
+import numpy as np
+
+from conftest import construir
+from core.componentes import FuenteAC, FuenteDC, Resistencia, Capacitor, Diodo, Tierra
+from core.simulacion import estado_estacionario, transitorio
+
+R, C = 1e3, 1e-7
+
+
+def _rc_multitono():
+    # Tres fuentes en serie (1 kHz, 3 kHz desfasada y continua) sobre un paso bajo R-C
+    return construir(FuenteAC('v1', 'in', 'a', 1.0, 1e3), FuenteAC('v2', 'a', 'b', 0.5, 3e3, 30),
+                     FuenteDC('v3', 'b', '0', 0.2), Resistencia('r', 'in', 'out', R),
+                     Capacitor('c', 'out', '0', C), Tierra('g', '0'))
+
+
+def test_superposicion_frente_a_fasores_analiticos():
+    circuito = _rc_multitono()
+    t = np.linspace(0, 2e-3, 400)
+    respuesta = estado_estacionario(circuito, tiempos=t)
+    assert respuesta['metodo'] == 'superposicion'
+    assert np.allclose(respuesta['frecuencias'], [1e3, 3e3])
+
+    esperado = np.full(len(t), 0.2)
+    for amplitud, f, fase in ((1.0, 1e3, 0.0), (0.5, 3e3, np.deg2rad(30))):
+        H = 1 / (1 + 2j * np.pi * f * R * C)
+        esperado += amplitud * np.abs(H) * np.sin(2 * np.pi * f * t + fase + np.angle(H))
+    salida = respuesta['sistema'].voltaje_nodo(respuesta['solucion'], 'out')
+    assert np.allclose(salida, esperado, atol=1e-9)
+
+
+def _ultimo_periodo(circuito, periodo, periodos, puntos_periodo):
+    t = np.linspace(0, periodos * periodo, periodos * puntos_periodo + 1)
+    respuesta = transitorio(circuito, tiempos=t)
+    final = t >= (periodos - 1) * periodo
+    return t[final] - (periodos - 1) * periodo, respuesta['sistema'].voltaje_nodo(respuesta['solucion'][final], 'out')
+
+
+def test_superposicion_igual_al_final_de_un_transitorio_largo():
+    # τ = 0.1 ms: tras 20 periodos de 1 ms el arranque se ha extinguido
+    t, transitorio_largo = _ultimo_periodo(_rc_multitono(), 1e-3, 20, 2000)
+    respuesta = estado_estacionario(_rc_multitono(), tiempos=t)
+    salida = respuesta['sistema'].voltaje_nodo(respuesta['solucion'], 'out')
+    assert np.max(np.abs(salida - transitorio_largo)) < 1e-4
+
+
+def test_balance_armonico_igual_al_final_de_un_transitorio_largo():
+    # Rectificador de media onda con filtro (τ = 2 ms a 50 Hz)
+    crear = lambda: construir(FuenteAC('v', 'in', '0', 5.0, 50.0), Diodo('d', 'in', 'out'),
+                              Resistencia('r', 'out', '0', 200.0), Capacitor('c', 'out', '0', 1e-5),
+                              Tierra('g', '0'))
+    t, transitorio_largo = _ultimo_periodo(crear(), 0.02, 10, 1000)
+    respuesta = estado_estacionario(crear(), tiempos=t, armonicos=128)
+    assert respuesta['metodo'] == 'balance_armonico' and respuesta['convergio']
+    salida = respuesta['sistema'].voltaje_nodo(respuesta['solucion'], 'out')
+    amplitud = np.ptp(transitorio_largo)
+    assert np.max(np.abs(salida - transitorio_largo)) < 5e-3 * amplitud
+    assert abs(salida.mean() - transitorio_largo.mean()) < 1e-4 * abs(transitorio_largo.mean())
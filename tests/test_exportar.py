@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.simulacion import analizar_circuito, transitorio_por_bloques, procesar_bloques
+from core.resultados import AcumuladorMetricas
+from utils.exportar import EscritorCSV, EscritorBinario, exportar_csv, exportar_binario, importar_binario
+
+
+def test_csv_por_bloques_igual_a_memoria(tmp_path, rc_senoidal):
+    exportar_csv(analizar_circuito(rc_senoidal, 1e-3, 500), str(tmp_path / 'memoria.csv'))
+    bloques = transitorio_por_bloques(rc_senoidal, 1e-3, 500, muestras_bloque=64)
+    procesar_bloques(bloques, EscritorCSV(str(tmp_path / 'bloques.csv')))
+
+    memoria = (tmp_path / 'memoria.csv').read_bytes()
+    assert b'\r' not in memoria
+    assert memoria.split(b'\n')[0] == (tmp_path / 'bloques.csv').read_bytes().split(b'\n')[0]
+    a = np.loadtxt(tmp_path / 'memoria.csv', delimiter=',', skiprows=1)
+    b = np.loadtxt(tmp_path / 'bloques.csv', delimiter=',', skiprows=1)
+    assert a.shape == (500, 1 + 3 * len(rc_senoidal.componentes))
+    assert np.allclose(a, b, rtol=1e-9, atol=1e-12)
+
+
+def test_binario_ida_y_vuelta(tmp_path, rc_senoidal):
+    resultados = analizar_circuito(rc_senoidal, 1e-3, 200)
+    exportar_binario(resultados, str(tmp_path / 'res'))
+    leidos = importar_binario(str(tmp_path / 'res'))
+    for componente, datos in resultados.items():
+        for serie in ('tiempo', 'voltaje', 'corriente', 'potencia'):
+            assert np.array_equal(leidos[str(componente)][serie], datos[serie])
+
+
+def test_binario_por_bloques_igual_a_memoria(tmp_path, rc_senoidal):
+    resultados = analizar_circuito(rc_senoidal, 1e-3, 500)
+    bloques = transitorio_por_bloques(rc_senoidal, 1e-3, 500, muestras_bloque=64)
+    escritor = EscritorBinario(str(tmp_path / 'bloques'), rc_senoidal.componentes, 500)
+    procesar_bloques(bloques, escritor)
+    leidos = importar_binario(str(tmp_path / 'bloques'))
+    for componente, datos in resultados.items():
+        for serie in ('tiempo', 'voltaje', 'corriente', 'potencia'):
+            assert np.allclose(leidos[str(componente)][serie], datos[serie], rtol=1e-9, atol=1e-12)
+
+
+def test_acumulador_igual_a_metricas_en_memoria(rectificador):
+    resultados = analizar_circuito(rectificador, 0.04, 2000)
+    acumulador, = procesar_bloques(transitorio_por_bloques(rectificador, 0.04, 2000, muestras_bloque=300),
+                                   AcumuladorMetricas())
+    resumen = acumulador.resumen()
+    for componente, datos in resultados.items():
+        for clave in ('vrms', 'irms', 'potencia_promedio', 'potencia_aparente', 'factor_potencia'):
+            assert np.isclose(resumen[componente][clave], datos[clave], rtol=1e-9, atol=1e-12)
+
+
+def test_binario_columnas_contiguas_y_mapeadas(tmp_path, rc_senoidal):
+    resultados = analizar_circuito(rc_senoidal, 1e-3, 300)
+    exportar_binario(resultados, str(tmp_path / 'res'))
+    with open(tmp_path / 'res' / 'metadata.json') as archivo:
+        metadata = json.load(archivo)
+    assert metadata['muestras'] == 300
+    fuente = str(rc_senoidal.componentes[0])
+    assert metadata['columnas'][:4] == ['tiempo', f'{fuente}/voltaje', f'{fuente}/corriente', f'{fuente}/potencia']
+
+    tabla = np.load(tmp_path / 'res' / 'datos.npy', mmap_mode='r')
+    assert isinstance(tabla, np.memmap) and tabla.flags.f_contiguous and tabla.dtype == np.float64
+    assert tabla.shape == (300, 1 + 3 * len(rc_senoidal.componentes))
+
+    leidos = importar_binario(str(tmp_path / 'res'))
+    capacitor = rc_senoidal.componentes[2]
+    voltaje = leidos[str(capacitor)]['voltaje']
+    assert isinstance(voltaje.base, np.memmap) or isinstance(voltaje, np.memmap)
+    assert voltaje.flags.c_contiguous
+    for clave in ('vrms', 'irms', 'potencia_promedio', 'potencia_aparente', 'factor_potencia'):
+        assert leidos[str(capacitor)][clave] == pytest.approx(resultados[capacitor][clave], rel=1e-12, abs=1e-15)
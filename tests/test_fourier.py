@@ -0,0 +1,61 @@
+import numpy as np
+from scipy.signal import welch
+
+from utils.fourier import analizar_fourier, analizar_fourier_multicanal
+
+# 50 Hz muestreados a 12.8 kHz: cada tono cae exactamente en un bin
+F0 = 50.0
+MUESTREO = 12800.0
+
+
+def _tonos(amplitudes, muestras=4096, fase=0.3):
+    t = np.arange(muestras) / MUESTREO
+    return t, sum(a * np.sin(2 * np.pi * (k + 1) * F0 * t + fase) for k, a in enumerate(amplitudes))
+
+
+def test_armonicos_y_thd_analiticos():
+    t, senal = _tonos([2.0, 0.0, 0.3, 0.0, 0.1])
+    analisis = analizar_fourier(senal, t)
+    assert analisis['frecuencia_fundamental'] == F0
+    thd = np.hypot(0.3, 0.1) / 2.0
+    assert np.isclose(analisis['thd'], thd, rtol=1e-9)
+    armonicos = dict((round(f), a) for f, a in analisis['armonicos'])
+    assert set(armonicos) == {150, 250}
+    assert np.isclose(armonicos[150], 0.3) and np.isclose(armonicos[250], 0.1)
+
+
+def test_multicanal_igual_a_un_canal_cada_vez():
+    t, a = _tonos([1.0, 0.2])
+    _, b = _tonos([3.0, 0.0, 0.5, 0.0, 0.0, 0.1], fase=1.1)
+    _, c = _tonos([0.0, 0.0, 0.0, 1.0])
+    senales = np.stack([a, b, c])
+    for opciones in ({}, {'ventana': 'hann'}, {'ventana': 'hann', 'segmento': 1024}):
+        conjunto = analizar_fourier_multicanal(senales, t, **opciones)
+        for k, senal in enumerate(senales):
+            individual = analizar_fourier(senal, t, **opciones)
+            assert np.allclose(conjunto['amplitudes'][k], individual['amplitudes'], atol=1e-12)
+            assert np.isclose(conjunto['thd'][k], individual['thd'])
+            assert conjunto['frecuencia_fundamental'][k] == individual['frecuencia_fundamental']
+            assert np.allclose(conjunto['armonicos'][k], np.array(individual['armonicos']).reshape(-1, 2))
+    assert list(conjunto['frecuencia_fundamental']) == [F0, F0, 4 * F0]
+
+
+def test_ventana_hann_mide_la_amplitud_del_tono():
+    t, senal = _tonos([1.5, 0.0, 0.25])
+    amplitudes = analizar_fourier_multicanal(senal, t, ventana='hann')['amplitudes'][0]
+    resolucion = MUESTREO / len(t)
+    assert np.isclose(amplitudes[round(F0 / resolucion)], 1.5)
+    assert np.isclose(amplitudes[round(3 * F0 / resolucion)], 0.25)
+
+
+def test_welch_frente_a_scipy():
+    t, senal = _tonos([1.0, 0.0, 0.4])
+    senal = senal + np.random.default_rng(0).normal(scale=0.05, size=len(t))
+    segmento = 512
+    analisis = analizar_fourier_multicanal(senal, t, ventana='hann', segmento=segmento, solapamiento=0.5)
+    f, densidad = welch(senal, MUESTREO, window='hann', nperseg=segmento, noverlap=segmento // 2,
+                        detrend=False, scaling='spectrum')
+    assert analisis['segmentos'] == (len(t) - segmento) // (segmento // 2) + 1
+    assert np.allclose(analisis['frecuencias'], f[:segmento // 2])
+    # Amplitud de pico: el doble de la potencia de un lado (salvo en DC)
+    assert np.allclose(analisis['amplitudes'][0, 1:] ** 2, 2 * densidad[1:segmento // 2])
@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from conftest import construir
+from core.circuito import Circuito
+from core.compacto import CircuitoCompacto
+from core.componentes import FuenteDC, FuenteAC, Resistencia, Capacitor, Inductor, Diodo, Cable, Tierra
+from core.generadores import escalera, malla, instanciar
+from core.simulacion import punto_operacion, barrido_ac
+
+CLASES = [Circuito, CircuitoCompacto]
+
+
+def _tensiones_escalera(v, serie, derivacion, secciones):
+    # Impedancia vista desde cada nodo hacia el final y división de tensión
+    # sección a sección
+    vista = [derivacion] * (secciones + 1)
+    for j in range(secciones - 1, 0, -1):
+        siguiente = serie + vista[j + 1]
+        vista[j] = derivacion * siguiente / (derivacion + siguiente)
+    tensiones = [v]
+    for j in range(1, secciones + 1):
+        tensiones.append(tensiones[-1] * vista[j] / (serie + vista[j]))
+    return np.array(tensiones)
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_escalera_resistiva_frente_a_la_analitica(clase):
+    circuito = clase()
+    circuito.agregar_componente(FuenteDC('v', 'n0', '0', 10.0))
+    circuito.agregar_componente(Tierra('g', '0'))
+    nodos = escalera(circuito, 30, serie=[(Resistencia, {'resistencia': 10.0})],
+                     derivacion=[(Resistencia, {'resistencia': 1e3})])
+    assert len(nodos) == 31 and len(circuito.componentes) == 2 + 2 * 30
+    voltajes = punto_operacion(circuito)['voltajes']
+    obtenidos = np.array([voltajes[n] for n in nodos])
+    assert np.allclose(obtenidos, _tensiones_escalera(10.0, 10.0, 1e3, 30), rtol=1e-9)
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_linea_rlc_frente_a_la_analitica(clase):
+    # R-L serie (con nodos intermedios) y C en derivación, en AC
+    secciones, R, L, C = 20, 2.0, 1e-6, 1e-9
+    circuito = clase()
+    circuito.agregar_componente(FuenteAC('v', 'entrada', '0', 1.0, 1e6))
+    circuito.agregar_componente(Tierra('g', '0'))
+    nodos = escalera(circuito, secciones, serie=[(Resistencia, {'resistencia': R}), (Inductor, {'inductancia': L})],
+                     derivacion=[(Capacitor, {'capacitancia': C})], entrada='entrada', prefijo='l')
+    assert nodos[0] == 'entrada' and 'l0_0' in circuito.nodos
+    frecuencias = np.array([1e5, 1e6, 5e6])
+    respuesta = barrido_ac(circuito, frecuencias)
+    for k, f in enumerate(frecuencias):
+        w = 2 * np.pi * f
+        esperado = _tensiones_escalera(1.0, R + 1j * w * L, 1 / (1j * w * C), secciones)
+        obtenido = np.array([respuesta['sistema'].voltaje_nodo(respuesta['solucion'][k], n) for n in nodos])
+        assert np.allclose(obtenido, esperado, rtol=1e-8)
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_malla_frente_a_la_construida_a_mano(clase):
+    filas, columnas, R = 4, 5, 1.0
+    circuito = clase()
+    nodos = malla(circuito, filas, columnas, (Resistencia, {'resistencia': R}),
+                  derivacion=[(Capacitor, {'capacitancia': 1e-9})])
+    assert nodos.shape == (filas, columnas)
+    assert len(circuito.componentes) == filas * (columnas - 1) + (filas - 1) * columnas + filas * columnas
+    circuito.agregar_componente(FuenteDC('v', nodos[0, 0], '0', 1.0))
+    circuito.agregar_componente(Resistencia('rl', nodos[-1, -1], '0', R))
+    circuito.agregar_componente(Tierra('g', '0'))
+
+    manual = [FuenteDC('v', 'm0_0', '0', 1.0), Resistencia('rl', f'm{filas - 1}_{columnas - 1}', '0', R),
+              Tierra('g', '0')]
+    for i in range(filas):
+        for j in range(columnas):
+            if j + 1 < columnas:
+                manual.append(Resistencia(f'h{i}{j}', f'm{i}_{j}', f'm{i}_{j + 1}', R))
+            if i + 1 < filas:
+                manual.append(Resistencia(f'v{i}{j}', f'm{i}_{j}', f'm{i + 1}_{j}', R))
+    referencia = punto_operacion(construir(*manual))['voltajes']
+    voltajes = punto_operacion(circuito)['voltajes']
+    for nodo in nodos.ravel():
+        assert np.isclose(voltajes[nodo], referencia[nodo], rtol=1e-9)
+
+
+def test_malla_2x2_entre_esquinas_opuestas():
+    # Dos caminos de 2R en paralelo: R entre esquinas, la mitad de la tensión
+    circuito = Circuito()
+    nodos = malla(circuito, 2, 2, (Resistencia, {'resistencia': 100.0}))
+    circuito.agregar_componente(FuenteDC('v', 'in', '0', 2.0))
+    circuito.agregar_componente(Resistencia('rs', 'in', nodos[0, 0], 100.0))
+    circuito.agregar_componente(Cable('w', nodos[1, 1], '0'))
+    circuito.agregar_componente(Tierra('g', '0'))
+    voltajes = punto_operacion(circuito)['voltajes']
+    assert np.isclose(voltajes[nodos[0, 0]], 1.0)
+    assert np.isclose(voltajes[nodos[0, 1]], 0.5) and np.isclose(voltajes[nodos[1, 0]], 0.5)
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_instanciar_divisores(clase):
+    plantilla = clase.desde_componentes([Resistencia('r1', 'in', 'mid', 1e3), Resistencia('r2', 'mid', '0', 3e3),
+                                         Diodo('d', 'mid', 'out'), Resistencia('rl', 'out', '0', 1e6)])
+    circuito = clase()
+    circuito.agregar_componente(FuenteDC('v', 'vin', '0', 4.0))
+    circuito.agregar_componente(Tierra('g', '0'))
+    entradas = np.array(['vin'] * 3 + ['vin2'] * 2)
+    circuito.agregar_componente(FuenteDC('v2', 'vin2', '0', 8.0))
+    internos = instanciar(circuito, plantilla.componentes, {'in': entradas}, 5)
+    assert list(internos['mid']) == [f'x{k}_mid' for k in range(5)]
+    assert 'x4_d' in {c.nombre for c in circuito.componentes}
+
+    voltajes = punto_operacion(circuito)['voltajes']
+    medios = np.array([voltajes[n] for n in internos['mid']])
+    salidas = np.array([voltajes[n] for n in internos['out']])
+    # El diodo con 1 MΩ apenas carga el divisor (3/4 de la entrada)
+    assert np.allclose(medios, [3.0] * 3 + [6.0] * 2, rtol=1e-3)
+    assert np.all(salidas < medios) and np.all(medios - salidas < 0.6)
+    with pytest.raises(ValueError):
+        instanciar(circuito, plantilla.componentes, {'in': entradas[:2]}, 5)
+
+
+@pytest.mark.parametrize('clase', CLASES)
+def test_atajos_en_bloque_iguales_a_uno_a_uno(clase):
+    n = 10
+    a = np.array([f'a{k}' for k in range(n)])
+    b = np.array([f'b{k}' for k in range(n)])
+    valores = np.arange(1, n + 1) * 100.0
+    circuito = clase()
+    circuito.agregar_fuentes_dc(a, np.full(n, '0'), 1.0)
+    circuito.agregar_resistencias(a, b, valores, nombres=[f'r{k}' for k in range(n)])
+    circuito.agregar_diodos(b, np.full(n, '0'), Is=1e-13)
+    circuito.agregar_capacitores(b, np.full(n, '0'), 1e-9)
+    circuito.agregar_tierras(['0'])
+
+    uno_a_uno = construir(*[FuenteDC(str(k), a[k], '0', 1.0) for k in range(n)],
+                          *[Resistencia(f'r{k}', a[k], b[k], valores[k]) for k in range(n)],
+                          *[Diodo(str(k), b[k], '0', Is=1e-13) for k in range(n)],
+                          *[Capacitor(str(k), b[k], '0', 1e-9) for k in range(n)], Tierra('0', '0'))
+    assert [str(c) for c in circuito.componentes] == [str(c) for c in uno_a_uno.componentes]
+    esperados, obtenidos = punto_operacion(uno_a_uno)['voltajes'], punto_operacion(circuito)['voltajes']
+    for nodo, v in esperados.items():
+        assert np.isclose(obtenidos[nodo], v, rtol=1e-9, atol=1e-12)
+
+    with pytest.raises(ValueError):
+        circuito.agregar_resistencias(a, b, 1.0, nombres=['uno'])
+    with pytest.raises(ValueError):
+        circuito.agregar_bloque(Resistencia, np.column_stack([a, b]))
+    with pytest.raises(ValueError):
+        circuito.agregar_bloque(Resistencia, np.column_stack([a, b]), resistencia=1.0, capacitancia=1.0)
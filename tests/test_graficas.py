@@ -0,0 +1,69 @@
+import numpy as np
+
+from utils.graficas import BufferDecimado, decimar_envolvente
+
+
+def _senal(n, semilla=0):
+    # Ruido con picos aislados de una muestra, que un submuestreo perdería
+    generador = np.random.default_rng(semilla)
+    y = generador.normal(size=n)
+    picos = generador.choice(n, 20, replace=False)
+    y[picos] = generador.choice([-50.0, 50.0], 20)
+    return np.arange(n, dtype=float), y
+
+
+def test_envolvente_conserva_minimo_y_maximo_de_cada_franja():
+    t, y = _senal(10007)
+    inicio, fin, columnas = 13, 9990, 64
+    td, yd = decimar_envolvente(t, y, inicio, fin, columnas)
+    assert len(td) <= 2 * columnas + 2
+    assert np.all(np.diff(td) >= 0)
+    ancho = (fin - inicio) // columnas
+    for k in range(columnas):
+        franja = y[inicio + k * ancho:inicio + (k + 1) * ancho]
+        assert franja.min() in yd and franja.max() in yd
+    assert yd.max() == y[inicio:fin].max() and yd.min() == y[inicio:fin].min()
+
+    td, yd = decimar_envolvente(t, y, 0, 100, 64)
+    assert np.array_equal(td, t[:100]) and np.array_equal(yd, y[:100])
+
+
+def _bloques(t, y, tamanos):
+    inicio = 0
+    for tamano in tamanos:
+        fin = min(inicio + tamano, len(t))
+        yield {'c': {'tiempo': t[inicio:fin], 'voltaje': y[inicio:fin], 'corriente': -y[inicio:fin],
+                     'potencia': y[inicio:fin] ** 2}}
+        inicio = fin
+
+
+def test_buffer_conserva_la_envolvente():
+    t, y = _senal(100003)
+    buffer = BufferDecimado(puntos_max=1000)
+    for bloque in _bloques(t, y, [777, 4096, 1, 3] * 40):
+        buffer.escribir(bloque)
+    datos = buffer.resultados()['c']
+    tiempo = datos['tiempo']
+    assert len(tiempo) <= 1002
+    assert np.all(np.diff(tiempo) >= 0)
+    for serie, referencia in (('voltaje', y), ('corriente', -y), ('potencia', y ** 2)):
+        assert datos[serie].max() == referencia.max() and datos[serie].min() == referencia.min()
+
+    # Cada par de puntos es el mínimo y el máximo de un tramo de muestras
+    # contiguo al anterior
+    pares = tiempo[:len(tiempo) // 2 * 2].reshape(-1, 2).astype(int)
+    assert pares[0, 0] == 0 and np.all(pares[1:, 0] == pares[:-1, 1] + 1)
+    valores = datos['voltaje'][:2 * len(pares)].reshape(-1, 2)
+    for (a, b), (primero, segundo) in zip(pares, valores):
+        tramo = y[a:b + 1]
+        assert {primero, segundo} == {tramo.min(), tramo.max()}
+
+
+def test_buffer_sin_decimar_devuelve_las_muestras():
+    t, y = _senal(501)
+    buffer = BufferDecimado(puntos_max=1000)
+    for bloque in _bloques(t, y, [100, 7, 394]):
+        buffer.escribir(bloque)
+    datos = buffer.resultados()['c']
+    assert np.array_equal(datos['tiempo'], t)
+    assert np.array_equal(datos['voltaje'], y)
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from voltimper import PAQUETES_DIFERIDOS, PRESUPUESTO_IMPORTACION
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPETICIONES = 3
+
+
+def _importar(modulos):
+    # Mejor tiempo de varios intérpretes nuevos y paquetes cargados en el último
+    codigo = ("import sys, time\n"
+              "inicio = time.perf_counter()\n"
+              f"import {', '.join(modulos)}\n"
+              "print(time.perf_counter() - inicio)\n"
+              "print(' '.join(sys.modules))")
+    tiempos = []
+    for _ in range(REPETICIONES):
+        salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True,
+                                check=True)
+        segundos, cargados = salida.stdout.splitlines()
+        tiempos.append(float(segundos))
+    return min(tiempos), {m.split('.')[0] for m in cargados.split()}
+
+
+def test_importar_simulacion_y_cli_sin_paquetes_diferidos():
+    segundos, cargados = _importar(['core.simulacion', 'voltimper'])
+    assert not cargados & set(PAQUETES_DIFERIDOS)
+    assert segundos <= PRESUPUESTO_IMPORTACION
+
+
+def test_importar_core_y_utils_sin_paquetes_diferidos():
+    from voltimper import _modulos_sin_interfaz
+    segundos, cargados = _importar(_modulos_sin_interfaz()[1])
+    assert not cargados & set(PAQUETES_DIFERIDOS)
+    assert segundos <= PRESUPUESTO_IMPORTACION
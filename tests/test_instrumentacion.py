@@ -0,0 +1,100 @@
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from core import instrumentacion
+from core.instrumentacion import registrar, etapa, medido, contar, anotar, formatear_informe
+from core.simulacion import transitorio
+
+MIB = 2**20
+
+
+@medido('doble')
+def _doble(x):
+    return 2 * x
+
+
+def test_sin_registro_no_se_mide_nada():
+    assert instrumentacion._activo is None
+    assert etapa('x') is etapa('y')
+    contar('x')
+    anotar('x', 1)
+    assert _doble(3) == 6
+
+
+def test_etapas_contadores_y_valores():
+    with registrar() as registro:
+        for _ in range(3):
+            with etapa('exterior'):
+                time.sleep(0.01)
+                with etapa('interior'):
+                    _doble(1)
+        contar('pasos', 5)
+        contar('pasos')
+        anotar('maximo', 3)
+        anotar('maximo', 1)
+        with pytest.raises(ZeroDivisionError):
+            with etapa('fallida'):
+                1 / 0
+    informe = registro.informe()
+    assert instrumentacion._activo is None
+    assert informe['etapas']['exterior']['llamadas'] == 3
+    assert informe['etapas']['exterior']['segundos'] >= 0.03
+    assert informe['etapas']['interior']['segundos'] <= informe['etapas']['exterior']['segundos']
+    assert informe['etapas']['doble']['llamadas'] == 3
+    assert informe['etapas']['fallida']['llamadas'] == 1
+    assert informe['contadores'] == {'pasos': 6}
+    assert informe['valores'] == {'maximo': 3}
+    texto = formatear_informe(informe)
+    assert all(nombre in texto for nombre in ('exterior', 'interior', 'doble', 'pasos', 'maximo'))
+
+
+def test_registros_anidados_se_restauran():
+    with registrar() as exterior:
+        with registrar() as interior:
+            contar('a')
+        contar('b')
+    assert interior.informe()['contadores'] == {'a': 1}
+    assert exterior.informe()['contadores'] == {'b': 1}
+
+
+def test_pico_de_memoria_incluye_las_etapas_anidadas():
+    assert not tracemalloc.is_tracing()
+    with registrar(memoria=True) as registro:
+        with etapa('exterior'):
+            conservado = np.ones(MIB)
+            with etapa('interior'):
+                temporal = np.ones(2 * MIB)
+                del temporal
+    assert not tracemalloc.is_tracing()
+    etapas = registro.informe()['etapas']
+    assert 16 * MIB <= etapas['interior']['pico_bytes'] < 17 * MIB
+    assert 24 * MIB <= etapas['exterior']['pico_bytes'] < 25 * MIB
+    del conservado
+
+
+def test_contadores_desde_varios_hilos():
+    def trabajar():
+        for _ in range(10000):
+            contar('n')
+    with registrar() as registro:
+        hilos = [threading.Thread(target=trabajar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    assert registro.informe()['contadores']['n'] == 40000
+
+
+def test_etapas_de_una_simulacion(rc_senoidal):
+    with registrar() as registro:
+        transitorio(rc_senoidal, 1e-3, 200)
+    informe = registro.informe()
+    etapas = informe['etapas']
+    assert informe['contadores']['pasos'] == 199
+    assert etapas['transitorio']['llamadas'] == 1
+    assert etapas['factorizacion']['llamadas'] >= 1
+    assert etapas['factorizacion']['segundos'] <= etapas['transitorio']['segundos']
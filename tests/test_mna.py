@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from conftest import construir
+from core.circuito import Circuito
+from core.componentes import FuenteDC, FuenteAC, Resistencia, Capacitor, Inductor, Diodo, Tierra
+from core.generadores import escalera
+from core.instrumentacion import registrar
+from core.simulacion import punto_operacion, barrido_ac, transitorio
+
+
+def test_divisor_resistivo():
+    circuito = construir(FuenteDC('v', 'a', '0', 10.0), Resistencia('r1', 'a', 'b', 3e3),
+                         Resistencia('r2', 'b', '0', 1e3), Tierra('g', '0'))
+    op = punto_operacion(circuito)
+    assert np.isclose(op['voltajes']['b'], 2.5, rtol=1e-9)
+    # La corriente de rama de la fuente sale por su terminal positivo
+    assert np.isclose(abs(op['corrientes'][circuito.componentes[0]]), 10.0 / 4e3, rtol=1e-9)
+
+
+def test_barrido_ac_paso_bajo(rc_senoidal):
+    f = np.logspace(1, 6, 50)
+    respuesta = barrido_ac(rc_senoidal, f)
+    esperado = 1 / (1 + 2j * np.pi * f * 1e3 * 1e-7)
+    assert np.allclose(respuesta['voltajes']['out'], esperado, rtol=1e-6)
+
+
+def test_barrido_ac_disperso_igual_a_denso():
+    # Más de UMBRAL_DENSO incógnitas: ruta dispersa frente a una solución densa directa
+    circuito = Circuito()
+    circuito.agregar_componentes([FuenteAC('v', 'n0', '0', 1.0, 1e3), Tierra('g', '0')])
+    escalera(circuito, 300, serie=[(Resistencia, {'resistencia': 10.0}), (Inductor, {'inductancia': 1e-6})],
+             derivacion=[(Capacitor, {'capacitancia': 1e-9})])
+    f = np.array([1e3, 1e5, 1e6])
+    respuesta = barrido_ac(circuito, f)
+    sistema = respuesta['sistema']
+    b = sistema.excitacion_ac()
+    for k, fk in enumerate(f):
+        x = np.linalg.solve(sistema.matriz(2j * np.pi * fk).toarray(), b)
+        assert np.allclose(respuesta['solucion'][k], x, rtol=1e-8, atol=1e-12)
+
+
+def test_cambio_de_valor_igual_a_circuito_nuevo():
+    r2 = Resistencia('r2', 'b', '0', 1e3)
+    circuito = construir(FuenteDC('v', 'a', '0', 10.0), Resistencia('r1', 'a', 'b', 3e3), r2,
+                         Capacitor('c', 'b', '0', 1e-6), Tierra('g', '0'))
+    punto_operacion(circuito)
+    circuito.cambiar_valor(r2, 7e3)
+    nuevo = construir(FuenteDC('v', 'a', '0', 10.0), Resistencia('r1', 'a', 'b', 3e3),
+                      Resistencia('r2', 'b', '0', 7e3), Capacitor('c', 'b', '0', 1e-6), Tierra('g', '0'))
+    assert np.isclose(punto_operacion(circuito)['voltajes']['b'], 7.0, rtol=1e-9)
+    assert np.allclose(barrido_ac(circuito, [1e3])['solucion'], barrido_ac(nuevo, [1e3])['solucion'])
+
+
+def test_pasivo_agregado_igual_a_circuito_nuevo():
+    # Uno en paralelo (entradas ya en el patrón) y otro entre nodos que no
+    # estaban unidos (entradas nuevas), con un diodo cuyos estampados se mueven
+    base = [FuenteDC('v', 'a', '0', 5.0), Resistencia('r1', 'a', 'b', 1e3), Diodo('d', 'b', 'c'),
+            Resistencia('r2', 'c', '0', 1e3), Capacitor('c1', 'c', '0', 1e-6), Tierra('g', '0')]
+    agregados = [Resistencia('r3', 'a', 'b', 2e3), Resistencia('r4', 'a', 'c', 5e3), Capacitor('c2', 'b', '0', 1e-6)]
+    circuito = construir(*base)
+    punto_operacion(circuito)
+    for componente in agregados:
+        anterior = circuito.compilar()
+        circuito.agregar_componente(componente)
+        assert circuito.compilar() is not anterior and circuito.compilar().nodos == anterior.nodos
+    nuevo = construir(*base, *agregados)
+    sistema, referencia = circuito.sistema_mna(), nuevo.sistema_mna()
+    for s in (0, 1e3j):
+        assert np.allclose(sistema.matriz(s).toarray(), referencia.matriz(s).toarray())
+    assert np.allclose(punto_operacion(circuito)['solucion'], punto_operacion(nuevo)['solucion'])
+
+
+def test_valor_invalido_no_deja_el_circuito_inservible():
+    r2 = Resistencia('r2', 'b', '0', 1e3)
+    circuito = construir(FuenteDC('v', 'a', '0', 10.0), Resistencia('r1', 'a', 'b', 3e3), r2, Tierra('g', '0'))
+    punto_operacion(circuito)
+    for valor in (0.0, -5.0, float('nan')):
+        with pytest.raises(ValueError):
+            circuito.cambiar_valor(r2, valor)
+    assert r2.resistencia == 1e3
+    assert np.isclose(punto_operacion(circuito)['voltajes']['b'], 2.5, rtol=1e-9)
+    circuito.cambiar_valor(r2, 3e3)
+    assert np.isclose(punto_operacion(circuito)['voltajes']['b'], 5.0, rtol=1e-9)
+
+
+def test_fallo_al_actualizar_descarta_la_forma_compilada(monkeypatch):
+    r2 = Resistencia('r2', 'b', '0', 1e3)
+    circuito = construir(FuenteDC('v', 'a', '0', 10.0), Resistencia('r1', 'a', 'b', 3e3), r2, Tierra('g', '0'))
+    compilado = circuito.compilar()
+    # Un valor inválido asignado por fuera de cambiar_valor no toca el grupo
+    r2.resistencia = 0.0
+    with pytest.raises(ValueError):
+        compilado.actualizar(r2)
+    assert compilado.resistencias.valor[1] == 1e3
+    r2.resistencia = 1e3
+
+    def falla(*args, **kwargs):
+        raise np.linalg.LinAlgError("Matriz singular")
+    monkeypatch.setattr(compilado.mna, 'actualizar', falla)
+    with pytest.raises(np.linalg.LinAlgError):
+        circuito.cambiar_valor(r2, 3e3)
+    assert circuito.compilar() is not compilado
+    assert np.isclose(punto_operacion(circuito)['voltajes']['b'], 5.0, rtol=1e-9)
+
+
+def test_cambio_de_valor_reutiliza_las_factorizaciones():
+    # Punto de operación y barrido AC (pocas frecuencias, ruta dispersa) tras
+    # un cambio de valor: sólo correcciones, ninguna factorización nueva
+    circuito = Circuito()
+    circuito.agregar_componentes([FuenteAC('v', 'n0', '0', 1.0, 1e3), Tierra('g', '0')])
+    escalera(circuito, 300, serie=[(Resistencia, {'resistencia': 10.0})],
+             derivacion=[(Capacitor, {'capacitancia': 1e-9})])
+    f = [1e3, 1e5]
+    punto_operacion(circuito)
+    barrido_ac(circuito, f)
+    resistencia = circuito.componentes[2]
+    with registrar() as registro:
+        circuito.cambiar_valor(resistencia, 25.0)
+        op = punto_operacion(circuito)
+        ac = barrido_ac(circuito, f)
+    assert 'factorizacion' not in registro.informe()['etapas']
+
+    nuevo = Circuito()
+    nuevo.agregar_componentes([FuenteAC('v', 'n0', '0', 1.0, 1e3), Tierra('g', '0')])
+    escalera(nuevo, 300, serie=[(Resistencia, {'resistencia': np.r_[25.0, np.full(299, 10.0)]})],
+             derivacion=[(Capacitor, {'capacitancia': 1e-9})])
+    assert np.allclose(op['solucion'], punto_operacion(nuevo)['solucion'], atol=1e-12)
+    assert np.allclose(ac['solucion'], barrido_ac(nuevo, f)['solucion'], rtol=1e-9, atol=1e-12)
+
+
+def test_muchas_resoluciones_integran_la_correccion():
+    # Un transitorio largo tras el cambio no paga Sherman-Morrison-Woodbury
+    # en cada paso: la corrección acaba dentro de una factorización nueva
+    circuito = Circuito()
+    circuito.agregar_componentes([FuenteAC('v', 'n0', '0', 1.0, 1e3), Tierra('g', '0')])
+    escalera(circuito, 300, serie=[(Resistencia, {'resistencia': 10.0})],
+             derivacion=[(Capacitor, {'capacitancia': 1e-9})])
+    transitorio(circuito, 1e-4, 2001)
+    circuito.cambiar_valor(circuito.componentes[2], 25.0)
+    sistema = circuito.sistema_mna()
+    alfa = 2.0 / (1e-4 / 2000)
+    assert sistema.factorizacion(alfa).rango == 1
+    respuesta = transitorio(circuito, 1e-4, 2001)
+    assert sistema.factorizacion(alfa).rango == 0
+    assert np.isclose(sistema.factorizacion(alfa).resolver(sistema.matriz(alfa) @ respuesta['solucion'][-1]),
+                      respuesta['solucion'][-1], rtol=1e-9, atol=1e-12).all()
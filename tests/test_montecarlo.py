@@ -0,0 +1,62 @@
+import numpy as np
+
+from conftest import construir
+from core.componentes import FuenteDC, FuenteAC, Resistencia, Capacitor, Tierra
+from core.montecarlo import (montecarlo, montecarlo_por_lotes, barrido_parametrico, MuestreoAleatorio,
+                             Estadisticas)
+
+
+def _divisor():
+    r1, r2 = Resistencia('r1', 'a', 'b', 3e3), Resistencia('r2', 'b', '0', 1e3)
+    return construir(FuenteDC('v', 'a', '0', 10.0), r1, r2, Tierra('g', '0')), r1, r2
+
+
+def test_estadisticas_del_divisor():
+    # Las mismas muestras que genera el Monte Carlo, resueltas a mano
+    circuito, r1, r2 = _divisor()
+    variaciones = {r1: 0.1, r2: ('normal', 0.05)}
+    resumen = montecarlo(circuito, variaciones, 1000, ['b'], limites={'b': (2.4, 2.6)},
+                         percentiles=(10, 50, 90), semilla=7, lote=256)
+    muestreo = MuestreoAleatorio(circuito.compilar(), variaciones, 7)
+    R = np.concatenate([muestreo.lote(i, k)['resistencias'] for i, k in enumerate((256, 256, 256, 232))])
+    v = 10.0 * R[:, 1] / (R[:, 0] + R[:, 1])
+
+    b = resumen['salidas']['b']
+    assert resumen['muestras'] == 1000
+    assert np.isclose(b['media'], v.mean(), rtol=1e-12)
+    assert np.isclose(b['desviacion'], v.std(ddof=1), rtol=1e-9)
+    assert np.isclose(b['minimo'], v.min()) and np.isclose(b['maximo'], v.max())
+    for p, valor in b['percentiles'].items():
+        assert np.isclose(valor, np.percentile(v, p), rtol=1e-12)
+    assert np.isclose(resumen['rendimiento'], np.mean((v >= 2.4) & (v <= 2.6)))
+
+
+def test_los_lotes_no_resumen_hasta_que_se_pide():
+    circuito, r1, _ = _divisor()
+    vistos = []
+    for estadisticas in montecarlo_por_lotes(circuito, {r1: 0.1}, 100, ['b'], lote=32, semilla=1):
+        assert isinstance(estadisticas, Estadisticas)
+        vistos.append(estadisticas.n)
+    assert vistos == [32, 64, 96, 100]
+    assert estadisticas.resumen() == montecarlo(circuito, {r1: 0.1}, 100, ['b'], lote=32, semilla=1)
+
+
+def test_barrido_parametrico_del_divisor():
+    circuito, r1, r2 = _divisor()
+    R1, R2 = np.array([1e3, 2e3, 3e3]), np.array([500.0, 1e3])
+    resumen = barrido_parametrico(circuito, {r1: R1, r2: R2}, ['b'], lote=4)
+    esperado = 10.0 * R2[None, :] / (R1[:, None] + R2[None, :])
+    assert resumen['valores'].shape == (3, 2, 1)
+    assert np.allclose(resumen['valores'][..., 0], esperado, rtol=1e-9)
+    assert resumen['muestras'] == 6
+
+
+def test_barrido_ac_de_la_capacitancia():
+    # Módulo de un paso bajo RC a 1 kHz para cada capacitancia
+    c = Capacitor('c', 'out', '0', 1e-7)
+    circuito = construir(FuenteAC('v', 'in', '0', 1.0, 1e3), Resistencia('r', 'in', 'out', 1e3), c,
+                         Tierra('g', '0'))
+    C = np.array([1e-8, 1e-7, 1e-6])
+    resumen = barrido_parametrico(circuito, {c: C}, ['out'], frecuencia=1e3)
+    esperado = 1 / np.abs(1 + 2j * np.pi * 1e3 * 1e3 * C)
+    assert np.allclose(resumen['valores'][:, 0], esperado, rtol=1e-9)
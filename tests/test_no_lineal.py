@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from conftest import construir
+from core.componentes import FuenteDC, FuenteAC, Resistencia, Capacitor, Diodo, TransistorBJT, Tierra
+from core.montecarlo import montecarlo
+from core.no_lineal import ModelosNoLineales
+from core.simulacion import punto_operacion, barrido_ac
+
+
+def test_residuo_kcl_del_diodo(diodo_dc):
+    op = punto_operacion(diodo_dc)
+    assert op['convergio']
+    va = op['voltajes']['a']
+    diodo = diodo_dc.componentes[2]
+    corriente = diodo.Is * np.expm1(va / (diodo.n * diodo.Vt))
+    assert 0.5 < va < 0.8
+    assert abs((5.0 - va) / 1e3 - corriente) < 1e-9
+    assert np.isclose(op['corrientes'][diodo], corriente, rtol=1e-9)
+
+
+def test_transistor_en_zona_activa():
+    transistor = TransistorBJT('q', 'b', 'c', '0', beta=100)
+    circuito = construir(FuenteDC('vcc', 'vcc', '0', 10.0), Resistencia('rb', 'vcc', 'b', 1e6),
+                         Resistencia('rc', 'vcc', 'c', 1e3), transistor, Tierra('g', '0'))
+    op = punto_operacion(circuito)
+    assert op['convergio']
+    ib, ic, ie = op['corrientes'][transistor]
+    assert np.isclose(ic / ib, 100, rtol=1e-2)
+    assert np.isclose(ib + ic + ie, 0, atol=1e-12)
+    assert np.isclose((10.0 - op['voltajes']['c']) / 1e3, ic, rtol=1e-6)
+
+
+def test_pequena_senal_del_diodo(diodo_dc):
+    diodo_dc.agregar_componente(FuenteAC('s', 's', '0', 1e-3, 1e3))
+    diodo_dc.agregar_componente(Capacitor('c', 's', 'a', 1e-6))
+    f = np.logspace(1, 5, 9)
+    respuesta = barrido_ac(diodo_dc, f)
+    diodo = diodo_dc.componentes[2]
+    va = punto_operacion(diodo_dc)['voltajes']['a']
+    g = 1 / 1e3 + diodo.Is / (diodo.n * diodo.Vt) * np.exp(va / (diodo.n * diodo.Vt))
+    zc = 1 / (2j * np.pi * f * 1e-6)
+    esperado = 1e-3 * (1 / g) / (1 / g + zc)
+    assert np.allclose(respuesta['voltajes']['a'], esperado, rtol=1e-6)
+
+
+def test_montecarlo_rechaza_no_lineales(diodo_dc):
+    with pytest.raises(ValueError):
+        montecarlo(diodo_dc, {'resistencias': 0.05}, 16, ['a'])
+
+
+def test_estampados_frente_a_diferencias_finitas():
+    # Jacobiano de las corrientes de diodo y transistor (que comparten nodos)
+    # frente a diferencias centradas de las corrientes de terminal
+    circuito = construir(FuenteDC('v', 'a', '0', 1.0), Resistencia('r', 'a', 'b', 1e3),
+                         Diodo('d', 'b', 'c'), TransistorBJT('q', 'b', 'c', '0', beta=80, beta_r=2),
+                         Resistencia('rc', 'c', '0', 1e3), Tierra('g', '0'))
+    sistema = circuito.sistema_mna()
+    modelos = ModelosNoLineales(sistema)
+    x = np.zeros(sistema.dimension)
+    x[sistema.nodo_indices['b']], x[sistema.nodo_indices['c']] = 0.62, 0.15
+
+    def kcl(x):
+        # Corriente que sale de cada nodo hacia los dispositivos
+        I_d, I_q = modelos.corrientes(x)
+        f = np.zeros(sistema.dimension)
+        for T, I in ((sistema.terminales_diodos, I_d), (sistema.terminales_transistores, I_q)):
+            validos = T >= 0
+            np.add.at(f, T[validos], I[validos])
+        return f
+
+    datos, rhs = modelos.estampar(modelos.uniones(x))
+    J = sistema.patron.densa(datos)
+    h = 1e-7
+    numerico = np.column_stack([(kcl(x + h * e) - kcl(x - h * e)) / (2 * h) for e in np.eye(sistema.dimension)])
+    assert np.allclose(J, numerico, rtol=1e-5, atol=1e-12)
+    # El término constante deja J·x - rhs igual a las corrientes en x
+    assert np.allclose(J @ x - rhs, kcl(x), rtol=1e-9, atol=1e-15)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from conftest import construir
+from core.circuito import Circuito
+from core.compacto import CircuitoCompacto
+from core.componentes import FuenteDC, FuenteAC, Resistencia, Capacitor, Inductor, Diodo, TransistorBJT, Tierra, Cable
+from core.netlist import leer_netlist
+from core.persistencia import guardar_circuito, cargar_circuito
+from core.simulacion import punto_operacion, transitorio
+
+
+def circuito_mixto():
+    return construir(FuenteDC('vcc', 'vcc', '0', 9.0), FuenteAC('s', 'in', '0', 0.1, 1e3, 30),
+                     Capacitor('ci', 'in', 'b', 1e-6), Resistencia('rb', 'vcc', 'b', 470e3),
+                     Resistencia('rc', 'vcc', 'c', 2.2e3), TransistorBJT('q', 'b', 'c', 'e', beta=150),
+                     Inductor('le', 'e', 'e2', 1e-3), Resistencia('re', 'e2', '0', 100.0),
+                     Diodo('d', 'c', 'x', Is=2e-14, n=1.5), Cable('w', 'x', 'y'),
+                     Resistencia('rl', 'y', '0', 10e3), Tierra('g', '0'))
+
+
+@pytest.mark.parametrize('extension', ['.cir', '.cirz'])
+@pytest.mark.parametrize('compacto', [False, True])
+def test_ida_y_vuelta(tmp_path, extension, compacto):
+    original = circuito_mixto()
+    posiciones = {original.componentes[3]: (10.0, -20.0)}
+    ruta = str(tmp_path / f'circuito{extension}')
+    guardar_circuito(original, ruta, posiciones)
+    cargado, posiciones_cargadas = cargar_circuito(ruta, compacto)
+
+    assert isinstance(cargado, CircuitoCompacto) == compacto
+    assert sorted(map(str, cargado.componentes)) == sorted(map(str, original.componentes))
+    assert list(posiciones_cargadas.values()) == [(10.0, -20.0)]
+    assert str(next(iter(posiciones_cargadas))) == str(original.componentes[3])
+
+    op_original, op_cargado = punto_operacion(original), punto_operacion(cargado)
+    for nodo, v in op_original['voltajes'].items():
+        assert np.isclose(op_cargado['voltajes'][nodo], v, rtol=1e-9, atol=1e-12)
+    a, b = transitorio(original, 2e-3, 50), transitorio(cargado, 2e-3, 50)
+    assert np.allclose(a['sistema'].voltaje_nodo(a['solucion'], 'y'), b['sistema'].voltaje_nodo(b['solucion'], 'y'))
+
+
+def test_compacto_guarda_de_nuevo(tmp_path):
+    ruta = str(tmp_path / 'circuito.cirz')
+    guardar_circuito(circuito_mixto(), ruta)
+    compacto, _ = cargar_circuito(ruta, compacto=True)
+    guardar_circuito(compacto, str(tmp_path / 'otra.cirz'))
+    de_nuevo, _ = cargar_circuito(str(tmp_path / 'otra.cirz'))
+    assert sorted(map(str, de_nuevo.componentes)) == sorted(map(str, compacto.componentes))
+
+
+def test_netlist_se_construye_en_bloque(monkeypatch):
+    # Sin GND declarado, el nodo 0 recibe su tierra; ningún componente pasa
+    # por agregar_componente
+    def uno_a_uno(self, componente):
+        raise AssertionError("leer_netlist agregó un componente suelto")
+    monkeypatch.setattr(Circuito, 'agregar_componente', uno_a_uno)
+    circuito = leer_netlist("VS in 0 DC 10\nR1 in out 3k\nR2 out 0 1k ;@ 1 2\n.end\n")
+    assert [type(c) for c in circuito.componentes] == [FuenteDC, Resistencia, Resistencia, Tierra]
+    assert set(circuito.conectividad.tierras) == {'0'}
+    assert np.isclose(punto_operacion(circuito)['voltajes']['out'], 2.5, rtol=1e-9)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from conftest import construir
+from core.componentes import FuenteAC, Resistencia, Capacitor, Tierra
+from core.simulacion import transitorio, transitorio_por_bloques, analizar_circuito
+
+TAU = 1e3 * 1e-7
+W = 2 * np.pi * 1e3
+
+
+def rc_analitico(t):
+    # Respuesta completa del paso bajo a sin(ωt) con el capacitor descargado
+    wt = W * TAU
+    return (np.sin(W * t) - wt * np.cos(W * t) + wt * np.exp(-t / TAU)) / (1 + wt**2)
+
+
+def voltaje(respuesta, nodo):
+    return respuesta['sistema'].voltaje_nodo(respuesta['solucion'], nodo)
+
+
+@pytest.mark.parametrize('metodo, tolerancia', [('trapezoidal', 1e-4), ('euler', 1e-2)])
+def test_rc_frente_a_solucion_analitica(rc_senoidal, metodo, tolerancia):
+    respuesta = transitorio(rc_senoidal, 2e-3, 4001, metodo=metodo)
+    error = np.abs(voltaje(respuesta, 'out') - rc_analitico(respuesta['tiempo']))
+    assert error.max() < tolerancia
+
+
+def rc_rigido_analitico(t, tau, w):
+    wt = w * tau
+    return (np.sin(w * t) - wt * np.cos(w * t) + wt * np.exp(-t / tau)) / (1 + wt**2)
+
+
+@pytest.mark.parametrize('puntos', [50, 200, 2000])
+def test_rc_rigido_adaptativo_en_las_salidas(puntos):
+    # τ = 1 µs a 50 Hz: el integrador da pasos mucho más largos que τ, y la
+    # salida no puede salir de interpolar entre ellos
+    circuito = construir(FuenteAC('v', 'in', '0', 1.0, 50.0), Resistencia('r', 'in', 'out', 1e3),
+                         Capacitor('c', 'out', '0', 1e-9), Tierra('g', '0'))
+    t = np.linspace(0, 40e-3, puntos)
+    respuesta = transitorio(circuito, tiempos=t, adaptativo=True, tolerancia_rel=1e-3)
+    error = np.abs(voltaje(respuesta, 'out') - rc_rigido_analitico(t, 1e-6, 2 * np.pi * 50.0))
+    assert error.max() < 1e-3
+    assert respuesta['pasos'] >= puntos - 1
+
+
+def test_rc_adaptativo(rc_senoidal):
+    respuesta = transitorio(rc_senoidal, 2e-3, 200, adaptativo=True, tolerancia_rel=1e-5, tolerancia_abs=1e-8)
+    error = np.abs(voltaje(respuesta, 'out') - rc_analitico(respuesta['tiempo']))
+    assert error.max() < 1e-3
+
+
+def test_corriente_del_capacitor(rc_senoidal):
+    resultados = analizar_circuito(rc_senoidal, 2e-3, 4001)
+    r, c = rc_senoidal.componentes[1], rc_senoidal.componentes[2]
+    # Toda la corriente de la resistencia carga el capacitor
+    assert np.allclose(resultados[c]['corriente'][1:], resultados[r]['corriente'][1:], atol=1e-6)
+
+
+def test_bloques_igual_a_memoria(rc_senoidal):
+    completo = transitorio(rc_senoidal, 2e-3, 1001)
+    bloques = list(transitorio_por_bloques(rc_senoidal, 2e-3, 1001, muestras_bloque=128))
+    assert [len(b.tiempo) for b in bloques][:-1] == [128] * (len(bloques) - 1)
+    assert np.allclose(np.concatenate([b.tiempo for b in bloques]), completo['tiempo'])
+    X = np.concatenate([b.respuesta['solucion'] for b in bloques])
+    assert np.allclose(X, completo['solucion'], rtol=1e-12, atol=1e-15)
+    corrientes = np.concatenate([b.respuesta['capacitores'] for b in bloques])
+    assert np.allclose(corrientes, completo['capacitores'], rtol=1e-9, atol=1e-15)
+
+
+@pytest.mark.parametrize('metodo', ['trapezoidal', 'euler'])
+def test_rectificador_media_onda(rectificador, metodo):
+    respuesta = transitorio(rectificador, 40e-3, 2001, metodo=metodo)
+    assert respuesta['convergio']
+    entrada, salida = voltaje(respuesta, 'in'), voltaje(respuesta, 'out')
+    assert 4.2 < salida.max() < 4.6
+    assert salida.min() > -1e-6
+    # KCL en la salida en cada instante: corriente del diodo = v/R
+    diodo = rectificador.componentes[1]
+    corriente = diodo.Is * np.expm1((entrada - salida) / (diodo.n * diodo.Vt))
+    assert np.allclose(corriente, salida / 1e3, atol=1e-6)
+
+
+def test_rectificador_adaptativo(rectificador):
+    respuesta = transitorio(rectificador, 40e-3, 400, adaptativo=True)
+    assert respuesta['convergio']
+    assert 4.2 < voltaje(respuesta, 'out').max() < 4.6
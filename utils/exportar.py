@@ -1,24 +1,76 @@
 import csv
 import json
+import os
+from collections.abc import Mapping
 import numpy as np
 from datetime import datetime
+from core.instrumentacion import medido
 
-def exportar_csv(resultados, filename):
-    with open(filename, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        
-        headers = ['Tiempo (s)']
-        for componente in resultados.keys():
-            headers.extend([f"{componente} V (V)", f"{componente} I (A)", f"{componente} P (W)"])
-        writer.writerow(headers)
+# Filas que se formatean y escriben de una vez, y memoria máxima (bytes) de
+# la tabla en que se preparan
+FILAS_BLOQUE = 65536
+MEMORIA_TABLA = 64 * 2**20
+
+SERIES_CSV = (('voltaje', 'V (V)'), ('corriente', 'I (A)'), ('potencia', 'P (W)'))
+
+def _bloques(resultados):
+    # Un diccionario de resultados es un único bloque; cualquier otro iterable
+    # se consume bloque a bloque (p. ej. mientras avanza el transitorio)
+    if isinstance(resultados, Mapping):
+        yield resultados
+    else:
+        yield from resultados
+
+class EscritorCSV:
+    # Escribe bloques de resultados consecutivos a medida que llegan
+    def __init__(self, filename, precision=12, filas_bloque=FILAS_BLOQUE):
+        # La cabecera (csv) y las filas (np.savetxt) terminan igual, en '\n'
+        self.archivo = open(filename, 'w', newline='')
+        self.writer = csv.writer(self.archivo, lineterminator='\n')
+        self.formato = f"%.{precision}g"
+        self.filas_bloque = filas_bloque
+        self.componentes = None
         
-        tiempo = next(iter(resultados.values()))['tiempo']
-        for i, t in enumerate(tiempo):
-            row = [t]
-            for datos in resultados.values():
-                row.extend([datos['voltaje'][i], datos['corriente'][i], datos['potencia'][i]])
-            writer.writerow(row)
+    def escribir(self, bloque):
+        if self.componentes is None:
+            self.componentes = list(bloque.keys())
+            headers = ['Tiempo (s)']
+            for componente in self.componentes:
+                headers.extend(f"{componente} {unidad}" for _, unidad in SERIES_CSV)
+            self.writer.writerow(headers)
+            # Con muchos componentes se escriben menos filas de cada vez
+            columnas = 1 + len(SERIES_CSV) * len(self.componentes)
+            self.filas_bloque = max(1, min(self.filas_bloque, MEMORIA_TABLA // (8 * columnas)))
+            self.tabla = np.empty((0, columnas))
+            
+        tiempo = np.asarray(bloque[self.componentes[0]]['tiempo'])
+        if len(self.tabla) < min(len(tiempo), self.filas_bloque):
+            self.tabla = np.empty((min(len(tiempo), self.filas_bloque), self.tabla.shape[1]))
+        for inicio in range(0, len(tiempo), self.filas_bloque):
+            fin = min(inicio + self.filas_bloque, len(tiempo))
+            filas = self.tabla[:fin - inicio]
+            filas[:, 0] = tiempo[inicio:fin]
+            columna = 1
+            for componente in self.componentes:
+                datos = bloque[componente]
+                for serie, _ in SERIES_CSV:
+                    filas[:, columna] = datos[serie][inicio:fin]
+                    columna += 1
+            np.savetxt(self.archivo, filas, fmt=self.formato, delimiter=',')
+            
+    def cerrar(self):
+        self.archivo.close()
 
+@medido('exportacion')
+def exportar_csv(resultados, filename, precision=12, filas_bloque=FILAS_BLOQUE):
+    escritor = EscritorCSV(filename, precision, filas_bloque)
+    try:
+        for bloque in _bloques(resultados):
+            escritor.escribir(bloque)
+    finally:
+        escritor.cerrar()
+
+@medido('exportacion')
 def exportar_json(resultados, filename):
     export_data = {
         'metadata': {
@@ -46,6 +98,93 @@ def exportar_json(resultados, filename):
     with open(filename, 'w') as jsonfile:
         json.dump(export_data, jsonfile, indent=4)
 
+# Formato binario: un directorio con metadata.json y datos.npy. datos.npy es
+# una tabla float64 en orden Fortran (cada columna contigua): tiempo y luego
+# voltaje, corriente y potencia de cada componente.
+SERIES_BINARIO = ('voltaje', 'corriente', 'potencia')
+ESCALARES = ('vrms', 'irms', 'potencia_promedio', 'potencia_aparente', 'factor_potencia')
+
+class EscritorBinario:
+    def __init__(self, ruta, componentes, muestras):
+        os.makedirs(ruta, exist_ok=True)
+        self.ruta = ruta
+        self.componentes = [str(c) for c in componentes]
+        self.columnas = ['tiempo'] + [f"{c}/{serie}" for c in self.componentes for serie in SERIES_BINARIO]
+        self.datos = np.lib.format.open_memmap(os.path.join(ruta, 'datos.npy'), mode='w+', dtype=np.float64,
+                                               shape=(muestras, len(self.columnas)), fortran_order=True)
+        self.fila = 0
+        
+    def escribir(self, bloque):
+        # bloque: {componente: {'tiempo', 'voltaje', ...}} con las filas siguientes
+        datos = list(bloque.values())
+        tiempo = np.asarray(datos[0]['tiempo'])
+        fin = self.fila + len(tiempo)
+        self.datos[self.fila:fin, 0] = tiempo
+        columna = 1
+        for serie in datos:
+            for nombre in SERIES_BINARIO:
+                self.datos[self.fila:fin, columna] = serie[nombre]
+                columna += 1
+        self.fila = fin
+        
+    def cerrar(self, escalares=None):
+        self.datos.flush()
+        del self.datos
+        metadata = {
+            'fecha': datetime.now().isoformat(),
+            'muestras': self.fila,
+            'componentes': self.componentes,
+            'columnas': self.columnas,
+            'escalares': {str(c): {k: float(v) for k, v in valores.items()}
+                          for c, valores in (escalares or {}).items()}
+        }
+        with open(os.path.join(self.ruta, 'metadata.json'), 'w') as archivo:
+            json.dump(metadata, archivo, indent=1)
+
+@medido('exportacion')
+def exportar_binario(resultados, ruta):
+    datos = next(iter(resultados.values()))
+    escritor = EscritorBinario(ruta, resultados.keys(), len(datos['tiempo']))
+    escritor.escribir(resultados)
+    escritor.cerrar({c: {k: d[k] for k in ESCALARES if k in d} for c, d in resultados.items()})
+
+def importar_binario(ruta, mmap_mode='r'):
+    # Devuelve vistas de las columnas: con mmap sólo se leen las que se usen
+    with open(os.path.join(ruta, 'metadata.json')) as archivo:
+        metadata = json.load(archivo)
+    datos = np.load(os.path.join(ruta, 'datos.npy'), mmap_mode=mmap_mode)
+    tiempo = datos[:metadata['muestras'], 0]
+    resultados = {}
+    columna = 1
+    for componente in metadata['componentes']:
+        serie = {'tiempo': tiempo}
+        for nombre in SERIES_BINARIO:
+            serie[nombre] = datos[:metadata['muestras'], columna]
+            columna += 1
+        serie.update(metadata['escalares'].get(componente, {}))
+        resultados[componente] = serie
+    return resultados
+
+@medido('exportacion')
+def exportar_npz(analisis, filename):
+    # analisis: respuestas de core.simulacion bajo 'op', 'ac' y 'transitorio'
+    # (las que se hayan calculado). Se guardan por nodo y por rama.
+    datos = {}
+    for clave, respuesta in analisis.items():
+        sistema = respuesta['sistema']
+        nodos = sorted(sistema.nodo_indices, key=str)
+        ramas = list(sistema.rama_indices)
+        x = respuesta['solucion']
+        datos['nodos'] = np.array([str(n) for n in nodos])
+        datos['ramas'] = np.array([str(c) for c in ramas])
+        datos[f'{clave}_voltajes'] = np.stack([sistema.voltaje_nodo(x, n) for n in nodos], axis=-1)
+        datos[f'{clave}_corrientes'] = x[..., [sistema.rama_indices[c] for c in ramas]]
+        if clave == 'ac':
+            datos['ac_frecuencias'] = respuesta['frecuencias']
+        elif clave == 'transitorio':
+            datos['transitorio_tiempo'] = respuesta['tiempo']
+    np.savez_compressed(filename, **datos)
+
 def exportar_graficas(figuras, filename_prefix):
     for i, fig in enumerate(figuras):
         fig.savefig(f"{filename_prefix}_{i}.png", dpi=300, bbox_inches='tight')
\ No newline at end of file
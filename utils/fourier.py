@@ -1,31 +1,89 @@
 import numpy as np
-from scipy.fft import fft, fftfreq
+from core.instrumentacion import medido
 
-def analizar_fourier(senal, tiempo, frecuencia_fundamental=None):
-    N = len(tiempo)
+# Memoria máxima (bytes) de cada lote de segmentos que se transforma a la vez
+MEMORIA_LOTE = 64 * 2**20
+
+def _ventana(ventana, n):
+    if ventana is None:
+        return np.ones(n)
+    if isinstance(ventana, str):
+        from scipy.signal import get_window
+        return get_window(ventana, n)
+    ventana = np.asarray(ventana, dtype=float)
+    if len(ventana) != n:
+        raise ValueError("La ventana debe tener tantas muestras como el segmento")
+    return ventana
+
+def _espectro(senales, ventana, segmento, paso, workers):
+    # Amplitud media (promedio de potencias, estilo Welch) de los segmentos
+    # de cada canal; con un único segmento es el espectro de amplitud directo
+    from scipy.fft import rfft
+    canales, N = senales.shape
+    segmentos = np.lib.stride_tricks.sliding_window_view(senales, segmento, axis=1)[:, ::paso]
+    n_segmentos = segmentos.shape[1]
+    lote = max(1, MEMORIA_LOTE // (16 * canales * segmento))
+
+    potencia = np.zeros((canales, segmento // 2 + 1))
+    for inicio in range(0, n_segmentos, lote):
+        Y = rfft(segmentos[:, inicio:inicio + lote] * ventana, axis=-1, workers=workers)
+        potencia += np.sum(Y.real**2 + Y.imag**2, axis=1)
+    return 2 / np.sum(ventana) * np.sqrt(potencia / n_segmentos), n_segmentos
+
+@medido('fourier')
+def analizar_fourier_multicanal(senales, tiempo, frecuencias_fundamentales=None, ventana=None,
+                                segmento=None, solapamiento=0.5, umbral=0.01, workers=-1):
+    # senales: (canales, muestras). Con segmento se promedian segmentos de esa
+    # longitud con el solapamiento dado (Welch); si no, se usa la señal entera
+    senales = np.atleast_2d(np.asarray(senales, dtype=float))
+    canales, N = senales.shape
     T = tiempo[1] - tiempo[0]
-    
-    yf = fft(senal)
-    xf = fftfreq(N, T)[:N//2]
-    
-    amplitudes = 2/N * np.abs(yf[0:N//2])
-    
-    if frecuencia_fundamental is None:
-        idx_fundamental = np.argmax(amplitudes[1:]) + 1
-        frecuencia_fundamental = xf[idx_fundamental]
-    
-    idx_fund = np.argmin(np.abs(xf - frecuencia_fundamental))
-    armonicos = [i for i in range(len(xf)) if i != idx_fund]
-    
-    potencia_fundamental = amplitudes[idx_fund]**2
-    potencia_armonicos = sum(amplitudes[i]**2 for i in armonicos)
-    
-    thd = np.sqrt(potencia_armonicos) / np.sqrt(potencia_fundamental) if potencia_fundamental > 0 else 0
-    
+
+    if segmento is None or segmento >= N:
+        segmento = N
+    paso = max(1, int(round(segmento * (1 - solapamiento))))
+    amplitudes, n_segmentos = _espectro(senales, _ventana(ventana, segmento), segmento, paso, workers)
+
+    # Mismos bins que la FFT completa hasta Nyquist (sin incluirlo)
+    amplitudes = amplitudes[:, :segmento // 2]
+    xf = np.fft.rfftfreq(segmento, T)[:segmento // 2]
+    filas = np.arange(canales)
+
+    if frecuencias_fundamentales is None:
+        idx_fund = np.argmax(amplitudes[:, 1:], axis=1) + 1
+    else:
+        f0 = np.broadcast_to(np.asarray(frecuencias_fundamentales, dtype=float), (canales,))
+        idx_fund = np.clip(np.rint(f0 / (xf[1] - xf[0])).astype(np.int64), 0, len(xf) - 1)
+
+    potencia = amplitudes**2
+    potencia_fundamental = potencia[filas, idx_fund]
+    potencia_armonicos = np.maximum(potencia.sum(axis=1) - potencia_fundamental, 0)
+    thd = np.divide(np.sqrt(potencia_armonicos), np.sqrt(potencia_fundamental),
+                    out=np.zeros(canales), where=potencia_fundamental > 0)
+
+    significativos = amplitudes > umbral * amplitudes.max(axis=1, keepdims=True)
+    significativos[filas, idx_fund] = False
+    canal, indice = np.nonzero(significativos)
+    cortes = np.searchsorted(canal, np.arange(1, canales))
+    tabla = np.column_stack([xf[indice], amplitudes[canal, indice]])
+
     return {
         'frecuencias': xf,
         'amplitudes': amplitudes,
-        'frecuencia_fundamental': frecuencia_fundamental,
+        'frecuencia_fundamental': xf[idx_fund],
+        'indice_fundamental': idx_fund,
         'thd': thd,
-        'armonicos': [(xf[i], amplitudes[i]) for i in armonicos if amplitudes[i] > max(amplitudes)*0.01]
+        'armonicos': np.split(tabla, cortes),
+        'segmentos': n_segmentos
+    }
+
+def analizar_fourier(senal, tiempo, frecuencia_fundamental=None, **opciones):
+    analisis = analizar_fourier_multicanal(senal, tiempo, frecuencia_fundamental, **opciones)
+
+    return {
+        'frecuencias': analisis['frecuencias'],
+        'amplitudes': analisis['amplitudes'][0],
+        'frecuencia_fundamental': analisis['frecuencia_fundamental'][0] if frecuencia_fundamental is None else frecuencia_fundamental,
+        'thd': analisis['thd'][0],
+        'armonicos': [tuple(fila) for fila in analisis['armonicos'][0]]
     }
\ No newline at end of file
@@ -1,33 +1,177 @@
 import numpy as np
+from core.instrumentacion import medido
+
+# Ancho mínimo (en píxeles) al decimar si la figura aún no se ha dibujado
+PIXELES_MINIMOS = 400
+
+EJES = (
+    ("voltaje", "Voltajes en el tiempo", "Voltaje (V)"),
+    ("corriente", "Corrientes en el tiempo", "Corriente (A)"),
+    ("potencia", "Potencia en el tiempo", "Potencia (W)"),
+)
+
+def decimar_envolvente(t, y, inicio, fin, columnas):
+    # Mínimo y máximo (en su orden temporal) de cada una de 'columnas' franjas
+    # de [inicio, fin): la línea resultante cubre los mismos píxeles que la
+    # señal completa con a lo sumo 2·columnas + 2 puntos
+    n = fin - inicio
+    if n <= 2 * columnas:
+        return t[inicio:fin], y[inicio:fin]
+    ancho = n // columnas
+    franjas = y[inicio:inicio + ancho * columnas].reshape(columnas, ancho)
+    imin = np.argmin(franjas, axis=1)
+    imax = np.argmax(franjas, axis=1)
+    base = inicio + np.arange(columnas) * ancho
+    indices = np.column_stack([base + np.minimum(imin, imax), base + np.maximum(imin, imax)]).ravel()
+    resto = inicio + ancho * columnas
+    if resto < fin:
+        cola = y[resto:fin]
+        indices = np.append(indices, resto + np.sort([np.argmin(cola), np.argmax(cola)]))
+    return t[indices], y[indices]
+
+class GraficasTiempo:
+    # Voltaje, corriente y potencia por componente en tres ejes con el eje x
+    # compartido. Las líneas se crean una vez y se actualizan con set_data;
+    # cada una muestra la envolvente del tramo visible a resolución de
+    # píxel, recalculada desde los datos completos al hacer zoom o desplazar.
+    def __init__(self, fig):
+        self.fig = fig
+        self.ejes = None
+        self.componentes = None
+        self.lineas = {}
+        self.tiempo = None
+        self.datos = {}
+        
+    @medido('graficas')
+    def actualizar(self, resultados):
+        if not resultados:
+            return
+        componentes = list(resultados.keys())
+        if componentes != self.componentes:
+            self._crear_ejes(componentes)
+            
+        datos = next(iter(resultados.values()))
+        self.tiempo = np.asarray(datos["tiempo"])
+        self.datos = {(c, serie): np.asarray(resultados[c][serie]) for c in componentes for serie, _, _ in EJES}
+        
+        if len(self.tiempo) > 1:
+            self.ejes[0].set_xlim(self.tiempo[0], self.tiempo[-1])
+        self._decimar()
+        for ax in self.ejes:
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+            
+    def _crear_ejes(self, componentes):
+        self.fig.clear()
+        self.componentes = componentes
+        self.ejes = []
+        self.lineas = {}
+        for k, (serie, titulo, etiqueta) in enumerate(EJES):
+            ax = self.fig.add_subplot(3, 1, k + 1, sharex=self.ejes[0] if self.ejes else None)
+            ax.set_title(titulo)
+            ax.set_xlabel("Tiempo (s)")
+            ax.set_ylabel(etiqueta)
+            for componente in componentes:
+                self.lineas[componente, serie], = ax.plot([], [], label=str(componente))
+            ax.legend()
+            self.ejes.append(ax)
+        self.ejes[0].callbacks.connect("xlim_changed", self._al_cambiar_limites)
+        self.fig.tight_layout()
+        
+    @medido('decimacion')
+    def _al_cambiar_limites(self, ax):
+        self._decimar()
+        self.fig.canvas.draw_idle()
+        
+    def _decimar(self):
+        t = self.tiempo
+        if t is None:
+            return
+        x0, x1 = self.ejes[0].get_xlim()
+        inicio = max(np.searchsorted(t, x0) - 1, 0)
+        fin = min(np.searchsorted(t, x1) + 1, len(t))
+        columnas = max(int(self.ejes[0].bbox.width), PIXELES_MINIMOS)
+        for clave, linea in self.lineas.items():
+            linea.set_data(*decimar_envolvente(t, self.datos[clave], inicio, fin, columnas))
 
 def generar_graficas(fig, resultados):
     if not resultados:
-        return
+        return None
+    graficas = GraficasTiempo(fig)
+    graficas.actualizar(resultados)
+    return graficas
+
+def _instantes_franjas(t, ancho):
+    # Primer y último instante de cada franja de 'ancho' muestras
+    franjas = t.reshape(-1, ancho)
+    return np.column_stack([franjas[:, 0], franjas[:, -1]]).ravel()
+
+def _extremos_franjas(y, ancho):
+    # Mínimo y máximo de cada franja de 'ancho' muestras, en su orden temporal
+    franjas = y.reshape(-1, ancho)
+    filas = np.arange(len(franjas))
+    imin = np.argmin(franjas, axis=1)
+    imax = np.argmax(franjas, axis=1)
+    menor, mayor = franjas[filas, imin], franjas[filas, imax]
+    antes = imin <= imax
+    return np.column_stack([np.where(antes, menor, mayor), np.where(antes, mayor, menor)]).ravel()
+
+class BufferDecimado:
+    # Sumidero para resultados por bloques: envolvente de como mucho
+    # puntos_max puntos. Cada franja de 'paso' muestras se guarda como su
+    # mínimo y su máximo (en los instantes primero y último de la franja); al
+    # llenarse se funden las franjas de dos en dos y se duplica el paso. Con
+    # pocas muestras (paso 2) los puntos son las muestras mismas
+    def __init__(self, puntos_max=4000, series=("voltaje", "corriente", "potencia")):
+        self.puntos_max = puntos_max
+        self.series = series
+        self.paso = 2
+        self.tiempo = np.empty(0)
+        self.datos = {}
+        # Muestras que aún no completan una franja
+        self.resto_tiempo = np.empty(0)
+        self.resto = {}
         
-    t = next(iter(resultados.values()))["tiempo"]
-    
-    ax1 = fig.add_subplot(3, 1, 1)
-    ax1.set_title("Voltajes en el tiempo")
-    ax1.set_xlabel("Tiempo (s)")
-    ax1.set_ylabel("Voltaje (V)")
-    
-    ax2 = fig.add_subplot(3, 1, 2)
-    ax2.set_title("Corrientes en el tiempo")
-    ax2.set_xlabel("Tiempo (s)")
-    ax2.set_ylabel("Corriente (A)")
-    
-    ax3 = fig.add_subplot(3, 1, 3)
-    ax3.set_title("Potencia en el tiempo")
-    ax3.set_xlabel("Tiempo (s)")
-    ax3.set_ylabel("Potencia (W)")
-    
-    for componente, datos in resultados.items():
-        label = str(componente)
-        ax1.plot(t, datos["voltaje"], label=label)
-        ax2.plot(t, datos["corriente"], label=label)
-        ax3.plot(t, datos["potencia"], label=label)
+    def escribir(self, bloque):
+        t = np.concatenate([self.resto_tiempo, next(iter(bloque.values()))["tiempo"]])
+        completas = len(t) // self.paso * self.paso
+        self.tiempo = np.concatenate([self.tiempo, _instantes_franjas(t[:completas], self.paso)])
+        self.resto_tiempo = t[completas:]
+        for componente, datos in bloque.items():
+            guardado = self.datos.setdefault(componente, {s: np.empty(0) for s in self.series})
+            resto = self.resto.setdefault(componente, {s: np.empty(0) for s in self.series})
+            for serie in self.series:
+                y = np.concatenate([resto[serie], datos[serie]])
+                guardado[serie] = np.concatenate([guardado[serie], _extremos_franjas(y[:completas], self.paso)])
+                resto[serie] = y[completas:]
+                
+        while len(self.tiempo) > self.puntos_max:
+            self._fundir()
+            
+    def _fundir(self):
+        # Dos franjas consecutivas (cuatro puntos) pasan a ser una; si queda
+        # una franja suelta al final se conserva tal cual
+        fin = len(self.tiempo) // 4 * 4
+        self.paso *= 2
+        self.tiempo = np.concatenate([_instantes_franjas(self.tiempo[:fin], 4), self.tiempo[fin:]])
+        for guardado in self.datos.values():
+            for serie in self.series:
+                y = guardado[serie]
+                guardado[serie] = np.concatenate([_extremos_franjas(y[:fin], 4), y[fin:]])
+                    
+    def cerrar(self):
+        pass
         
-    ax1.legend()
-    ax2.legend()
-    ax3.legend()
-    fig.tight_layout()
\ No newline at end of file
+    def resultados(self):
+        # Mismo formato que espera generar_graficas; las muestras sueltas del
+        # final entran como una última franja
+        n = len(self.resto_tiempo)
+        def cola(y, reducir=_extremos_franjas):
+            return reducir(y, n) if n > 2 else y
+        tiempo = np.concatenate([self.tiempo, cola(self.resto_tiempo, _instantes_franjas)])
+        resultados = {}
+        for componente, guardado in self.datos.items():
+            resto = self.resto[componente]
+            resultados[componente] = {s: np.concatenate([guardado[s], cola(resto[s])]) for s in self.series}
+            resultados[componente]["tiempo"] = tiempo
+        return resultados
@@ -0,0 +1,225 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+from core.persistencia import cargar_circuito
+from core.cache import CacheAnalisis
+from core.instrumentacion import registrar, formatear_informe
+from core.simulacion import punto_operacion, barrido_ac, transitorio
+from core.resultados import Resultados
+from utils.exportar import exportar_npz, exportar_csv, exportar_json, exportar_binario
+
+# Uso sin interfaz gráfica (no importa PyQt5 ni matplotlib):
+#   python -m voltimper run circuito.cir --op --ac 1:1e6:1000 --tran 1e-3 --out resultados.npz
+#   python -m voltimper lote netlists/ --tran 1e-3 --salida resultados/ --procesos 8
+#   python -m voltimper lote netlists/ --tran 1e-3 --cache ~/.cache/voltimper
+#   python -m voltimper importacion --presupuesto 0.4
+
+# Los módulos de core y utils sólo pueden cargar NumPy al importarse; SciPy,
+# matplotlib y PyQt5 se importan al usarlos
+PAQUETES_DIFERIDOS = ('scipy', 'matplotlib', 'PyQt5')
+MODULOS_UTILS = ('utils.exportar', 'utils.fourier', 'utils.graficas')
+PRESUPUESTO_IMPORTACION = 0.4
+
+
+def _rango_ac(texto):
+    # inicio:fin:puntos, espaciado logarítmico
+    try:
+        inicio, fin, puntos = texto.split(':')
+        return np.logspace(np.log10(float(inicio)), np.log10(float(fin)), int(puntos))
+    except ValueError:
+        raise argparse.ArgumentTypeError("El barrido AC se indica como inicio:fin:puntos") from None
+
+
+def _cache(opciones):
+    # Con --cache los resultados se guardan en disco y los reutilizan otras
+    # ejecuciones (y los demás procesos de un lote) con el mismo circuito
+    if opciones.cache is None:
+        return None
+    return CacheAnalisis(directorio=opciones.cache)
+
+
+def _analizar(circuito, opciones, cache=None):
+    analisis = {}
+    if opciones.op:
+        analisis['op'] = punto_operacion(circuito, cache=cache)
+    if opciones.ac is not None:
+        analisis['ac'] = barrido_ac(circuito, opciones.ac, cache=cache)
+    if opciones.tran is not None:
+        analisis['transitorio'] = transitorio(circuito, opciones.tran, opciones.puntos, metodo=opciones.metodo,
+                                              cache=cache)
+    return analisis
+
+
+def _guardar(circuito, analisis, salida):
+    extension = os.path.splitext(salida)[1].lower()
+    if extension == '.npz':
+        exportar_npz(analisis, salida)
+        return
+    # Los demás formatos son los de resultados por componente del transitorio
+    if 'transitorio' not in analisis:
+        raise ValueError(f"El formato {extension} necesita un análisis transitorio (--tran)")
+    respuesta = analisis['transitorio']
+    resultados = Resultados(tuple(circuito.componentes), respuesta['tiempo'], respuesta)
+    exportadores = {'.csv': exportar_csv, '.json': exportar_json, '.vres': exportar_binario}
+    if extension not in exportadores:
+        raise ValueError(f"Formato de salida no soportado: {extension}")
+    exportadores[extension](resultados, salida)
+
+
+def _resumen(circuito, analisis):
+    lineas = [f"{len(circuito.componentes)} componentes, {len(circuito.nodos)} nodos"]
+    if 'op' in analisis:
+        op = analisis['op']
+        lineas.append(f"Punto de operación ({op['estrategia']}, {op['iteraciones']} iteraciones):")
+        for nodo in sorted(op['voltajes'], key=str):
+            lineas.append(f"  V({nodo}) = {op['voltajes'][nodo]:.6g} V")
+    if 'ac' in analisis:
+        frecuencias = analisis['ac']['frecuencias']
+        lineas.append(f"Barrido AC: {len(frecuencias)} frecuencias de {frecuencias[0]:.6g} a {frecuencias[-1]:.6g} Hz")
+    if 'transitorio' in analisis:
+        t = analisis['transitorio']['tiempo']
+        lineas.append(f"Transitorio: {len(t)} puntos hasta {t[-1]:.6g} s")
+    return "\n".join(lineas)
+
+
+def _validar(opciones):
+    if not (opciones.op or opciones.ac is not None or opciones.tran is not None):
+        opciones.op = True
+
+
+def ejecutar(opciones):
+    _validar(opciones)
+    medir = opciones.rendimiento or opciones.memoria
+    with registrar(memoria=opciones.memoria) if medir else nullcontext() as registro:
+        circuito, _ = cargar_circuito(opciones.netlist, opciones.compacto)
+        for problema in circuito.verificar_conexiones():
+            print(f"Aviso: {problema}", file=sys.stderr)
+        analisis = _analizar(circuito, opciones, _cache(opciones))
+        print(_resumen(circuito, analisis))
+        if opciones.out:
+            _guardar(circuito, analisis, opciones.out)
+            print(f"Resultados guardados en {opciones.out}")
+    if registro is not None:
+        print(formatear_informe(registro.informe()))
+    return 0
+
+
+def _procesar(ruta, salida, opciones):
+    inicio = time.perf_counter()
+    try:
+        circuito, _ = cargar_circuito(ruta, opciones.compacto)
+        _guardar(circuito, _analizar(circuito, opciones, _cache(opciones)), salida)
+    except Exception as e:
+        return ruta, str(e), time.perf_counter() - inicio
+    return ruta, None, time.perf_counter() - inicio
+
+
+def lote(opciones):
+    _validar(opciones)
+    rutas = sorted(os.path.join(opciones.directorio, f) for f in os.listdir(opciones.directorio)
+                   if f.lower().endswith(opciones.extension))
+    salida = opciones.salida or opciones.directorio
+    os.makedirs(salida, exist_ok=True)
+    destinos = [os.path.join(salida, os.path.splitext(os.path.basename(r))[0] + opciones.formato) for r in rutas]
+
+    fallos = 0
+    with ProcessPoolExecutor(max_workers=opciones.procesos) as ejecutor:
+        for ruta, error, segundos in ejecutor.map(_procesar, rutas, destinos, [opciones] * len(rutas)):
+            if error is None:
+                print(f"{ruta}: {segundos:.3f} s")
+            else:
+                fallos += 1
+                print(f"{ruta}: error: {error}", file=sys.stderr)
+    print(f"{len(rutas) - fallos}/{len(rutas)} netlists simuladas")
+    return 1 if fallos else 0
+
+
+def _modulos_sin_interfaz():
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    core = sorted(f"core.{nombre[:-3]}" for nombre in os.listdir(os.path.join(raiz, 'core'))
+                  if nombre.endswith('.py'))
+    return raiz, core + list(MODULOS_UTILS)
+
+
+def importacion(opciones):
+    # Mide en intérpretes nuevos cuánto cuesta importar core y utils (el mejor
+    # de varios intentos) y falla si se pasa del presupuesto o si se cargó
+    # alguno de los paquetes diferidos
+    raiz, modulos = _modulos_sin_interfaz()
+    codigo = ("import sys, time\n"
+              "inicio = time.perf_counter()\n"
+              f"import {', '.join(modulos)}\n"
+              "print(time.perf_counter() - inicio)\n"
+              "print(' '.join(sys.modules))")
+    tiempos = []
+    for _ in range(opciones.repeticiones):
+        salida = subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, text=True)
+        if salida.returncode:
+            print(salida.stderr, file=sys.stderr)
+            return 1
+        segundos, cargados = salida.stdout.splitlines()
+        tiempos.append(float(segundos))
+    diferidos = sorted({m.split('.')[0] for m in cargados.split()} & set(PAQUETES_DIFERIDOS))
+
+    print(f"Importación de {len(modulos)} módulos: {min(tiempos):.3f} s (presupuesto {opciones.presupuesto:.3f} s)")
+    if diferidos:
+        print(f"Paquetes cargados al importar: {', '.join(diferidos)}", file=sys.stderr)
+    return 1 if diferidos or min(tiempos) > opciones.presupuesto else 0
+
+
+def _opciones_analisis(parser):
+    parser.add_argument('--op', action='store_true', help="punto de operación DC (por defecto si no se pide otro)")
+    parser.add_argument('--ac', type=_rango_ac, metavar='INICIO:FIN:PUNTOS', help="barrido AC logarítmico")
+    parser.add_argument('--tran', type=float, metavar='TIEMPO', help="transitorio hasta TIEMPO segundos")
+    parser.add_argument('--puntos', type=int, default=1000, help="puntos del transitorio")
+    parser.add_argument('--metodo', choices=('trapezoidal', 'euler'), default='trapezoidal')
+    parser.add_argument('--cache', metavar='DIRECTORIO', help="reutiliza resultados guardados en DIRECTORIO")
+    parser.add_argument('--compacto', action='store_true',
+                        help="guarda el circuito como arreglos en lugar de un objeto por componente")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog='voltimper', description="Simulación de circuitos sin interfaz gráfica")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    run = subparsers.add_parser('run', help="simula una netlist")
+    run.add_argument('netlist', help="netlist de texto (.cir) o circuito compacto (.cirz)")
+    run.add_argument('--out', help="archivo de resultados (.npz, .csv, .json o .vres)")
+    run.add_argument('--rendimiento', action='store_true', help="muestra el tiempo de cada etapa")
+    run.add_argument('--memoria', action='store_true', help="incluye el pico de memoria de cada etapa (más lento)")
+    _opciones_analisis(run)
+    run.set_defaults(funcion=ejecutar)
+
+    por_lotes = subparsers.add_parser('lote', help="simula en paralelo todas las netlists de un directorio")
+    por_lotes.add_argument('directorio')
+    por_lotes.add_argument('--salida', help="directorio de resultados (por defecto, el de las netlists)")
+    por_lotes.add_argument('--formato', default='.npz', choices=('.npz', '.csv', '.json', '.vres'))
+    por_lotes.add_argument('--extension', default='.cir', help="extensión de las netlists")
+    por_lotes.add_argument('--procesos', type=int, default=None, help="procesos en paralelo (por defecto, uno por núcleo)")
+    _opciones_analisis(por_lotes)
+    por_lotes.set_defaults(funcion=lote)
+
+    tiempo = subparsers.add_parser('importacion', help="comprueba el tiempo de importación de core y utils")
+    tiempo.add_argument('--presupuesto', type=float, default=PRESUPUESTO_IMPORTACION, help="segundos permitidos")
+    tiempo.add_argument('--repeticiones', type=int, default=3)
+    tiempo.set_defaults(funcion=importacion)
+    return parser
+
+
+def main(argv=None):
+    opciones = crear_parser().parse_args(argv)
+    try:
+        return opciones.funcion(opciones)
+    except (OSError, ValueError, np.linalg.LinAlgError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())